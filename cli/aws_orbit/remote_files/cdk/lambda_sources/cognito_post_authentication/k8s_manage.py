@@ -1,12 +1,14 @@
+import base64
 import json
 import logging
 import os
-import subprocess
 import time
-from typing import Any, Dict, List, Optional, cast
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple, cast
 
 import boto3
-from kubernetes import client, config, dynamic
+from botocore.signers import RequestSigner
+from kubernetes import client, dynamic
 from kubernetes.client import api_client
 from kubernetes.client.rest import ApiException
 
@@ -22,7 +24,11 @@ ORBIT_API_GROUP = os.environ.get("ORBIT_API_GROUP", "orbit.aws")
 ORBIT_SYSTEM_NAMESPACE = os.environ.get("ORBIT_SYSTEM_NAMESPACE", "orbit-system")
 ORBIT_STATE_PATH = os.environ.get("ORBIT_STATE_PATH", "/state")
 USERSPACE_CR_KIND = "UserSpace"
-KUBECONFIG_PATH = "/tmp/.kubeconfig"
+CLUSTER_NAME = f"orbit-{ORBIT_ENV}"
+CA_CERT_PATH = "/tmp/.orbit-cluster-ca.crt"
+# EKS accepts a token for 15 minutes, the assumed role credentials last 1 hour
+TOKEN_REFRESH_SECONDS = 600
+CREDENTIALS_REFRESH_SECONDS = 300
 
 
 ssm = boto3.client("ssm")
@@ -30,45 +36,88 @@ context = ssm.get_parameter(Name=f"/orbit/{ORBIT_ENV}/context")
 EFS_FS_ID = json.loads(context.get("Parameter").get("Value")).get("SharedEfsFsId")
 
 
-def handler(event: Dict[str, Any], context: Optional[Dict[str, Any]]) -> Any:
-    create_kubeconfig()
+# Kept across warm invocations of the Lambda
+_session: Optional[boto3.Session] = None
+_session_expiration: float = 0
+_token_expiration: float = 0
+_api_client: Optional[api_client.ApiClient] = None
+_dynamic_client: Optional[dynamic.DynamicClient] = None
+
 
-    api_CoreV1 = client.CoreV1Api()
-    userspace_dc = dynamic.DynamicClient(client=api_client.ApiClient()).resources.get(
+def handler(event: Dict[str, Any], context: Optional[Dict[str, Any]]) -> Any:
+    api_CoreV1, dynamic_client = get_clients()
+    userspace_dc = dynamic_client.resources.get(
         group=ORBIT_API_GROUP, api_version=ORBIT_API_VERSION, kind=USERSPACE_CR_KIND
     )
 
-    manage_user_namespace(event, api_CoreV1, userspace_dc)
+    manage_user_namespace(event, api_CoreV1, userspace_dc, dynamic_client)
 
 
-def run_command(cmd: str) -> None:
-    """Module to run shell commands."""
-    cmds = cmd.split(" ")
-    try:
-        output = subprocess.run(cmds, stderr=subprocess.STDOUT, shell=False, timeout=120, universal_newlines=True)
-        print(output)
-    except subprocess.CalledProcessError as exc:
-        # print("Command failed with exit code {}, stderr: {}".format(exc.returncode, exc.output.decode("utf-8")))
-        raise exc
-
-
-def create_kubeconfig() -> None:
-    logger.info(f"Generating kubeconfig in {KUBECONFIG_PATH}")
-    run_command(
-        (
-            "aws eks update-kubeconfig "
-            f"--name orbit-{ORBIT_ENV} "
-            f"--role-arn arn:aws:iam::{ACCOUNT_ID}:role{ROLE_PREFIX}orbit-{ORBIT_ENV}-{REGION}-admin "
-            f"--kubeconfig {KUBECONFIG_PATH}"
+def _get_session() -> boto3.Session:
+    global _session, _session_expiration
+    if _session is None or _session_expiration - time.time() < CREDENTIALS_REFRESH_SECONDS:
+        role_arn = f"arn:aws:iam::{ACCOUNT_ID}:role{ROLE_PREFIX}orbit-{ORBIT_ENV}-{REGION}-admin"
+        logger.info(f"Assuming role {role_arn}")
+        credentials = boto3.client("sts").assume_role(RoleArn=role_arn, RoleSessionName="orbit-post-auth-k8s-manage")[
+            "Credentials"
+        ]
+        _session = boto3.Session(
+            aws_access_key_id=credentials["AccessKeyId"],
+            aws_secret_access_key=credentials["SecretAccessKey"],
+            aws_session_token=credentials["SessionToken"],
+            region_name=REGION,
         )
+        _session_expiration = cast(datetime, credentials["Expiration"]).replace(tzinfo=timezone.utc).timestamp()
+    return _session
+
+
+def get_bearer_token(session: boto3.Session) -> str:
+    """Returns an EKS token, the presigned STS GetCallerIdentity url `aws eks get-token` would return."""
+    sts = session.client("sts", region_name=REGION)
+    signer = RequestSigner(
+        sts.meta.service_model.service_id, REGION, "sts", "v4", session.get_credentials(), session.events
+    )
+    url = signer.generate_presigned_url(
+        {
+            "method": "GET",
+            "url": f"https://sts.{REGION}.amazonaws.com/?Action=GetCallerIdentity&Version=2011-06-15",
+            "body": {},
+            "headers": {"x-k8s-aws-id": CLUSTER_NAME},
+            "context": {},
+        },
+        region_name=REGION,
+        expires_in=60,
+        operation_name="",
     )
+    return "k8s-aws-v1." + base64.urlsafe_b64encode(url.encode("utf-8")).decode("utf-8").rstrip("=")
 
-    logger.info("Loading kubeconfig")
-    try:
-        config.load_kube_config(KUBECONFIG_PATH)
-        logger.info("Loaded kubeconfig successfully")
-    except config.ConfigException:
-        raise Exception("Could not configure kubernetes python client")
+
+def get_clients() -> Tuple[client.CoreV1Api, dynamic.DynamicClient]:
+    """
+    Returns clients authenticated to the cluster. The clients and their API discovery are kept across warm
+    invocations, only the bearer token is refreshed before it expires.
+    """
+    global _api_client, _dynamic_client, _token_expiration
+    if _api_client is None:
+        logger.info(f"Describing cluster {CLUSTER_NAME}")
+        cluster = boto3.client("eks").describe_cluster(name=CLUSTER_NAME)["cluster"]
+        with open(CA_CERT_PATH, "wb") as ca_cert:
+            ca_cert.write(base64.b64decode(cluster["certificateAuthority"]["data"]))
+        configuration = client.Configuration()
+        configuration.host = cluster["endpoint"]
+        configuration.ssl_ca_cert = CA_CERT_PATH
+        configuration.api_key_prefix["authorization"] = "Bearer"
+        _api_client = api_client.ApiClient(configuration=configuration)
+
+    session = _get_session()
+    if time.time() > _token_expiration:
+        _api_client.configuration.api_key["authorization"] = get_bearer_token(session)
+        # the token is only accepted while the credentials signing it are valid
+        _token_expiration = min(time.time() + TOKEN_REFRESH_SECONDS, _session_expiration - CREDENTIALS_REFRESH_SECONDS)
+
+    if _dynamic_client is None:
+        _dynamic_client = dynamic.DynamicClient(client=_api_client)
+    return client.CoreV1Api(api_client=_api_client), _dynamic_client
 
 
 def create_userspace(
@@ -174,13 +223,14 @@ def create_user_namespace(
 def delete_user_namespace(
     api: client.CoreV1Api,
     userspace_dc: dynamic.DynamicClient,
+    dynamic_client: dynamic.DynamicClient,
     user_name: str,
     expected_user_namespaces: Dict[str, str],
     namespaces: List[str],
 ) -> None:
     for user_ns in namespaces:
         if user_ns not in expected_user_namespaces.values():
-            delete_user_profile(user_profile=user_ns)
+            delete_user_profile(dynamic_client=dynamic_client, user_profile=user_ns)
             logger.info(f"User {user_name} is not expected to be part of the {user_ns} namespace. Removing...")
             try:
                 userspace_dc.delete(name=user_ns, namespace=user_ns)
@@ -197,13 +247,23 @@ def delete_user_namespace(
                 logger.warning(ae.body)
 
 
-def delete_user_profile(user_profile: str) -> None:
+def delete_user_profile(dynamic_client: dynamic.DynamicClient, user_profile: str) -> None:
     logger.info(f"Removing profile {user_profile}")
-    run_command(f"kubectl delete profile {user_profile} --kubeconfig {KUBECONFIG_PATH}")
+    try:
+        profile_dc = dynamic_client.resources.get(group="kubeflow.org", api_version="v1", kind="Profile")
+        profile_dc.delete(name=user_profile)
+    except (ApiException, dynamic.exceptions.ResourceNotFoundError, dynamic.exceptions.NotFoundError) as e:
+        logger.warning(f"Exception when trying to remove profile {user_profile}: {e}")
+        return
     time.sleep(5)
 
 
-def manage_user_namespace(event: Dict[str, Any], api: client.CoreV1Api, userspace_dc: dynamic.DynamicClient) -> None:
+def manage_user_namespace(
+    event: Dict[str, Any],
+    api: client.CoreV1Api,
+    userspace_dc: dynamic.DynamicClient,
+    dynamic_client: dynamic.DynamicClient,
+) -> None:
     user_name = cast(str, event.get("user_name"))
     user_email = cast(str, event.get("user_email"))
     expected_user_namespaces = cast(Dict[str, str], event.get("expected_user_namespaces"))
@@ -227,6 +287,7 @@ def manage_user_namespace(event: Dict[str, Any], api: client.CoreV1Api, userspac
     delete_user_namespace(
         api=api,
         userspace_dc=userspace_dc,
+        dynamic_client=dynamic_client,
         user_name=user_name,
         expected_user_namespaces=expected_user_namespaces,
         namespaces=all_ns,
@@ -0,0 +1,130 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License").
+#    You may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import abc
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Union, cast
+
+import requests
+from jose import jwk, jwt
+from jose.utils import base64url_decode
+
+logger = logging.getLogger()
+
+Claims = Dict[str, Union[str, int, List[str]]]
+
+
+class TokenVerifier(abc.ABC):
+    """
+    Verifies JWT signatures against public keys constructed once and indexed by `kid`.
+
+    An unknown `kid` refetches the keys, at most once every `min_refetch_seconds` (per `kid` for key sources publishing
+    one key per `kid`), so key rotations are picked up without a restart. Fetch times and verified claims are kept for
+    at most `cache_size` entries, the claims until the token expires.
+    """
+
+    fetches_per_kid = False
+
+    def __init__(
+        self,
+        audience: Optional[str] = None,
+        min_refetch_seconds: float = 60,
+        max_key_age_seconds: float = 86400,
+        cache_size: int = 1024,
+    ) -> None:
+        self.audience = audience
+        self.min_refetch_seconds = min_refetch_seconds
+        self.max_key_age_seconds = max_key_age_seconds
+        self.cache_size = cache_size
+        self._keys: Dict[str, Any] = {}
+        self._fetched: "OrderedDict[str, float]" = OrderedDict()
+        self._keys_lock = threading.Lock()
+        self._claims: "OrderedDict[str, Claims]" = OrderedDict()
+        self._claims_lock = threading.Lock()
+
+    @abc.abstractmethod
+    def _fetch_keys(self, kid: str) -> Dict[str, Any]:
+        """
+        Returns the public keys (constructed jose keys) to merge into the key index, `kid` is the key looked for.
+        """
+
+    def _get_key(self, kid: str) -> Any:
+        with self._keys_lock:
+            now = time.time()
+            scope = kid if self.fetches_per_kid else ""
+            fetched = self._fetched.get(scope, 0.0)
+            expired = now - fetched > self.max_key_age_seconds
+            if (kid not in self._keys or expired) and now - fetched > self.min_refetch_seconds:
+                keys = self._fetch_keys(kid)
+                self._keys = keys if expired and not self.fetches_per_kid else {**self._keys, **keys}
+                self._fetched[scope] = now
+                # scopes are request supplied kids for per kid key sources, keep only the most recent ones
+                self._fetched.move_to_end(scope)
+                if len(self._fetched) > self.cache_size:
+                    self._fetched.popitem(last=False)
+            if kid not in self._keys:
+                raise ValueError("Public key not found in JWK.")
+            return self._keys[kid]
+
+    def _verify(self, token: str) -> Claims:
+        # get the kid from the headers prior to verification
+        kid = cast(str, jwt.get_unverified_headers(token=token)["kid"])
+        public_key = self._get_key(kid)
+        # get the last two sections of the token, message and signature (encoded in base64)
+        message, encoded_signature = token.rsplit(".", 1)
+        decoded_signature = base64url_decode(encoded_signature.encode("utf-8"))
+        if public_key.verify(msg=message.encode("utf8"), sig=decoded_signature) is False:
+            raise RuntimeError("Signature verification failed.")
+        logger.debug("Signature validated.")
+        # since we passed the verification, we can now safely use the unverified claims
+        claims = cast(Claims, jwt.get_unverified_claims(token))
+        if self.audience is not None and claims.get("aud") != self.audience:
+            raise ValueError("Token was not issued for this audience.")
+        return claims
+
+    def get_claims(self, token: str) -> Claims:
+        with self._claims_lock:
+            claims = self._claims.get(token)
+            if claims is not None:
+                self._claims.move_to_end(token)
+        if claims is None:
+            claims = self._verify(token)
+            with self._claims_lock:
+                self._claims[token] = claims
+                if len(self._claims) > self.cache_size:
+                    self._claims.popitem(last=False)
+        if time.time() > int(cast(int, claims["exp"])):
+            with self._claims_lock:
+                self._claims.pop(token, None)
+            raise ValueError("Token expired.")
+        logger.debug("Token not expired.")
+        return dict(claims)
+
+
+class JwksVerifier(TokenVerifier):
+    """
+    Verifies tokens signed by the keys of a JWKS document, e.g. the Cognito User Pool keys.
+    """
+
+    def __init__(self, jwks_url: str, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.jwks_url = jwks_url
+
+    def _fetch_keys(self, kid: str) -> Dict[str, Any]:
+        logger.debug("Fetching keys from %s", self.jwks_url)
+        keys = requests.get(self.jwks_url, timeout=10).json()["keys"]
+        return {key["kid"]: jwk.construct(key_data=key) for key in keys}
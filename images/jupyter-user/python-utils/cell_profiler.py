@@ -0,0 +1,159 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License").
+#    You may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import boto3
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger()
+
+PROFILE_SUFFIX = ".profile.json"
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _children(pids: Set[int]) -> Set[int]:
+    children = set()
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # the ppid is the 2nd field after the parenthesized command name
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid in pids:
+            children.add(int(entry))
+    return children
+
+
+def _rss(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+class RssSampler(threading.Thread):
+    """
+    Samples the resident memory of the executing kernel process and its children from /proc.
+
+    When the kernel pid is not known the processes started by this process are sampled instead, except the `exclude`
+    processes (the idle pooled kernels) and their children.
+    """
+
+    def __init__(self, pid: Optional[int] = None, exclude: Optional[Set[int]] = None, interval: float = 0.5) -> None:
+        super().__init__(name="rss-sampler", daemon=True)
+        self.pid = pid
+        self.exclude = exclude or set()
+        self.interval = interval
+        self.samples: List[Tuple[float, int]] = []
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        root = self.pid if self.pid is not None else os.getpid()
+        while not self._stop_event.is_set():
+            processes: Set[int] = {root} if self.pid is not None else set()
+            level = _children({root}) - self.exclude
+            while level:
+                processes |= level
+                level = _children(level) - processes - self.exclude
+            self.samples.append((time.time(), sum(_rss(pid) for pid in processes)))
+            self._stop_event.wait(self.interval)
+
+    def stop(self) -> List[Tuple[float, int]]:
+        self._stop_event.set()
+        self.join()
+        return self.samples
+
+
+def _timestamp(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    # papermill records naive datetime.utcnow() values, which must not be read as local time
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def build_profile(
+    notebook: Dict[str, Any], samples: List[Tuple[float, int]], parameters: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Extracts per cell duration, peak kernel RSS and output size from an executed notebook.
+
+    Cells are identified by a hash of their source, so the same cell can be followed across runs.
+    """
+    cells = []
+    for index, cell in enumerate(notebook.get("cells", [])):
+        if cell.get("cell_type") != "code":
+            continue
+        metadata = cell.get("metadata", {}).get("papermill", {})
+        start = _timestamp(metadata.get("start_time"))
+        end = _timestamp(metadata.get("end_time"))
+        peak_rss = None
+        if start is not None and end is not None:
+            rss = [value for ts, value in samples if start <= ts <= end]
+            peak_rss = max(rss) if rss else None
+        source = cell.get("source", "")
+        source = "".join(source) if isinstance(source, list) else source
+        cells.append(
+            {
+                "index": index,
+                "cellId": hashlib.sha1(source.encode("utf-8")).hexdigest()[:12],
+                "source": source.strip().split("\n")[0][:80],
+                "status": metadata.get("status"),
+                "start": start,
+                "duration": metadata.get("duration"),
+                "peakRss": peak_rss,
+                "outputBytes": len(json.dumps(cell.get("outputs", []))),
+            }
+        )
+    return {
+        "notebook": os.path.basename(parameters["PAPERMILL_OUTPUT_DIR_PATH"].rstrip("/")),
+        "output": parameters["PAPERMILL_WORKBOOK_NAME"],
+        "timestamp": time.time(),
+        "peakRss": max((value for _, value in samples), default=None),
+        "cells": cells,
+    }
+
+
+def profile_path(output_path: str) -> str:
+    base, _ = os.path.splitext(output_path)
+    return base + PROFILE_SUFFIX
+
+
+def write_profile(profile: Dict[str, Any], output_path: str) -> str:
+    """
+    Writes the profile as a sidecar of the output notebook, in its local directory or s3:// prefix.
+    """
+    path = profile_path(output_path)
+    body = json.dumps(profile, separators=(",", ":"))
+    if path.startswith("s3:"):
+        bucket, _, key = path[len("s3://") :].partition("/")
+        boto3.client("s3").put_object(Bucket=bucket, Key=key, Body=body.encode("utf-8"))
+    else:
+        with open(path, "w") as f:
+            f.write(body)
+    return path
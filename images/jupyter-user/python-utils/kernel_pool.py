@@ -0,0 +1,188 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License").
+#    You may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Set
+
+import nbformat
+from nbclient import NotebookClient
+from nbclient.util import run_sync
+from papermill.clientwrap import PapermillNotebookClient
+from papermill.engines import NBClientEngine, papermill_engines
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger()
+
+POOLED_ENGINE_NAME = "orbit_pooled"
+
+# Team wide imports preloaded in every pooled kernel, one statement per line (usually set through a PodSetting env)
+PRELOAD_IMPORTS_ENV = "ORBIT_KERNEL_PRELOAD_IMPORTS"
+
+
+class PooledKernel:
+    def __init__(self, kernel_name: str, client: NotebookClient, startup_seconds: float) -> None:
+        self.kernel_name = kernel_name
+        self.client = client
+        self.km = client.km
+        self.kc = client.kc
+        self.startup_seconds = startup_seconds
+        self.tasks = 0
+
+    @property
+    def pid(self) -> Optional[int]:
+        # jupyter_client 7 starts the kernel through a provisioner, older versions keep its Popen as km.kernel
+        process = getattr(getattr(self.km, "provisioner", None), "process", None) or getattr(self.km, "kernel", None)
+        pid = getattr(process, "pid", None)
+        return int(pid) if pid is not None else None
+
+    def is_alive(self) -> bool:
+        return bool(run_sync(self.km.is_alive)())
+
+    def execute(self, code: str) -> None:
+        msg_id = self.kc.execute(code, silent=True, store_history=False)
+        reply = self.client.wait_for_reply(msg_id)
+        if reply is None or reply["content"]["status"] != "ok":
+            raise Exception(f"Error running '{code}' in pooled {self.kernel_name} kernel: {reply}")
+
+    def shutdown(self) -> None:
+        try:
+            self.kc.stop_channels()
+            run_sync(self.km.shutdown_kernel)(now=True)
+        except Exception as e:
+            logger.warning("Error shutting down pooled %s kernel: %s", self.kernel_name, e)
+
+
+class KernelPool:
+    """
+    Keeps started kernels per kernelspec so consecutive notebooks of a container skip the kernel boot.
+
+    A kernel is reset (namespace cleared, working directory changed, preloaded imports re-run) before every notebook
+    and replaced after max_tasks_per_kernel notebooks or when it died.
+    """
+
+    def __init__(
+        self, preload_imports: Optional[List[str]] = None, max_tasks_per_kernel: int = 50, startup_timeout: int = 60
+    ) -> None:
+        self.preload_imports = preload_imports or []
+        self.max_tasks_per_kernel = max_tasks_per_kernel
+        self.startup_timeout = startup_timeout
+        self._idle: Dict[str, List[PooledKernel]] = {}
+
+    def prestart(self, kernel_names: List[str]) -> None:
+        for kernel_name in set(kernel_names):
+            if not self._idle.get(kernel_name):
+                self._idle.setdefault(kernel_name, []).append(self._start(kernel_name))
+
+    def _start(self, kernel_name: str) -> PooledKernel:
+        start = time.time()
+        client = NotebookClient(
+            nbformat.v4.new_notebook(),
+            kernel_name=kernel_name,
+            startup_timeout=self.startup_timeout,
+            timeout=self.startup_timeout,
+        )
+        client.km = client.create_kernel_manager()
+        client.start_new_kernel()
+        client.start_new_kernel_client()
+        kernel = PooledKernel(kernel_name, client, time.time() - start)
+        if self.preload_imports:
+            kernel.execute("\n".join(self.preload_imports))
+        logger.info("Started pooled %s kernel in %.2fs", kernel_name, time.time() - start)
+        return kernel
+
+    def acquire(self, kernel_name: str, workdir: str) -> PooledKernel:
+        idle = self._idle.setdefault(kernel_name, [])
+        while idle:
+            kernel = idle.pop()
+            if kernel.is_alive():
+                try:
+                    kernel.execute(_reset_code(workdir, self.preload_imports))
+                    return kernel
+                except Exception as e:
+                    logger.warning("Cannot reset pooled %s kernel, replacing it: %s", kernel_name, e)
+            kernel.shutdown()
+        kernel = self._start(kernel_name)
+        kernel.execute(_reset_code(workdir, []))
+        return kernel
+
+    def release(self, kernel: PooledKernel, discard: bool = False) -> None:
+        kernel.tasks += 1
+        if discard or kernel.tasks >= self.max_tasks_per_kernel or not kernel.is_alive():
+            kernel.shutdown()
+        else:
+            self._idle.setdefault(kernel.kernel_name, []).append(kernel)
+
+    def idle_pids(self) -> Set[int]:
+        return {pid for kernels in self._idle.values() for pid in (kernel.pid for kernel in kernels) if pid is not None}
+
+    def shutdown(self) -> None:
+        for kernels in self._idle.values():
+            for kernel in kernels:
+                kernel.shutdown()
+        self._idle = {}
+
+
+def _reset_code(workdir: str, preload_imports: List[str]) -> str:
+    lines = ["get_ipython().run_line_magic('reset', '-f')", "import os", f"os.chdir({workdir!r})"]
+    lines.extend(preload_imports)
+    return "\n".join(lines)
+
+
+def get_preload_imports(container: Dict[str, Any]) -> List[str]:
+    imports = [i for i in os.environ.get(PRELOAD_IMPORTS_ENV, "").splitlines() if i.strip()]
+    imports.extend(container.get("preload_imports", []))
+    return imports
+
+
+class PooledKernelEngine(NBClientEngine):
+    """
+    Papermill engine executing the notebook in the already started kernel passed as `pooled_kernel`.
+    """
+
+    @classmethod
+    def execute_managed_notebook(
+        cls,
+        nb_man,
+        kernel_name,
+        log_output=False,
+        stdout_file=None,
+        stderr_file=None,
+        start_timeout=60,
+        execution_timeout=None,
+        pooled_kernel=None,
+        **kwargs,
+    ):
+        client = PapermillNotebookClient(
+            nb_man,
+            km=pooled_kernel.km,
+            timeout=execution_timeout,
+            startup_timeout=start_timeout,
+            kernel_name=kernel_name,
+            log=logger,
+            log_output=log_output,
+            stdout_file=stdout_file,
+            stderr_file=stderr_file,
+        )
+        client.kc = pooled_kernel.kc
+        client.reset_execution_trackers()
+        client.papermill_execute_cells()
+        info_msg = client.wait_for_reply(client.kc.kernel_info())
+        client.nb.metadata["language_info"] = info_msg["content"]["language_info"]
+        client.set_widgets_metadata()
+        return client.nb
+
+
+papermill_engines.register(POOLED_ENGINE_NAME, PooledKernelEngine)
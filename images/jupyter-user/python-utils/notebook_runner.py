@@ -15,13 +15,22 @@
 import json
 import logging
 import os
+import shutil
+import tempfile
 import time
-from multiprocessing import Pool
-from typing import List
+from concurrent.futures import Future
+from multiprocessing.util import Finalize
+from typing import Any, Dict, List, Optional, Tuple, cast
 
 import papermill as pm
 import yaml as yaml
-from aws_orbit import sh
+
+import cell_profiler as cp
+import kernel_pool as kp
+import output_uploader as ou
+import result_cache as rc
+import source_cache as sc
+import task_scheduler as ts
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger()
@@ -35,6 +44,9 @@ NoDatesSafeLoader.yaml_implicit_resolvers = {
     for k, v in NoDatesSafeLoader.yaml_implicit_resolvers.items()
 }
 
+# Warm kernels of the current process, set when compute.container.kernel_pool is enabled
+_kernel_pool: Optional[kp.KernelPool] = None
+
 
 def read_yaml_file(path):
     with open(path, "r") as f:
@@ -51,7 +63,7 @@ def run():
     notebooksToRun = prepareAndValidateNotebooks(default_output_directory, notebooks)
     errors = []
     try:
-        errors = runNotebooks(notebooksToRun, compute)
+        errors = runNotebooks(notebooksToRun, compute, notebooks["tasks"], default_output_directory)
     finally:
         if len(errors) > 0:
             logger.error("Execution had errors : %s", errors)
@@ -60,44 +72,187 @@ def run():
             return "done notebook execution"
 
 
-def runNotebooks(reportsToRun, compute):
-    errors = []
-    if "container" in compute["compute"].keys() and "p_concurrent" in compute["compute"]["container"]:
-        workers = int(compute["compute"]["container"]["p_concurrent"])
+def runNotebooks(reportsToRun, compute, taskDefinitions=None, summaryOutputDirectory=None):
+    container = compute["compute"].get("container", {})
+    if "p_concurrent" in container:
+        workers = int(container["p_concurrent"])
     else:
         workers = 1
+    taskDefinitions = taskDefinitions or [{} for _ in reportsToRun]
+    defaultTimeout = container.get("task_timeout")
+    maxFailures = int(container["max_failures"]) if "max_failures" in container else None
+
+    resultCache = str(container.get("result_cache", False)).lower() == "true"
+    for task in reportsToRun:
+        task["PAPERMILL_RESULT_CACHE"] = resultCache
+
+    initializer = None
+    initargs: Tuple[Any, ...] = ()
+    if str(container.get("kernel_pool", False)).lower() == "true":
+        poolConfig = {
+            "preload_imports": kp.get_preload_imports(container),
+            "max_tasks_per_kernel": int(container.get("kernel_pool_max_tasks", 50)),
+        }
+        kernelNames = [_kernelName(task) for task in reportsToRun if _usesKernelPool(task)]
+        logger.info("Using warm kernel pool for kernels %s with %s", set(kernelNames), poolConfig)
+        initializer = _initKernelPool
+        initargs = (poolConfig, kernelNames)
+
+    # outputs for s3 targets are executed into local scratch files and uploaded in the background by this process
+    uploader = ou.OutputUploader()
+    uploads: List[Tuple[Future, Dict[str, Any]]] = []
+
+    def _queueUpload(record: Dict[str, Any]) -> None:
+        if "upload" in record:
+            uploads.append((uploader.submit(record["upload"]["source"], record["upload"]["destination"]), record))
 
     if workers == 1:
         logger.info("Starting tasks execution")
-        for task in reportsToRun:
-            taskErrors = runNotebook(task)
-            errors.extend(taskErrors)
     else:
         logger.info("Starting tasks execution with %s processes ", workers)
-        pool = Pool(processes=workers)
+    try:
+        records = ts.run_tasks(
+            tasks=reportsToRun,
+            runner=runNotebookWithTimings,
+            task_ids=[task["PAPERMILL_OUTPUT_PATH"] for task in reportsToRun],
+            workers=workers,
+            priorities=[int(t.get("priority", 0)) for t in taskDefinitions],
+            timeouts=[ts.parse_timeout(t.get("timeout", defaultTimeout)) for t in taskDefinitions],
+            max_failures=maxFailures,
+            initializer=initializer,
+            initargs=initargs,
+            on_record=_queueUpload,
+        )
+    finally:
+        _shutdownKernelPool()
+        uploadStats = uploader.flush()
+        uploader.shutdown()
+
+    for future, record in uploads:
+        if future.exception() is not None:
+            record["errors"].append(future.exception())
+            record["status"] = ts.STATUS_FAILED
+        elif "cachePending" in record:
+            pending = record.pop("cachePending")
+            rc.store(pending["outputDir"], pending["key"], pending["output"])
+    if uploadStats["files"]:
+        logger.info("Output upload throughput %.2f MB/s", uploadStats["throughput"] / ou.MB)
+
+    _reportOverhead(records)
+    if resultCache:
+        statuses = [r.get("cache") for r in records]
+        logger.info(
+            "Result cache: %s hits, %s misses, %s forced",
+            statuses.count("hit"),
+            statuses.count("miss"),
+            statuses.count("forced"),
+        )
+    if summaryOutputDirectory:
+        ts.write_summary(records, summaryOutputDirectory, "summary@" + time.strftime("%Y%m%d-%H:%M") + ".json")
+    logger.info("Completed all notebook executions")
 
-        for taskErrors in pool.map(runNotebook, reportsToRun):
-            if len(taskErrors) > 0:
-                errors.extend(taskErrors)
+    return ts.errors_of(records)
 
-    logger.info("Completed all notebook executions")
 
-    return errors
+def _initKernelPool(poolConfig: Dict[str, Any], kernelNames: List[str]) -> None:
+    global _kernel_pool
+    _kernel_pool = kp.KernelPool(**poolConfig)
+    _kernel_pool.prestart(kernelNames)
+    # shutdown the kernels when a pool worker process exits
+    Finalize(_kernel_pool, _kernel_pool.shutdown, exitpriority=10)
+
+
+def _shutdownKernelPool() -> None:
+    global _kernel_pool
+    if _kernel_pool is not None:
+        _kernel_pool.shutdown()
+        _kernel_pool = None
+
+
+def _kernelSpec(parameters) -> Dict[str, str]:
+    with open(parameters["PAPERMILL_INPUT_PATH"]) as f:
+        return cast(Dict[str, str], json.load(f)["metadata"]["kernelspec"])
+
+
+def _kernelName(parameters) -> str:
+    return _kernelSpec(parameters)["name"]
+
+
+def _usesKernelPool(parameters) -> bool:
+    # only IPython kernels support the namespace reset done between notebooks
+    return not parameters.get("PAPERMILL_ISOLATED", False) and _kernelSpec(parameters).get("language") == "python"
+
+
+def _reportOverhead(records: List[Dict[str, Any]]) -> None:
+    timed = [r for r in records if "kernelMode" in r]
+    for mode in sorted(set(r["kernelMode"] for r in timed)):
+        modeRecords = [r for r in timed if r["kernelMode"] == mode]
+        overhead = sum(r["kernelOverhead"] for r in modeRecords)
+        logger.info(
+            "%s %s kernel executions: total %.2fs, kernel overhead %.2fs (%.2fs per notebook)",
+            len(modeRecords),
+            mode,
+            sum(r["duration"] for r in modeRecords),
+            overhead,
+            overhead / len(modeRecords),
+        )
 
 
 def runNotebook(parameters):
+    errors, _ = runNotebookWithTimings(parameters)
+    return errors
+
+
+def runNotebookWithTimings(parameters) -> Tuple[List[Exception], Dict[str, Any]]:
     errors = []
     output_path = parameters.get("PAPERMILL_OUTPUT_PATH")
     output_path_dir = parameters.get("PAPERMILL_OUTPUT_DIR_PATH")
-    os.makedirs(output_path_dir, exist_ok=True)
+    if not output_path_dir.startswith("s3:"):
+        os.makedirs(output_path_dir, exist_ok=True)
+    start = time.time()
+
+    cacheKey = None
+    cacheStatus = "disabled"
+    if parameters.get("PAPERMILL_RESULT_CACHE", False):
+        cacheKey = rc.cache_key(parameters)
+        if not cacheKey:
+            logger.info("Result cache disabled for %s, the runner image digest is unknown", output_path)
+    if cacheKey:
+        cachedOutput = None if parameters.get("PAPERMILL_FORCE", False) else rc.lookup(output_path_dir, cacheKey)
+        if cachedOutput:
+            logger.info("Result cache hit for %s, reusing output %s", output_path, cachedOutput)
+            rc.restore(cachedOutput, output_path)
+            return [], {"cache": "hit", "cacheKey": cacheKey}
+        cacheStatus = "forced" if parameters.get("PAPERMILL_FORCE", False) else "miss"
+
+    # s3 outputs are executed into a local scratch file, uploaded by the parent process once the task returns
+    final_output_path = output_path
+    scratch_dir = None
+    if output_path.startswith("s3:"):
+        scratch_dir = tempfile.mkdtemp(prefix="orbit-output-")
+        output_path = os.path.join(scratch_dir, parameters["PAPERMILL_WORKBOOK_NAME"])
+
+    kernel = None
+    executed = None
+    sampler: Optional[cp.RssSampler] = None
     try:
-        logger.info("Starting notebook execution for %s", output_path)
-        pm.execute_notebook(
+        logger.info("Starting notebook execution for %s", final_output_path)
+        engine_kwargs: Dict[str, Any] = {}
+        if _kernel_pool is not None and _usesKernelPool(parameters):
+            kernel = _kernel_pool.acquire(_kernelName(parameters), parameters["PAPERMILL_WORK_DIR"])
+            engine_kwargs = {"engine_name": kp.POOLED_ENGINE_NAME, "pooled_kernel": kernel}
+        sampler = cp.RssSampler(
+            pid=kernel.pid if kernel is not None else None,
+            exclude=_kernel_pool.idle_pids() if _kernel_pool is not None else None,
+        )
+        sampler.start()
+        executed = pm.execute_notebook(
             input_path=parameters["PAPERMILL_INPUT_PATH"],
             output_path=output_path,
             parameters=parameters,
             cwd=parameters["PAPERMILL_WORK_DIR"],
             log_output=True,
+            **engine_kwargs,
         )
     except Exception as e:
         logger.error("Error during notebook execution: %s", e)
@@ -105,40 +260,82 @@ def runNotebook(parameters):
             parameters["PAPERMILL_OUTPUT_DIR_PATH"], "error@" + parameters["PAPERMILL_WORKBOOK_NAME"]
         )
 
-        logger.error("marking error notebook with error %s->%s", output_path, pathToOutputNotebookError)
+        logger.error("marking error notebook with error %s->%s", final_output_path, pathToOutputNotebookError)
         errors.append(e)
-        if output_path.startswith("s3:"):
-            c = "aws s3 mv {} {}".format(output_path, pathToOutputNotebookError)
-            print(c)
-            os.system(c)
-        else:
+        if scratch_dir:
+            final_output_path = pathToOutputNotebookError
+        elif os.path.exists(output_path):
             logger.error(f"rename {output_path} to {pathToOutputNotebookError}")
             os.rename(output_path, pathToOutputNotebookError)
-            output_path = pathToOutputNotebookError
-
-    logger.info("Completed notebook execution: %s with %s error", output_path, len(errors))
+            output_path = final_output_path = pathToOutputNotebookError
+    finally:
+        samples = sampler.stop() if sampler is not None else []
+        if kernel is not None and _kernel_pool is not None:
+            # a timed out kernel may still be busy with the interrupted cell
+            _kernel_pool.release(kernel, discard=any(isinstance(e, ts.TaskTimeoutError) for e in errors))
+
+    total = time.time() - start
+    cellsDuration = 0.0
+    if executed is not None:
+        cellsDuration = sum(
+            c.get("metadata", {}).get("papermill", {}).get("duration") or 0.0 for c in executed.get("cells", [])
+        )
+    timing: Dict[str, Any] = {
+        "kernelMode": "pooled" if kernel is not None else "fresh",
+        "kernelOverhead": max(total - cellsDuration, 0.0) if executed is not None else total,
+        "cache": cacheStatus,
+    }
+    try:
+        # failed runs are profiled from the partially executed output papermill wrote
+        profiled = executed
+        if profiled is None and os.path.exists(output_path):
+            with open(output_path) as f:
+                profiled = json.load(f)
+        if profiled is not None:
+            cp.write_profile(cp.build_profile(profiled, samples, parameters), final_output_path)
+    except Exception as e:
+        logger.warning("Cannot write cell profile for %s: %s", final_output_path, e)
+    if scratch_dir:
+        if os.path.exists(output_path):
+            timing["upload"] = {"source": output_path, "destination": final_output_path}
+        else:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+    if cacheKey and not errors:
+        timing["cacheKey"] = cacheKey
+        if scratch_dir:
+            # recorded by the parent process once the output is uploaded
+            timing["cachePending"] = {"outputDir": output_path_dir, "key": cacheKey, "output": final_output_path}
+        else:
+            rc.store(output_path_dir, cacheKey, output_path)
+    logger.info(
+        "Completed notebook execution: %s with %s error in %.2fs (%s kernel overhead %.2fs)",
+        final_output_path,
+        len(errors),
+        total,
+        timing["kernelMode"],
+        timing["kernelOverhead"],
+    )
 
-    return errors
+    return errors, timing
 
 
 def prepareAndValidateNotebooks(default_output_directory, notebooks):
     cc_region = os.environ.get("AWS_DEFAULT_REGION")
-    # Get all git repos
-    cc_repo_list = set(
-        [
-            task["sourcePath"].split("/")[0]
-            for task in notebooks["tasks"]
-            if task["sourcePath"] and "codecommit::" in task["sourcePath"]
-        ]
-    )
-    logger.info(f"cc_repo_list={cc_repo_list}")
-    # For each code repo, clone to specific repo name based folder.
-    for cc_repo in cc_repo_list:
+    # Get all git repos and the ref each one is checked out at
+    cc_repo_refs: Dict[str, str] = {}
+    for task in notebooks["tasks"]:
+        if task["sourcePath"] and "codecommit::" in task["sourcePath"]:
+            cc_repo = task["sourcePath"].split("/")[0]
+            ref = task.get("sourceRef", sc.DEFAULT_REF)
+            if cc_repo_refs.setdefault(cc_repo, ref) != ref:
+                raise Exception(f"Tasks reference {cc_repo} at different refs: {cc_repo_refs[cc_repo]}, {ref}")
+    logger.info(f"cc_repo_refs={cc_repo_refs}")
+    # For each code repo, checkout to specific repo name based folder from the team source cache.
+    for cc_repo, ref in cc_repo_refs.items():
         repo_path = cc_repo.replace("::", f"::{cc_region}://")
         repo_name = cc_repo.split("::")[-1]
-        logger.info(f"Cloning {repo_path}")
-        sh.run(f"git clone {repo_path} /tmp/{repo_name}/")
-        # sh.run(f"git clone codecommit::{cc_region}://orbit-iter-lake-user /tmp/{repo_name}/")
+        logger.info(f"Checking out {repo_path}@{ref}")
+        sc.checkout(repo_path, repo_name, ref, f"/tmp/{repo_name}")
 
     reportsToRun = []
     id = 1
@@ -246,6 +443,11 @@ def prepareNotebook(default_output_directory, notebook, key):
     parameters["PAPERMILL_OUTPUT_DIR_PATH"] = pathToOutputNotebookDir
     parameters["PAPERMILL_WORKBOOK_NAME"] = outputName
     parameters["PAPERMILL_WORK_DIR"] = os.path.abspath(workdir)
+    # isolation sensitive notebooks always get a fresh kernel, even when the warm kernel pool is enabled
+    parameters["PAPERMILL_ISOLATED"] = str(notebook.get("isolated", False)).lower() == "true"
+    # result cache: declared inputs fingerprinted into the cache key, force always executes the notebook
+    parameters["PAPERMILL_INPUTS"] = notebook.get("inputs", [])
+    parameters["PAPERMILL_FORCE"] = str(notebook.get("force", False)).lower() == "true"
     logger.debug("runtime parameters: %s", parameters)
 
     return parameters
@@ -0,0 +1,113 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License").
+#    You may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import logging
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger()
+
+MB = 1024 * 1024
+
+
+def split_s3_path(s3_path: str) -> Tuple[str, str]:
+    bucket, _, key = s3_path.replace("s3://", "").partition("/")
+    return bucket, key
+
+
+class OutputUploader:
+    """
+    Uploads local output files to S3 from a background thread pool, so runners can move on to the next task.
+
+    Files above the multipart threshold are sent as multipart uploads. flush() waits for every pending upload and
+    reports the upload throughput.
+    """
+
+    def __init__(self, max_workers: int = 4, multipart_threshold: int = 8 * MB, multipart_chunksize: int = 8 * MB):
+        self._s3 = boto3.client("s3")
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="output-uploader")
+        self._transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold, multipart_chunksize=multipart_chunksize, max_concurrency=4
+        )
+        self._lock = threading.Lock()
+        self._pending: List[Future] = []
+        self._bytes = 0
+        self._files = 0
+        self._started: Optional[float] = None
+
+    def _upload(self, source: str, destination: str, remove_source: bool) -> str:
+        bucket, key = split_s3_path(destination)
+        size = os.path.getsize(source)
+        self._s3.upload_file(source, bucket, key, Config=self._transfer_config)
+        with self._lock:
+            self._bytes += size
+            self._files += 1
+        if remove_source:
+            shutil.rmtree(os.path.dirname(source), ignore_errors=True)
+        logger.info("Uploaded %s to %s (%s bytes)", source, destination, size)
+        return destination
+
+    def submit(self, source: str, destination: str, remove_source: bool = True) -> Future:
+        """
+        Queues the upload of a local file to an s3:// destination. With remove_source, the file's scratch directory is
+        deleted once uploaded.
+        """
+        with self._lock:
+            if self._started is None:
+                self._started = time.time()
+        future = self._executor.submit(self._upload, source, destination, remove_source)
+        self._pending.append(future)
+        return future
+
+    def flush(self) -> Dict[str, Any]:
+        """
+        Waits for every pending upload and returns the upload statistics, including the failed uploads.
+        """
+        errors = []
+        for future in self._pending:
+            try:
+                future.result()
+            except Exception as e:
+                logger.error("Error uploading output: %s", e)
+                errors.append(e)
+        self._pending = []
+        elapsed = time.time() - self._started if self._started else 0.0
+        throughput = self._bytes / elapsed if elapsed > 0 else 0.0
+        stats: Dict[str, Any] = {
+            "files": self._files,
+            "bytes": self._bytes,
+            "seconds": elapsed,
+            "throughput": throughput,
+            "errors": errors,
+        }
+        logger.info(
+            "Uploaded %s outputs, %.2f MB in %.2fs (%.2f MB/s) with %s errors",
+            stats["files"],
+            self._bytes / MB,
+            elapsed,
+            throughput / MB,
+            len(errors),
+        )
+        return stats
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
@@ -12,14 +12,20 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
+import asyncio
 import logging
 import os
 import sys
+import threading
+import time
 from importlib import import_module
-from multiprocessing import Pool
+from types import ModuleType
+from typing import Dict, Tuple
 
 import yaml
 
+import task_scheduler as ts
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger()
 
@@ -39,7 +45,7 @@ def run():
 
     errors = []
     try:
-        errors = runTasks(tasks["tasks"], compute)
+        errors = runTasks(tasks["tasks"], compute, os.environ.get("output", "private/outputs"))
 
     finally:
         if len(errors) > 0:
@@ -49,49 +55,94 @@ def run():
     return "done python execution"
 
 
-def runTasks(tasks, compute):
-    errors = []
-    if "container" in compute["compute"].keys() and "p_concurrent" in compute["compute"]["container"]:
-        workers = int(compute["compute"]["container"]["p_concurrent"])
+def runTasks(tasks, compute, summaryOutputDirectory=None):
+    container = compute["compute"].get("container", {})
+    if "p_concurrent" in container:
+        workers = int(container["p_concurrent"])
     else:
         workers = 1
+    defaultTimeout = container.get("task_timeout")
+    maxFailures = int(container["max_failures"]) if "max_failures" in container else None
+    executor = container.get("executor", ts.EXECUTOR_PROCESS)
 
     if workers == 1:
-        logger.info("Starting tasks execution")
-        for task in tasks:
-            taskErrors = runTask(task)
-            errors.extend(taskErrors)
+        logger.info("Starting tasks execution with %s executor", executor)
     else:
-        logger.info("Starting tasks execution with %s processes ", workers)
-        pool = Pool(processes=workers)
+        logger.info("Starting tasks execution with %s executor and %s workers", executor, workers)
 
-        for taskErrors in pool.map(runTask, tasks):
-            if len(taskErrors) > 0:
-                errors.extend(taskErrors)
+    records = ts.run_tasks(
+        tasks=tasks,
+        runner=runTaskAsync if executor == ts.EXECUTOR_ASYNCIO else runTask,
+        task_ids=[f"{task['module']}.{task['functionName']}" for task in tasks],
+        workers=workers,
+        priorities=[int(task.get("priority", 0)) for task in tasks],
+        timeouts=[ts.parse_timeout(task.get("timeout", defaultTimeout)) for task in tasks],
+        max_failures=maxFailures,
+        executor=executor,
+    )
 
-        logger.info("Completed all notebook executions")
-        logger.info("current working dir %s", os.getcwd())
+    logger.info("Completed all python task executions")
+    logger.info("current working dir %s", os.getcwd())
+    if summaryOutputDirectory:
+        ts.write_summary(records, summaryOutputDirectory, "summary@" + time.strftime("%Y%m%d-%H:%M") + ".json")
 
-    return errors
+    return ts.errors_of(records)
+
+
+# modules imported per (sourcePaths, module), shared by the tasks running in this process
+_modules: Dict[Tuple[Tuple[str, ...], str], ModuleType] = {}
+_modules_lock = threading.Lock()
+
+
+def resolveFunction(task):
+    module = task["module"]
+    sourcePaths = tuple(os.path.abspath(p) for p in task["sourcePaths"])
+    key = (sourcePaths, module)
+    with _modules_lock:
+        if key not in _modules:
+            for p in sourcePaths:
+                if p not in sys.path:
+                    sys.path.insert(0, p)
+            logger.info("import paths: %s", str(sys.path))
+            _modules[key] = import_module(module)
+    return getattr(_modules[key], task["functionName"])
 
 
 def runTask(task):
     parameters = task["params"]
     module = task["module"]
     functionName = task["functionName"]
-    sourcePaths = task["sourcePaths"]
-    for p in sourcePaths:
-        sys.path.insert(0, os.path.abspath(p))
+    func = resolveFunction(task)
+
+    errors = []
+    try:
+        logger.info("Starting task execution for %s.%s", module, functionName)
+        if asyncio.iscoroutinefunction(func):
+            asyncio.run(func(parameters))
+        else:
+            func(parameters)
+    except Exception as e:
+        logger.error("Error during task execution for %s.%s: error %s", module, functionName, e)
+        errors.append(e)
+
+    logger.info("Completed task execution for %s.%s", module, functionName)
+    return errors
 
-    logger.info("import paths: %s", str(sys.path))
 
-    mod = import_module(module)
-    func = getattr(mod, functionName)
+async def runTaskAsync(task):
+    parameters = task["params"]
+    module = task["module"]
+    functionName = task["functionName"]
+    func = resolveFunction(task)
 
     errors = []
     try:
         logger.info("Starting task execution for %s.%s", module, functionName)
-        func(parameters)
+        if asyncio.iscoroutinefunction(func):
+            await func(parameters)
+        else:
+            # blocking functions run in the default thread pool of the event loop
+            await asyncio.get_event_loop().run_in_executor(None, func, parameters)
     except Exception as e:
         logger.error("Error during task execution for %s.%s: error %s", module, functionName, e)
         errors.append(e)
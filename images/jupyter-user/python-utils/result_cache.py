@@ -0,0 +1,185 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License").
+#    You may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import socket
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import boto3
+from botocore.exceptions import ClientError
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger()
+
+CACHE_DIR_NAME = ".orbit-cache"
+SERVICE_ACCOUNT_NAMESPACE = "/var/run/secrets/kubernetes.io/serviceaccount/namespace"
+
+# Parameters that change on every run without changing the result
+VOLATILE_PARAMETERS = [
+    "PAPERMILL_INPUT_PATH",
+    "PAPERMILL_OUTPUT_PATH",
+    "PAPERMILL_WORKBOOK_NAME",
+    "PAPERMILL_RESULT_CACHE",
+    "PAPERMILL_FORCE",
+]
+
+
+def _split_s3_path(s3_path: str) -> Tuple[str, str]:
+    bucket, _, key = s3_path.replace("s3://", "").partition("/")
+    return bucket, key
+
+
+def fingerprint_inputs(inputs: List[str]) -> List[List[Any]]:
+    """
+    Returns a fingerprint of the declared inputs: ETags of the s3 objects under each s3:// prefix and size/mtime of
+    each local file.
+    """
+    fingerprint: List[List[Any]] = []
+    for path in inputs:
+        if path.startswith("s3:"):
+            bucket, prefix = _split_s3_path(path)
+            paginator = boto3.client("s3").get_paginator("list_objects_v2")
+            for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+                for obj in page.get("Contents", []):
+                    fingerprint.append([f"s3://{bucket}/{obj['Key']}", obj["ETag"], obj["Size"]])
+        elif os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    stat = os.stat(os.path.join(root, name))
+                    fingerprint.append([os.path.join(root, name), stat.st_size, stat.st_mtime])
+        elif os.path.exists(path):
+            stat = os.stat(path)
+            fingerprint.append([path, stat.st_size, stat.st_mtime])
+        else:
+            fingerprint.append([path, None])
+    return sorted(fingerprint, key=lambda f: str(f[0]))
+
+
+@lru_cache(maxsize=1)
+def image_digest() -> Optional[str]:
+    """
+    Returns the digest of the image the runner container was started from (its pod container status imageID), or None
+    when it cannot be resolved.
+    """
+    try:
+        from kubernetes import client, config
+
+        config.load_incluster_config()
+        with open(SERVICE_ACCOUNT_NAMESPACE) as f:
+            namespace = f.read().strip()
+        pod = client.CoreV1Api().read_namespaced_pod(name=socket.gethostname(), namespace=namespace)
+    except Exception as e:
+        logger.warning("Unable to read the runner pod to resolve its image digest: %s", e)
+        return None
+    container = pod.spec.containers[0].name
+    for status in pod.status.container_statuses or []:
+        if status.name == container and "@sha256:" in (status.image_id or ""):
+            return str(status.image_id.rpartition("@")[2])
+    return None
+
+
+def cache_key(parameters: Dict[str, Any]) -> Optional[str]:
+    """
+    Computes the result cache key of a prepared notebook from its content, resolved parameters, container image digest
+    and declared input fingerprints. Returns None when the image digest is unknown, as a tag may be re-pushed.
+    """
+    digest = image_digest()
+    if not digest:
+        return None
+    with open(parameters["PAPERMILL_INPUT_PATH"], "rb") as f:
+        notebook_hash = hashlib.sha256(f.read()).hexdigest()
+    resolved = {k: v for k, v in parameters.items() if k not in VOLATILE_PARAMETERS}
+    document = {
+        "notebook": notebook_hash,
+        "parameters": resolved,
+        "image": digest,
+        "inputs": fingerprint_inputs(parameters.get("PAPERMILL_INPUTS", [])),
+    }
+    return hashlib.sha256(json.dumps(document, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _exists(path: str) -> bool:
+    if path.startswith("s3:"):
+        bucket, key = _split_s3_path(path)
+        try:
+            boto3.client("s3").head_object(Bucket=bucket, Key=key)
+            return True
+        except ClientError:
+            return False
+    return os.path.exists(path)
+
+
+def _read(path: str) -> Optional[str]:
+    if path.startswith("s3:"):
+        bucket, key = _split_s3_path(path)
+        try:
+            return str(boto3.client("s3").get_object(Bucket=bucket, Key=key)["Body"].read().decode("utf-8"))
+        except ClientError:
+            return None
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return f.read()
+
+
+def _write(path: str, body: str) -> None:
+    if path.startswith("s3:"):
+        bucket, key = _split_s3_path(path)
+        boto3.client("s3").put_object(Bucket=bucket, Key=key, Body=body.encode("utf-8"))
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(body)
+
+
+def lookup(output_dir: str, key: str) -> Optional[str]:
+    """
+    Returns the path of a successful output stored for the key, if it still exists.
+    """
+    entry = _read(os.path.join(output_dir, CACHE_DIR_NAME, key + ".json"))
+    if entry is None:
+        return None
+    output = json.loads(entry)["output"]
+    return str(output) if _exists(output) else None
+
+
+def restore(cached_output: str, output_path: str) -> None:
+    """
+    Makes the cached output available as the output of the current run: server side copy on s3, hard link (or copy
+    across file systems) on EFS.
+    """
+    if cached_output.startswith("s3:") or output_path.startswith("s3:"):
+        if not (cached_output.startswith("s3:") and output_path.startswith("s3:")):
+            raise Exception(f"Cannot restore cached output {cached_output} to {output_path}")
+        src_bucket, src_key = _split_s3_path(cached_output)
+        dst_bucket, dst_key = _split_s3_path(output_path)
+        boto3.client("s3").copy({"Bucket": src_bucket, "Key": src_key}, dst_bucket, dst_key)
+    else:
+        try:
+            os.link(cached_output, output_path)
+        except OSError:
+            shutil.copy2(cached_output, output_path)
+
+
+def store(output_dir: str, key: str, output_path: str) -> None:
+    _write(
+        os.path.join(output_dir, CACHE_DIR_NAME, key + ".json"),
+        json.dumps({"output": output_path, "created": time.time()}),
+    )
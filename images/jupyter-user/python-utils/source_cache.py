@@ -0,0 +1,182 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License").
+#    You may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import fcntl
+import logging
+import os
+import re
+import shutil
+import subprocess
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger()
+
+# Repo cache on the team EFS volume, shared by every container of the team
+SOURCE_CACHE_DIR_ENV = "ORBIT_SOURCE_CACHE_DIR"
+DEFAULT_SOURCE_CACHE_DIR = os.path.join("~", "shared", ".orbit-source-cache")
+DEFAULT_REF = "HEAD"
+
+_SHA_PATTERN = re.compile(r"^[0-9a-f]{40}$")
+
+
+def _git(*args: str, cwd: Optional[str] = None, env: Optional[Dict[str, str]] = None) -> str:
+    result = subprocess.run(
+        ["git", *args],
+        cwd=cwd,
+        env={**os.environ, **env} if env else None,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise Exception(f"git {' '.join(args)} failed: {result.stderr.strip()}")
+    return result.stdout.strip()
+
+
+@contextmanager
+def _locked(path: str) -> Iterator[None]:
+    # POSIX record locks, honored across the NFS clients of the EFS volume
+    with open(path, "a") as lock_file:
+        start = time.time()
+        fcntl.lockf(lock_file, fcntl.LOCK_EX)
+        waited = time.time() - start
+        if waited > 1:
+            logger.info("Waited %.2fs for lock %s", waited, path)
+        try:
+            yield
+        finally:
+            fcntl.lockf(lock_file, fcntl.LOCK_UN)
+
+
+def get_cache_dir() -> Optional[str]:
+    """
+    Returns the repo cache directory, or None when the team EFS volume is not mounted.
+    """
+    cache_dir = os.path.expanduser(os.environ.get(SOURCE_CACHE_DIR_ENV, DEFAULT_SOURCE_CACHE_DIR))
+    if not os.path.isdir(os.path.dirname(cache_dir)):
+        return None
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def _has_commit(git_dir: str, commit: str) -> bool:
+    try:
+        _git("cat-file", "-e", f"{commit}^{{commit}}", cwd=git_dir)
+        return True
+    except Exception:
+        return False
+
+
+def _resolve_remote(git_dir: str, ref: str) -> Optional[str]:
+    if _SHA_PATTERN.match(ref):
+        return ref
+    # annotated tags resolve to the tag object, peeled once it is fetched
+    for line in _git("ls-remote", "origin", ref, cwd=git_dir).splitlines():
+        sha, name = line.split("\t")
+        if name in (ref, f"refs/heads/{ref}", f"refs/tags/{ref}"):
+            return sha
+    return None
+
+
+def _fetch(git_dir: str, ref: str) -> str:
+    if _SHA_PATTERN.match(ref):
+        # servers do not always allow fetching an unadvertised commit, fetch the history without blobs instead
+        unshallow = ["--unshallow"] if _git("rev-parse", "--is-shallow-repository", cwd=git_dir) == "true" else []
+        _git("fetch", "--filter=blob:none", *unshallow, "origin", cwd=git_dir)
+        if not _has_commit(git_dir, ref):
+            raise Exception(f"Cannot find commit {ref} in {git_dir}")
+        return ref
+    _git("fetch", "--depth", "1", "origin", ref, cwd=git_dir)
+    return _git("rev-parse", "FETCH_HEAD^{commit}", cwd=git_dir)
+
+
+def _clone(repo_url: str, ref: str, target_dir: str) -> str:
+    if not _SHA_PATTERN.match(ref):
+        clone_args = ["clone", "--depth", "1"] + ([] if ref == DEFAULT_REF else ["--branch", ref])
+        _git(*clone_args, repo_url, target_dir)
+        return _git("rev-parse", "HEAD", cwd=target_dir)
+    # clone --branch does not take a commit
+    _git("init", target_dir)
+    _git("remote", "add", "origin", repo_url, cwd=target_dir)
+    try:
+        _git("fetch", "--depth", "1", "origin", ref, cwd=target_dir)
+    except Exception:
+        # servers do not always allow fetching an unadvertised commit
+        _git("fetch", "origin", cwd=target_dir)
+    _git("checkout", "--detach", ref, cwd=target_dir)
+    return ref
+
+
+def checkout(repo_url: str, repo_name: str, ref: str, target_dir: str) -> str:
+    """
+    Checks out the files of `ref` of the repository read-only into target_dir and returns the commit.
+
+    The objects live in a bare repository on the team EFS volume and are fetched with depth 1, only when the commit is
+    not cached yet. Containers checking out the same repo concurrently serialize on a lock file, so a commit is
+    fetched once. Without the EFS volume the repository is shallow cloned into target_dir.
+    """
+    cache_dir = get_cache_dir()
+    if cache_dir is None:
+        logger.info("No source cache available, cloning %s", repo_url)
+        return _clone(repo_url, ref, target_dir)
+
+    git_dir = os.path.join(cache_dir, repo_name + ".git")
+    with _locked(git_dir + ".lock"):
+        if not os.path.isdir(git_dir):
+            _git("init", "--bare", git_dir)
+            _git("remote", "add", "origin", repo_url, cwd=git_dir)
+
+    start = time.time()
+    commit = _resolve_remote(git_dir, ref)
+    if commit is None:
+        raise Exception(f"Cannot find ref {ref} in {repo_url}")
+    with _locked(git_dir + ".lock"):
+        if _has_commit(git_dir, commit):
+            commit = _git("rev-parse", f"{commit}^{{commit}}", cwd=git_dir)
+            logger.info("Source cache hit for %s@%s", repo_name, commit)
+        else:
+            commit = _fetch(git_dir, ref)
+            logger.info("Fetched %s@%s into the source cache in %.2fs", repo_name, commit, time.time() - start)
+        if os.path.exists(target_dir):
+            shutil.rmtree(target_dir)
+        os.makedirs(target_dir)
+        # the files are written with a private index, the shared repository keeps no per container HEAD, index or
+        # worktree that another container could replace. Blobs missing from a blob-less fetch are fetched here.
+        index_file = target_dir.rstrip("/") + ".index"
+        try:
+            _git(
+                "--git-dir",
+                git_dir,
+                "--work-tree",
+                target_dir,
+                "checkout",
+                commit,
+                "--",
+                ".",
+                env={"GIT_INDEX_FILE": index_file},
+            )
+        finally:
+            if os.path.exists(index_file):
+                os.remove(index_file)
+
+    for root, dirs, files in os.walk(target_dir):
+        for name in files:
+            path = os.path.join(root, name)
+            if not os.path.islink(path):
+                os.chmod(path, os.stat(path).st_mode & ~0o222)
+    logger.info("Checked out %s@%s into %s in %.2fs", repo_name, commit, target_dir, time.time() - start)
+    return commit
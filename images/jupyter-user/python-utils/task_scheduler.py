@@ -0,0 +1,321 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License").
+#    You may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import asyncio
+import json
+import logging
+import os
+import signal
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from multiprocessing import Pool
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import boto3
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger()
+
+STATUS_SUCCEEDED = "Succeeded"
+STATUS_FAILED = "Failed"
+STATUS_TIMED_OUT = "TimedOut"
+STATUS_CANCELLED = "Cancelled"
+
+EXECUTOR_PROCESS = "process"
+EXECUTOR_THREAD = "thread"
+EXECUTOR_ASYNCIO = "asyncio"
+EXECUTORS = [EXECUTOR_PROCESS, EXECUTOR_THREAD, EXECUTOR_ASYNCIO]
+
+TaskItem = Tuple[int, str, Any, Callable[..., Any], Optional[float]]
+
+
+class TaskTimeoutError(Exception):
+    pass
+
+
+class TasksCancelledError(Exception):
+    pass
+
+
+def parse_timeout(value: Any) -> Optional[float]:
+    return float(value) if value else None
+
+
+def _raise_timeout(signum, frame):
+    raise TaskTimeoutError("Task execution timed out")
+
+
+def _start_record(index: int, task_id: str) -> Dict[str, Any]:
+    logger.info("Starting task %s", task_id)
+    return {"index": index, "task": task_id, "start": time.time(), "pid": os.getpid()}
+
+
+def _finish_record(record: Dict[str, Any], result: Any = None, error: Optional[Exception] = None) -> Dict[str, Any]:
+    if error is not None:
+        if not isinstance(error, TaskTimeoutError):
+            logger.error("Error during task execution for %s: %s", record["task"], error)
+        errors, details = [error], {}
+    else:
+        errors, details = result if isinstance(result, tuple) else (result, {})
+    record["end"] = time.time()
+    record["duration"] = record["end"] - record["start"]
+    if any(isinstance(e, TaskTimeoutError) for e in errors):
+        record["status"] = STATUS_TIMED_OUT
+    else:
+        record["status"] = STATUS_FAILED if errors else STATUS_SUCCEEDED
+    record["errors"] = errors
+    record.update(details)
+    return record
+
+
+def _execute(item: TaskItem) -> Dict[str, Any]:
+    """
+    Runs one task in the current process and returns its execution record.
+
+    The runner returns either a list of errors or a tuple of (errors, details), details being added to the record.
+    Timeouts are enforced with SIGALRM, tasks always run in the main thread of a runner process.
+    """
+    index, task_id, task, runner, timeout = item
+    record = _start_record(index, task_id)
+    if timeout:
+        signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return _finish_record(record, result=runner(task))
+    except Exception as e:
+        return _finish_record(record, error=e)
+    finally:
+        if timeout:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def _run_processes(
+    items: List[TaskItem],
+    workers: int,
+    collect: Callable[[Dict[str, Any]], bool],
+    initializer: Optional[Callable[..., None]],
+    initargs: Tuple[Any, ...],
+) -> None:
+    if workers == 1:
+        if initializer:
+            initializer(*initargs)
+        for item in items:
+            if collect(_execute(item)):
+                break
+        return
+
+    pool = Pool(processes=workers, initializer=initializer, initargs=initargs)
+    cancelled = False
+    try:
+        for record in pool.imap_unordered(_execute, items, chunksize=1):
+            if collect(record):
+                cancelled = True
+                break
+    finally:
+        if cancelled:
+            pool.terminate()
+        else:
+            pool.close()
+        pool.join()
+
+
+def _run_threads(items: List[TaskItem], workers: int, collect: Callable[[Dict[str, Any]], bool]) -> None:
+    # threads cannot be interrupted: a timed out or cancelled task is recorded right away but keeps running
+    started: Dict[int, Dict[str, Any]] = {}
+    lock = threading.Lock()
+
+    def _execute_in_thread(item: TaskItem) -> Dict[str, Any]:
+        index, task_id, task, runner, _ = item
+        record = _start_record(index, task_id)
+        record["thread"] = threading.current_thread().name
+        with lock:
+            started[index] = record
+        try:
+            return _finish_record(record, result=runner(task))
+        except Exception as e:
+            return _finish_record(record, error=e)
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="task")
+    pending: Dict[Future, TaskItem] = {executor.submit(_execute_in_thread, item): item for item in items}
+    try:
+        while pending:
+            now = time.time()
+            with lock:
+                deadlines = {
+                    future: started[item[0]]["start"] + item[4]
+                    for future, item in pending.items()
+                    if item[4] and item[0] in started
+                }
+            for future, deadline in deadlines.items():
+                if deadline <= now and not future.done():
+                    index, task_id, _, _, timeout = pending.pop(future)
+                    with lock:
+                        record = dict(started[index])
+                    if collect(_finish_record(record, error=TaskTimeoutError(f"Task timed out after {timeout}s"))):
+                        return
+            if not pending:
+                return
+            next_deadline = min([d - now for d in deadlines.values() if d > now], default=None)
+            wait_timeout = None if next_deadline is None else max(next_deadline, 0.01)
+            done, _ = wait(list(pending), timeout=wait_timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in pending:
+                    pending.pop(future)
+                    if collect(future.result()):
+                        return
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+async def _run_coroutines(items: List[TaskItem], workers: int, collect: Callable[[Dict[str, Any]], bool]) -> None:
+    semaphore = asyncio.Semaphore(workers)
+
+    async def _execute_coroutine(item: TaskItem) -> Dict[str, Any]:
+        index, task_id, task, runner, timeout = item
+        async with semaphore:
+            record = _start_record(index, task_id)
+            try:
+                return _finish_record(record, result=await asyncio.wait_for(runner(task), timeout))
+            except asyncio.TimeoutError:
+                return _finish_record(record, error=TaskTimeoutError(f"Task timed out after {timeout}s"))
+            except Exception as e:
+                return _finish_record(record, error=e)
+
+    # created in priority order, the semaphore then starts them first
+    futures: List[asyncio.Future] = [asyncio.ensure_future(_execute_coroutine(item)) for item in items]
+    try:
+        for next_record in asyncio.as_completed(futures):
+            if collect(await next_record):
+                return
+    finally:
+        for future in futures:
+            future.cancel()
+        await asyncio.gather(*futures, return_exceptions=True)
+
+
+def run_tasks(
+    tasks: List[Any],
+    runner: Callable[..., Any],
+    task_ids: List[str],
+    workers: int = 1,
+    priorities: Optional[List[int]] = None,
+    timeouts: Optional[List[Optional[float]]] = None,
+    max_failures: Optional[int] = None,
+    initializer: Optional[Callable[..., None]] = None,
+    initargs: Tuple[Any, ...] = (),
+    on_record: Optional[Callable[[Dict[str, Any]], None]] = None,
+    executor: str = EXECUTOR_PROCESS,
+) -> List[Dict[str, Any]]:
+    """
+    Runs the tasks, highest priority first, and returns one execution record per task.
+
+    Records are logged, and passed to `on_record`, as soon as each task finishes. Once `max_failures` tasks failed or
+    timed out, the tasks still running are stopped and the remaining ones are recorded as cancelled.
+
+    The `process` executor runs the tasks in a pool of `workers` processes, the `thread` executor in a pool of
+    `workers` threads of this process. With the `asyncio` executor the runner must return an awaitable, up to
+    `workers` of them are awaited concurrently on an event loop. Tasks running in threads cannot be stopped: when they
+    time out or get cancelled they are recorded right away but run to completion in the background.
+    """
+    if executor not in EXECUTORS:
+        raise Exception(f"Unknown executor {executor}, expected one of {EXECUTORS}")
+    task_priorities = priorities or [0] * len(tasks)
+    task_timeouts = timeouts or [None] * len(tasks)
+    order = sorted(range(len(tasks)), key=lambda i: -task_priorities[i])
+    items = [(i, task_ids[i], tasks[i], runner, task_timeouts[i]) for i in order]
+
+    records: Dict[int, Dict[str, Any]] = {}
+    failures = 0
+
+    def _collect(record: Dict[str, Any]) -> bool:
+        nonlocal failures
+        records[record["index"]] = record
+        logger.info(
+            "Task %s %s in %.2fs (%s/%s done)",
+            record["task"],
+            record["status"],
+            record["duration"],
+            len(records),
+            len(tasks),
+        )
+        if on_record:
+            on_record(record)
+        if record["status"] != STATUS_SUCCEEDED:
+            failures += 1
+        return max_failures is not None and failures >= max_failures
+
+    if executor == EXECUTOR_PROCESS:
+        _run_processes(items, workers, _collect, initializer, initargs)
+    else:
+        if initializer:
+            initializer(*initargs)
+        if executor == EXECUTOR_THREAD:
+            _run_threads(items, workers, _collect)
+        else:
+            asyncio.run(_run_coroutines(items, workers, _collect))
+
+    for index, task_id, _, _, _ in items:
+        if index not in records:
+            logger.info("Task %s cancelled after %s failures", task_id, failures)
+            records[index] = {
+                "index": index,
+                "task": task_id,
+                "status": STATUS_CANCELLED,
+                "errors": [TasksCancelledError(f"Task {task_id} cancelled after {failures} failures")],
+            }
+    return [records[i] for i in range(len(tasks))]
+
+
+def errors_of(records: List[Dict[str, Any]]) -> List[Exception]:
+    return [e for record in records for e in record["errors"]]
+
+
+def summarize(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    statuses = [r["status"] for r in records]
+    starts = [r["start"] for r in records if "start" in r]
+    ends = [r["end"] for r in records if "end" in r]
+    return {
+        "total": len(records),
+        "succeeded": statuses.count(STATUS_SUCCEEDED),
+        "failed": statuses.count(STATUS_FAILED),
+        "timedOut": statuses.count(STATUS_TIMED_OUT),
+        "cancelled": statuses.count(STATUS_CANCELLED),
+        "start": min(starts) if starts else None,
+        "end": max(ends) if ends else None,
+        "duration": (max(ends) - min(starts)) if starts and ends else 0.0,
+        "tasks": [
+            {**{k: v for k, v in r.items() if k not in ("errors", "index")}, "errors": [str(e) for e in r["errors"]]}
+            for r in records
+        ],
+    }
+
+
+def write_summary(records: List[Dict[str, Any]], output_dir: str, name: str) -> str:
+    """
+    Writes the execution summary as JSON into a local directory or an s3:// prefix and returns its path.
+    """
+    body = json.dumps(summarize(records), indent=2, default=str)
+    path = os.path.join(output_dir, name)
+    if output_dir.startswith("s3:"):
+        bucket, _, key = path[len("s3://") :].partition("/")
+        boto3.client("s3").put_object(Bucket=bucket, Key=key, Body=body.encode("utf-8"))
+    else:
+        os.makedirs(output_dir, exist_ok=True)
+        with open(path, "w") as f:
+            f.write(body)
+    logger.info("Execution summary written to %s", path)
+    return path
@@ -13,24 +13,21 @@
 #    limitations under the License.
 
 
-import base64
 import json
 import logging
 import os
 import re
-import time
 from typing import Any, Dict, List, Optional, Tuple, Union, cast
 from urllib.parse import urlencode, urlparse
 
 import boto3
-import requests
 from flask import Flask, jsonify, render_template, request
-from jose import jwk, jwt
-from jose.utils import base64url_decode
 from kubernetes import dynamic
 from orbit_controller import dynamic_client
+from orbit_controller.utils.jwks_utils import ElbKeyVerifier, JwksVerifier
 
-_cognito_keys: Optional[List[Dict[str, str]]] = None
+_cognito_verifier: Optional[JwksVerifier] = None
+_elb_verifier: Optional[ElbKeyVerifier] = None
 
 
 def is_ready(logger: logging.Logger, app: Flask) -> Any:
@@ -118,18 +115,8 @@ def _get_user_info_from_jwt(logger: logging.Logger) -> Tuple[Any, Any, Optional[
     logger.debug("headers: %s", json.dumps(dict(request.headers)))
     encoded_jwt = request.headers["x-amzn-oidc-data"]
     logger.debug("encoded_jwt 'x-amzn-oidc-data':\n %s", encoded_jwt)
-    jwt_headers = encoded_jwt.split(".")[0]
-    decoded_jwt_headers_bytes = base64.b64decode(jwt_headers)
-    decoded_jwt_headers = decoded_jwt_headers_bytes.decode("utf-8")
-    decoded_json = json.loads(decoded_jwt_headers)
-    kid = decoded_json["kid"]
-    region = os.environ["AWS_REGION"]
-    # Step 2: Get the public key from regional endpoint
-    url = "https://public-keys.auth.elb." + region + ".amazonaws.com/" + kid
-    req = requests.get(url)
-    pub_key = req.text
-    # Step 3: Get the payload
-    payload = jwt.decode(encoded_jwt, pub_key, algorithms=["ES256"])
+    # the public key of the kid is fetched once from the regional endpoint
+    payload = _get_elb_verifier().get_claims(encoded_jwt)
     logger.debug("payload:\n %s", payload)
 
     username = payload["username"]
@@ -140,7 +127,7 @@ def _get_user_info_from_jwt(logger: logging.Logger) -> Tuple[Any, Any, Optional[
 
     groups = None
     if "custom:groups" in payload:
-        groups = payload["custom:groups"].strip("][").split(", ")
+        groups = cast(str, payload["custom:groups"]).strip("][").split(", ")
 
     return email, username, groups
 
@@ -183,45 +170,26 @@ def _get_user_groups_from_jwt(logger: logging.Logger) -> List[str]:
     return user_groups
 
 
-def _get_keys(logger: logging.Logger) -> List[Dict[str, str]]:
-    global _cognito_keys
-    region = os.environ["AWS_REGION"]
-    user_pool_id = os.environ["COGNITO_USERPOOL_ID"]
-    if _cognito_keys is None:
-        logger.debug("Fetching keys...")
-        url: str = f"https://cognito-idp.{region}.amazonaws.com/{user_pool_id}/.well-known/jwks.json"
-        _cognito_keys = cast(List[Dict[str, str]], requests.get(url).json()["keys"])
-    return _cognito_keys
+def _get_cognito_verifier() -> JwksVerifier:
+    global _cognito_verifier
+    if _cognito_verifier is None:
+        region = os.environ["AWS_REGION"]
+        user_pool_id = os.environ["COGNITO_USERPOOL_ID"]
+        url = f"https://cognito-idp.{region}.amazonaws.com/{user_pool_id}/.well-known/jwks.json"
+        _cognito_verifier = JwksVerifier(url)
+    return _cognito_verifier
+
+
+def _get_elb_verifier() -> ElbKeyVerifier:
+    global _elb_verifier
+    if _elb_verifier is None:
+        _elb_verifier = ElbKeyVerifier(os.environ["AWS_REGION"])
+    return _elb_verifier
 
 
 def get_claims(logger: logging.Logger, token: str) -> Dict[str, Union[str, int]]:
-    # client_id = os.environ["COGNITO_APP_CLIENT_ID"]
-    # get the kid from the headers prior to verification
-    headers: Dict[str, str] = cast(Dict[str, str], jwt.get_unverified_headers(token=token))
-    kid: str = headers["kid"]
-    # search for the kid in the downloaded public keys
-    for key in _get_keys(logger):
-        if kid == key["kid"]:
-            # construct the public key
-            public_key = jwk.construct(key_data=key)
-            break
-    else:
-        raise ValueError("Public key not found in JWK.")
-    # get the last two sections of the token,
-    # message and signature (encoded in base64)
-    message, encoded_signature = token.rsplit(".", 1)
-    # decode the signature
-    decoded_signature: bytes = base64url_decode(encoded_signature.encode("utf-8"))
-    # verify the signature
-    if public_key.verify(msg=message.encode("utf8"), sig=decoded_signature) is False:
-        raise RuntimeError("Signature verification failed.")
-    logger.debug("Signature validaded.")
-    # since we passed the verification, we can now safely use the unverified claims
-    claims = jwt.get_unverified_claims(token)
-    # additionally we can verify the token expiration
-    if time.time() > int(claims["exp"]):
-        raise ValueError("Token expired.")
-    logger.debug("Token not expired.")
+    # signature, expiration and the verified claims of the token are cached until it expires
+    claims = _get_cognito_verifier().get_claims(token)
     logger.debug("claims: %s", claims)
 
     return cast(Dict[str, Union[str, int]], claims)
@@ -16,17 +16,21 @@ import logging
 import os
 import threading
 import time
-from queue import Queue
-from typing import Any, Dict, Union, cast
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Union, cast
 
-import boto3
 import kopf
+from kubernetes import dynamic
 from orbit_controller import ORBIT_API_GROUP, ORBIT_API_VERSION, dynamic_client
-from orbit_controller.utils import imagereplication_utils
+from orbit_controller.utils import imagereplication_utils, metrics_utils, sharding_utils
 
 LOCK: threading.Lock
 CONFIG: Dict[str, Any]
 WORKERS_IN_PROCESS: int = 0
+BUILD_CONCURRENCY: int = 0
+# in-flight builds of all the codebuild_monitor timers, refreshed together
+BUILD_MONITOR = imagereplication_utils.BuildMonitor()
 
 
 def _set_globals(logger: Union[kopf.Logger, logging.Logger]) -> None:
@@ -37,8 +41,14 @@ def _set_globals(logger: Union[kopf.Logger, logging.Logger]) -> None:
     CONFIG = imagereplication_utils.get_config()
     logger.info("CONFIG: %s", CONFIG)
 
+    # builds scheduled by the handlers and by replicate_inventory are capped by the CodeBuild project limit
+    global BUILD_CONCURRENCY
+    BUILD_CONCURRENCY = imagereplication_utils.get_build_concurrency(CONFIG)
+    logger.info("BUILD_CONCURRENCY: %s", BUILD_CONCURRENCY)
+
     global WORKERS_IN_PROCESS
     WORKERS_IN_PROCESS = 0
+    metrics_utils.observe_queue("imagereplication_workers", lambda: WORKERS_IN_PROCESS)
 
 
 @kopf.on.startup()
@@ -52,6 +62,8 @@ def configure(settings: kopf.OperatorSettings, logger: kopf.Logger, **_: Any) ->
     settings.persistence.finalizer = "imagereplication-operator.orbit.aws/kopf-finalizer"
     settings.posting.level = logging.getLevelName(os.environ.get("EVENT_LOG_LEVEL", "INFO"))
     _set_globals(logger=logger)
+    metrics_utils.start_metrics_server()
+    sharding_utils.start(settings, [sharding_utils.Touch("ImageReplication", sharding_utils.name_key)])
 
 
 @kopf.on.resume(
@@ -60,6 +72,7 @@ def configure(settings: kopf.OperatorSettings, logger: kopf.Logger, **_: Any) ->
     "imagereplications",
     field="status.replication",
     value=kopf.ABSENT,
+    when=sharding_utils.owns_name,
 )
 @kopf.on.create(
     ORBIT_API_GROUP,
@@ -67,7 +80,9 @@ def configure(settings: kopf.OperatorSettings, logger: kopf.Logger, **_: Any) ->
     "imagereplications",
     field="status.replication",
     value=kopf.ABSENT,
+    when=sharding_utils.owns_name,
 )
+@metrics_utils.timed("imagereplication_operator.replication_checker")
 def replication_checker(
     spec: kopf.Spec,
     status: kopf.Status,
@@ -97,7 +112,9 @@ def replication_checker(
     interval=5,
     field="status.replication.replicationStatus",
     value="Pending",
+    when=sharding_utils.owns_name,
 )
+@metrics_utils.timed("imagereplication_operator.scheduler")
 def scheduler(status: kopf.Status, patch: kopf.Patch, logger: kopf.Logger, **_: Any) -> str:
     replication = status.get("replication", {})
     replication["codeBuildStatus"] = None
@@ -114,7 +131,7 @@ def scheduler(status: kopf.Status, patch: kopf.Patch, logger: kopf.Logger, **_:
         with LOCK:
             global WORKERS_IN_PROCESS
             logger.debug("WORKERS_IN_PROCESS: %s", WORKERS_IN_PROCESS)
-            if WORKERS_IN_PROCESS < CONFIG["workers"]:
+            if WORKERS_IN_PROCESS < BUILD_CONCURRENCY:
                 WORKERS_IN_PROCESS += 1
                 replication["replicationStatus"] = "Scheduled"
                 replication["attempt"] = attempt
@@ -143,8 +160,9 @@ def _needs_rescheduling(status: kopf.Status, **_: Any) -> bool:
     ORBIT_API_VERSION,
     "imagereplications",
     interval=5,
-    when=_needs_rescheduling,
+    when=kopf.all_([_needs_rescheduling, sharding_utils.owns_name]),  # type: ignore
 )
+@metrics_utils.timed("imagereplication_operator.rescheduler")
 def rescheduler(status: kopf.Status, patch: kopf.Patch, logger: kopf.Logger, **_: Any) -> str:
     logger.debug("Rescheduling")
     replication = status.get("replication", {})
@@ -167,7 +185,9 @@ def rescheduler(status: kopf.Status, patch: kopf.Patch, logger: kopf.Logger, **_
     interval=5,
     field="status.replication.replicationStatus",
     value="Scheduled",
+    when=sharding_utils.owns_name,
 )
+@metrics_utils.timed("imagereplication_operator.codebuild_runner")
 def codebuild_runner(
     spec: kopf.Spec,
     patch: kopf.Patch,
@@ -207,14 +227,15 @@ def codebuild_runner(
     interval=20,
     field="status.replication.replicationStatus",
     value="Replicating",
+    when=sharding_utils.owns_name,
 )
+@metrics_utils.timed("imagereplication_operator.codebuild_monitor")
 def codebuild_monitor(status: kopf.Status, patch: kopf.Patch, logger: kopf.Logger, **_: Any) -> str:
     replication = status.get("replication", {})
 
     build_id = replication.get("codeBuildId", None)
 
-    client = boto3.client("codebuild")
-    build = client.batch_get_builds(ids=[build_id])["builds"][0]
+    build = BUILD_MONITOR.get(build_id)
     replication["codeBuildStatus"] = build["buildStatus"]
     replication["codeBuildPhase"] = build["currentPhase"]
 
@@ -241,160 +262,134 @@ def codebuild_monitor(status: kopf.Status, patch: kopf.Patch, logger: kopf.Logge
     return cast(str, replication["codeBuildStatus"])
 
 
-def replication_worker(queue: Queue, statuses: Dict[str, Any], logger: logging.Logger) -> None:  # type: ignore
-    client = dynamic_client()
-
-    while True:
-        destination = queue.get(block=True, timeout=None)
-        with LOCK:
-            source = statuses.get(destination, {}).get("source", None)
-            status = statuses.get(destination, {}).get("status", None)
-
-        patch: Dict[str, Any] = {}
-        spec = {"source": source, "destination": destination}
+def _set_replication_status(
+    replication: Dict[str, Any], client: dynamic.DynamicClient, logger: logging.Logger, **status: Any
+) -> None:
+    replication["status"].update(status)
+    imagereplication_utils.update_imagereplication_status(
+        namespace=replication["namespace"],
+        name=replication["name"],
+        status={"replication": replication["status"]},
+        client=client,
+        logger=logger,
+    )
 
-        if status is None:
-            replication_status = replication_checker(status={}, spec=spec, patch=patch, logger=logger)  # type: ignore
-            if replication_status == "ECRImageExists":
-                logger.info("ECR Image already exists: %s", destination)
-                queue.task_done()
-                continue
-            status = patch
-            namespace, name = imagereplication_utils.create_imagereplication(
-                namespace="orbit-system",
-                source=source,
-                destination=destination,
-                client=client,
-                logger=logger,
-            )
-            statuses[destination]["namespace"] = namespace
-            statuses[destination]["name"] = name
-            logger.debug("New Status: %s", status)
-        else:
-            replication_status = status.get("status", {}).get("replication", {}).get("replicationStatus", None)
 
-        status = {**status, **patch}
-        imagereplication_utils.update_imagereplication_status(
-            namespace=statuses[destination]["namespace"],
-            name=statuses[destination]["name"],
-            status=status["status"],
-            client=client,
-            logger=logger,
-        )
-        logger.info("Replication Checker: %s Source: %s", replication_status, source)
-        if replication_status not in ["Pending", "Failed"]:
-            with LOCK:
-                statuses[destination]["status"] = status
-            queue.task_done()
-            continue
-
-        patch = {}
-        replication_status = scheduler(status=status["status"], patch=patch, logger=logger)  # type: ignore
-        status = {**status, **patch}
-        imagereplication_utils.update_imagereplication_status(
-            namespace=statuses[destination]["namespace"],
-            name=statuses[destination]["name"],
-            status=status["status"],
-            client=client,
-            logger=logger,
-        )
-        logger.info("Scheduler: %s Source: %s", replication_status, source)
-        if replication_status != "Scheduled":
-            with LOCK:
-                statuses[destination]["status"] = status
-            queue.task_done()
-            continue
+def replicate_inventory(images: Dict[str, str], logger: logging.Logger) -> None:
+    """
+    Replicates the images (destination -> source) missing from ECR, batching up to `batch_size` images per CodeBuild
+    build and running as many builds as the CodeBuild project allows. All in-flight builds are monitored together.
+    """
+    client = dynamic_client()
 
-        patch = {}
-        replication_status = codebuild_runner(  # type: ignore
-            spec=cast(kopf.Spec, spec),
-            status=status["status"],
-            patch=cast(kopf.Patch, patch),
-            logger=logger,
-        )
-        status = {**status, **patch}
-        imagereplication_utils.update_imagereplication_status(
-            namespace=statuses[destination]["namespace"],
-            name=statuses[destination]["name"],
-            status=status["status"],
+    # existence checks are independent ECR calls
+    with ThreadPoolExecutor(max_workers=CONFIG["workers"]) as executor:
+        replicated = executor.map(lambda d: imagereplication_utils.image_replicated(d, logger), list(images))
+        pending = [destination for destination, exists in zip(list(images), replicated) if not exists]
+    logger.info("%s images already replicated, %s to replicate", len(images) - len(pending), len(pending))
+
+    replications: Dict[str, Dict[str, Any]] = {}
+    for destination in pending:
+        namespace, name = imagereplication_utils.create_imagereplication(
+            namespace="orbit-system",
+            source=images[destination],
+            destination=destination,
             client=client,
             logger=logger,
         )
-        logger.info("CodeBuild Runner: %s Source: %s", replication_status, source)
-        if replication_status != "Replicating":
-            if _needs_rescheduling(status=cast(kopf.Status, patch)):
-                queue.put(destination)
-
-            with LOCK:
-                statuses[destination]["status"] = status
-            queue.task_done()
+        replications[destination] = {"namespace": namespace, "name": name, "status": {"attempt": 0}}
+        _set_replication_status(replications[destination], client, logger, replicationStatus="Pending")
+
+    queue = deque(pending)
+    in_flight: Dict[str, List[str]] = {}
+    # the gauge is read from the metrics server thread, so it never iterates in_flight while this loop mutates it
+    in_flight_images = 0
+    metrics_utils.observe_queue("imagereplication_inventory", lambda: len(queue) + in_flight_images)
+    logger.info("Replicating with %s concurrent builds of up to %s images", BUILD_CONCURRENCY, CONFIG["batch_size"])
+
+    def _retry_or_fail(destination: str) -> None:
+        if replications[destination]["status"]["attempt"] < CONFIG["max_replication_attempts"]:
+            _set_replication_status(replications[destination], client, logger, replicationStatus="Pending")
+            queue.append(destination)
+        else:
+            _set_replication_status(replications[destination], client, logger, replicationStatus="MaxAttemptsExceeded")
+
+    while queue or in_flight:
+        while queue and len(in_flight) < BUILD_CONCURRENCY:
+            batch = [queue.popleft() for _ in range(min(CONFIG["batch_size"], len(queue)))]
+            build_id, error = imagereplication_utils.replicate_images([(images[d], d) for d in batch], CONFIG)
+            for destination in batch:
+                replication = replications[destination]
+                _set_replication_status(
+                    replication,
+                    client,
+                    logger,
+                    replicationStatus="Failed" if error else "Replicating",
+                    attempt=replication["status"]["attempt"] + 1,
+                    codeBuildId=build_id,
+                )
+            if error:
+                logger.error("Error starting replication of %s images: %s", len(batch), error)
+                for destination in batch:
+                    _retry_or_fail(destination)
+                time.sleep(30)
+            else:
+                logger.info("CodeBuildId: %s replicating %s images", build_id, len(batch))
+                in_flight[cast(str, build_id)] = batch
+                in_flight_images += len(batch)
+                BUILD_MONITOR.track(cast(str, build_id))
+
+        if not in_flight:
             continue
-
-        patch = {}
-        replication_status = codebuild_monitor(status=status["status"], patch=patch, logger=logger)  # type: ignore
-        status = {**status, **patch}
-        imagereplication_utils.update_imagereplication_status(
-            namespace=statuses[destination]["namespace"],
-            name=statuses[destination]["name"],
-            status=status["status"],
-            client=client,
-            logger=logger,
-        )
-        logger.info("CodeBuild Monitor: %s Source: %s", replication_status, source)
-        while replication_status == "IN_PROGRESS":
-            time.sleep(20)
-            patch = {}
-            replication_status = codebuild_monitor(status=status["status"], patch=patch, logger=logger)  # type: ignore
-            status = {**status, **patch}
-
-        logger.info("CodeBuild Monitor: %s Source: %s", replication_checker, source)
-        if replication_status != "SUCCEEDED" and _needs_rescheduling(status=status["status"]):
-            queue.put(destination)
-
-        with LOCK:
-            statuses[destination]["status"] = status
-        imagereplication_utils.update_imagereplication_status(
-            namespace=statuses[destination]["namespace"],
-            name=statuses[destination]["name"],
-            status=status["status"],
-            client=client,
-            logger=logger,
-        )
-        queue.task_done()
-        continue
+        time.sleep(20)
+        for build_id, build in BUILD_MONITOR.refresh().items():
+            if build["buildStatus"] == "IN_PROGRESS" or build_id not in in_flight:
+                continue
+            logger.info("CodeBuildId: %s BuildStatus: %s", build_id, build["buildStatus"])
+            batch = in_flight.pop(build_id)
+            in_flight_images -= len(batch)
+            for destination in batch:
+                replication = replications[destination]
+                codebuild_attempts = replication["status"].get("codeBuildAttempts", [])
+                codebuild_attempts.append(
+                    {
+                        "codeBuildId": build_id,
+                        "codeBuildStatus": build["buildStatus"],
+                        "codeBuildPhase": build["currentPhase"],
+                    }
+                )
+                # a failed build may still have pushed most of its images
+                if build["buildStatus"] == "SUCCEEDED" or imagereplication_utils.image_replicated(
+                    destination, logger, use_cache=False
+                ):
+                    imagereplication_utils.mark_replicated(destination)
+                    _set_replication_status(
+                        replication, client, logger, replicationStatus="Complete", codeBuildAttempts=codebuild_attempts
+                    )
+                else:
+                    _set_replication_status(replication, client, logger, codeBuildAttempts=codebuild_attempts)
+                    _retry_or_fail(destination)
 
 
 if __name__ == "__main__":
     from orbit_controller import logger
 
     _set_globals(logger=logger)
+    metrics_utils.start_metrics_server()
 
-    statuses = {}
-    queue = Queue()  # type: ignore
-
-    logger.info("Priming work queue from inventory of known images")
+    logger.info("Loading inventory of known images")
     inventory_path = os.environ.get("INVENTORY_OVERRIDE", "/var/orbit-controller/image_inventory.txt")
     logger.info("Inventory Path: %s", inventory_path)
+    rewriter = imagereplication_utils.ImageRewriter(CONFIG)
+    images = {}
     with open(inventory_path, "r") as inventory:
         for source_image in inventory:
             source_image = source_image.strip()
-            desired_image = imagereplication_utils.get_desired_image(image=source_image, config=CONFIG)
-            if source_image != desired_image:
+            desired_image = rewriter.rewrite(source_image)
+            if source_image != desired_image and rewriter.is_replica(desired_image):
                 logger.debug("Queueing: %s", desired_image)
-                statuses[desired_image] = {
-                    "source": source_image,
-                    "destination": desired_image,
-                    "status": None,
-                }
-                queue.put(desired_image)
-
-    for i in range(CONFIG["workers"]):
-        threading.Thread(
-            target=replication_worker,
-            daemon=True,
-            name=f"Worker-{i}",
-            kwargs={"queue": queue, "statuses": statuses, "logger": logger},
-        ).start()
-    queue.join()
+                images[desired_image] = source_image
+
+    replicate_inventory(images, logger)
 
     logger.info("ImageReplications Complete")
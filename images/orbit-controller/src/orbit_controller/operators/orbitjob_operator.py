@@ -15,11 +15,12 @@
 import json
 import logging
 import os
-from typing import Any, Dict, List, Optional, Tuple, cast
+from typing import Any, Dict, List, Mapping, Optional, Tuple, cast
 
 import boto3
 import botocore
 import kopf
+from kubernetes import dynamic
 from kubernetes.client import (
     BatchV1Api,
     BatchV1beta1Api,
@@ -30,10 +31,14 @@ from kubernetes.client import (
     V1Job,
     V1ObjectMeta,
 )
-from orbit_controller import ORBIT_API_GROUP, ORBIT_API_VERSION
-from orbit_controller.utils import job_utils
+from orbit_controller import ORBIT_API_GROUP, ORBIT_API_VERSION, dynamic_client
+from orbit_controller.utils import job_utils, metrics_utils, sharding_utils
 
 ENV_CONTEXT: Optional[Dict[str, Any]] = None
+ORBITJOBS_API: Optional[dynamic.Resource] = None
+# Status is propagated on Job/CronJob events, the timers only reconcile missed events
+RECONCILE_INTERVAL = float(os.environ.get("ORBITJOB_RECONCILE_INTERVAL", "120"))
+TERMINAL_JOB_STATUSES = ["Complete", "Failed"]
 
 
 def _get_parameter(client: boto3.client, name: str) -> Optional[Dict[str, Any]]:
@@ -49,8 +54,16 @@ def _load_env_context_from_ssm(env_name: str) -> Optional[Dict[str, Any]]:
     return _get_parameter(ssm, name=context_parameter_name)
 
 
-@kopf.on.startup()
-def configure(settings: kopf.OperatorSettings, logger: kopf.Logger, **_: Any) -> None:
+@kopf.on.startup()  # type: ignore
+def configure(
+    settings: kopf.OperatorSettings,
+    logger: kopf.Logger,
+    namespaces_idx: kopf.Index[str, Dict[str, Any]],
+    podsettings_idx: kopf.Index[Tuple[str, str], Dict[str, Any]],
+    jobs_idx: kopf.Index[Tuple[str, str], Dict[str, Any]],
+    cron_jobs_idx: kopf.Index[Tuple[str, str], Dict[str, Any]],
+    **_: Any,
+) -> None:
     settings.persistence.progress_storage = kopf.MultiProgressStorage(
         [
             kopf.AnnotationsProgressStorage(prefix="orbit.aws"),
@@ -59,6 +72,12 @@ def configure(settings: kopf.OperatorSettings, logger: kopf.Logger, **_: Any) ->
     )
     settings.persistence.finalizer = "orbitjob-operator.orbit.aws/kopf-finalizer"
     settings.posting.level = logging.getLevelName(os.environ.get("EVENT_LOG_LEVEL", "INFO"))
+    metrics_utils.start_metrics_server()
+    metrics_utils.observe_index("namespaces_idx", namespaces_idx)
+    metrics_utils.observe_index("podsettings_idx", podsettings_idx)
+    metrics_utils.observe_index("jobs_idx", jobs_idx)
+    metrics_utils.observe_index("cron_jobs_idx", cron_jobs_idx)
+    sharding_utils.start(settings, [sharding_utils.Touch("OrbitJob", sharding_utils.namespace_key)])
 
 
 def _should_index_jobs(meta: kopf.Meta, logger: kopf.Logger, **_: Any) -> bool:
@@ -69,13 +88,87 @@ def _should_index_jobs(meta: kopf.Meta, logger: kopf.Logger, **_: Any) -> bool:
         return False
 
 
+def _orbit_job_name(meta: kopf.Meta) -> str:
+    orbit_job_reference = [owner_reference for owner_reference in meta.get("ownerReferences", [{}])].pop()
+    return cast(str, orbit_job_reference.get("name"))
+
+
 @kopf.index("jobs", when=_should_index_jobs)  # type: ignore
 def jobs_idx(
     namespace: str, logger: kopf.Logger, name: str, meta: kopf.Meta, status: kopf.Status, **_: Any
 ) -> Dict[Tuple[str, str], Dict[str, Any]]:
     """Index of k8s jobs by orbitjob namespace/name"""
-    orbit_job_reference = [owner_reference for owner_reference in meta.get("ownerReferences", [{}])].pop()
-    return {(namespace, orbit_job_reference.get("name")): {"namespace": namespace, "name": name, "status": status}}
+    return {(namespace, _orbit_job_name(meta)): {"namespace": namespace, "name": name, "status": status}}
+
+
+@kopf.index(ORBIT_API_GROUP, ORBIT_API_VERSION, "orbitjobs")  # type: ignore
+def orbitjobs_idx(namespace: str, name: str, status: kopf.Status, **_: Any) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    """Index of the orbitJobOperator status of orbitjobs by namespace/name"""
+    return {(namespace, name): dict(status.get("orbitJobOperator", {}))}
+
+
+def _patch_orbitjob_status(namespace: str, name: str, orbit_job_status: Dict[str, Any]) -> None:
+    global ORBITJOBS_API
+    if ORBITJOBS_API is None:
+        ORBITJOBS_API = dynamic_client().resources.get(
+            api_version=ORBIT_API_VERSION, group=ORBIT_API_GROUP, kind="OrbitJob"
+        )
+    ORBITJOBS_API.patch(
+        namespace=namespace,
+        name=name,
+        body={"status": {"orbitJobOperator": orbit_job_status}},
+        content_type="application/merge-patch+json",
+    )
+
+
+def _get_orbit_job_status(
+    namespace: str, name: str, orbitjobs_idx: kopf.Index[Tuple[str, str], Dict[str, Any]]
+) -> Optional[Dict[str, Any]]:
+    orbit_job_status = next(iter(orbitjobs_idx.get((namespace, name), [])), None)
+    # OrbitJobs still being created by create_job are left to the timers
+    if not orbit_job_status or "jobName" not in orbit_job_status:
+        return None
+    return orbit_job_status
+
+
+def _job_status(name: str, k8s_job_status: Mapping[str, Any]) -> Dict[str, Any]:
+    if k8s_job_status.get("active") == 1:
+        job_status = "Active"
+    else:
+        job_status = k8s_job_status.get("conditions", [{}])[0].get("type")
+
+    return {
+        "jobStatus": job_status,
+        "jobName": name,
+        "k8sJobReason": k8s_job_status.get("conditions", [{}])[0].get("status"),
+        "k8sJobMessage": k8s_job_status.get("conditions", [{}])[0].get("message"),
+    }
+
+
+@kopf.on.event("jobs", when=kopf.all_([_should_index_jobs, sharding_utils.owns_namespace]))  # type: ignore
+@metrics_utils.timed("orbitjob_operator.k8s_job_event")
+def k8s_job_event(
+    type: Optional[str],
+    namespace: str,
+    name: str,
+    meta: kopf.Meta,
+    status: kopf.Status,
+    logger: kopf.Logger,
+    orbitjobs_idx: kopf.Index[Tuple[str, str], Dict[str, Any]],
+    **_: Any,
+) -> None:
+    if type == "DELETED":
+        return
+    orbit_job_name = _orbit_job_name(meta)
+    orbit_job_status = _get_orbit_job_status(namespace, orbit_job_name, orbitjobs_idx)
+    if orbit_job_status is None or orbit_job_status.get("jobStatus") in TERMINAL_JOB_STATUSES:
+        return
+
+    job_status = _job_status(name, status)
+    if all(orbit_job_status.get(key) == value for key, value in job_status.items()):
+        return
+    logger.debug("OrbitJob %s/%s jobStatus: %s", namespace, orbit_job_name, job_status["jobStatus"])
+    _patch_orbitjob_status(namespace, orbit_job_name, job_status)
 
 
 def _monitor_k8s_job(
@@ -84,7 +177,7 @@ def _monitor_k8s_job(
     **_: Any,
 ) -> bool:
     if (status.get("create_job", "")).startswith("Job"):
-        if status.get("orbitJobOperator", {}).get("jobStatus", None) in ["Complete", "Failed"]:
+        if status.get("orbitJobOperator", {}).get("jobStatus", None) in TERMINAL_JOB_STATUSES:
             return False
         else:
             return True
@@ -113,8 +206,19 @@ def _should_process_orbitjob(status: kopf.Status, **_: Any) -> bool:
     return "orbitJobOperator" not in status or "jobStatus" not in status["orbitJobOperator"]
 
 
-@kopf.on.resume(ORBIT_API_GROUP, ORBIT_API_VERSION, "orbitjobs", when=_should_process_orbitjob)  # type: ignore
-@kopf.on.create(ORBIT_API_GROUP, ORBIT_API_VERSION, "orbitjobs", when=_should_process_orbitjob)
+@kopf.on.resume(  # type: ignore
+    ORBIT_API_GROUP,
+    ORBIT_API_VERSION,
+    "orbitjobs",
+    when=kopf.all_([_should_process_orbitjob, sharding_utils.owns_namespace]),  # type: ignore
+)
+@kopf.on.create(
+    ORBIT_API_GROUP,
+    ORBIT_API_VERSION,
+    "orbitjobs",
+    when=kopf.all_([_should_process_orbitjob, sharding_utils.owns_namespace]),  # type: ignore
+)
+@metrics_utils.timed("orbitjob_operator.create_job")
 def create_job(
     namespace: str,
     name: str,
@@ -227,8 +331,14 @@ def create_job(
 
 
 @kopf.on.timer(  # type: ignore
-    ORBIT_API_GROUP, ORBIT_API_VERSION, "orbitjobs", interval=5, initial_delay=5, when=_monitor_k8s_job
+    ORBIT_API_GROUP,
+    ORBIT_API_VERSION,
+    "orbitjobs",
+    interval=RECONCILE_INTERVAL,
+    initial_delay=5,
+    when=kopf.all_([_monitor_k8s_job, sharding_utils.owns_namespace]),  # type: ignore
 )
+@metrics_utils.timed("orbitjob_operator.orbit_job_monitor")
 def orbit_job_monitor(
     namespace: str,
     name: str,
@@ -256,23 +366,9 @@ def orbit_job_monitor(
     if k8s_job is None:  # To tackle the race condition caused by Timer
         return "JobMetadataNotFound"
 
-    if k8s_job.get("status", {}).get("active") == 1:
-        job_status = "Active"
-    else:
-        job_status = k8s_job.get("status", {}).get("conditions", [{}])[0].get("type")
-
-    k8s_job_reason = k8s_job.get("status", {}).get("conditions", [{}])[0].get("status")
-    k8s_job_message = k8s_job.get("status", {}).get("conditions", [{}])[0].get("message")
-
-    patch["status"] = {
-        "orbitJobOperator": {
-            "jobStatus": job_status,
-            "jobName": k8s_job.get("name"),
-            "k8sJobReason": k8s_job_reason,
-            "k8sJobMessage": k8s_job_message,
-        }
-    }
-    return job_status
+    job_status = _job_status(cast(str, k8s_job.get("name")), k8s_job.get("status", {}))
+    patch["status"] = {"orbitJobOperator": job_status}
+    return job_status["jobStatus"]
 
 
 @kopf.index("batch", "v1beta1", "cronjobs", when=_should_index_jobs)  # type: ignore
@@ -280,8 +376,50 @@ def cron_jobs_idx(
     namespace: str, logger: kopf.Logger, name: str, meta: kopf.Meta, status: kopf.Status, **_: Any
 ) -> Dict[Tuple[str, str], Dict[str, Any]]:
     """Index of k8s Cron jobs by orbitjob namespace/name"""
-    orbit_job_reference = [owner_reference for owner_reference in meta.get("ownerReferences", [{}])].pop()
-    return {(namespace, orbit_job_reference.get("name")): {"namespace": namespace, "name": name, "status": status}}
+    return {(namespace, _orbit_job_name(meta)): {"namespace": namespace, "name": name, "status": status}}
+
+
+def _cron_job_status(
+    name: str, k8s_cron_job_status: Mapping[str, Any], orbit_job_status: Dict[str, Any]
+) -> Dict[str, Any]:
+    cron_job_ids: List[str] = list(orbit_job_status.get("cronJobIds", []))
+    for active_job in k8s_cron_job_status.get("active", []):
+        if active_job.get("name") not in cron_job_ids:
+            cron_job_ids.append(active_job.get("name"))
+
+    return {
+        "jobStatus": "Active" if k8s_cron_job_status else "Activating",
+        "jobName": name,
+        "cronJobIds": cron_job_ids,
+    }
+
+
+@kopf.on.event(  # type: ignore
+    "batch", "v1beta1", "cronjobs", when=kopf.all_([_should_index_jobs, sharding_utils.owns_namespace])  # type: ignore
+)
+@metrics_utils.timed("orbitjob_operator.k8s_cron_job_event")
+def k8s_cron_job_event(
+    type: Optional[str],
+    namespace: str,
+    name: str,
+    meta: kopf.Meta,
+    status: kopf.Status,
+    logger: kopf.Logger,
+    orbitjobs_idx: kopf.Index[Tuple[str, str], Dict[str, Any]],
+    **_: Any,
+) -> None:
+    if type == "DELETED":
+        return
+    orbit_job_name = _orbit_job_name(meta)
+    orbit_job_status = _get_orbit_job_status(namespace, orbit_job_name, orbitjobs_idx)
+    if orbit_job_status is None or orbit_job_status.get("jobStatus") in TERMINAL_JOB_STATUSES:
+        return
+
+    cron_job_status = _cron_job_status(name, status, orbit_job_status)
+    if all(orbit_job_status.get(key) == value for key, value in cron_job_status.items()):
+        return
+    logger.debug("OrbitJob %s/%s cronJobIds: %s", namespace, orbit_job_name, cron_job_status["cronJobIds"])
+    _patch_orbitjob_status(namespace, orbit_job_name, cron_job_status)
 
 
 def _monitor_k8s_cron_job(
@@ -290,7 +428,7 @@ def _monitor_k8s_cron_job(
     **_: Any,
 ) -> bool:
     if (status.get("create_job", "")).startswith("Cron"):
-        if status.get("orbitJobOperator", {}).get("jobStatus", None) in ["Complete", "Failed"]:
+        if status.get("orbitJobOperator", {}).get("jobStatus", None) in TERMINAL_JOB_STATUSES:
             return False
         else:
             return True
@@ -299,8 +437,14 @@ def _monitor_k8s_cron_job(
 
 
 @kopf.on.timer(  # type: ignore
-    ORBIT_API_GROUP, ORBIT_API_VERSION, "orbitjobs", interval=5, initial_delay=5, when=_monitor_k8s_cron_job
+    ORBIT_API_GROUP,
+    ORBIT_API_VERSION,
+    "orbitjobs",
+    interval=RECONCILE_INTERVAL,
+    initial_delay=5,
+    when=kopf.all_([_monitor_k8s_cron_job, sharding_utils.owns_namespace]),  # type: ignore
 )
+@metrics_utils.timed("orbitjob_operator.orbit_cron_job_monitor")
 def orbit_cron_job_monitor(
     namespace: str,
     name: str,
@@ -330,32 +474,8 @@ def orbit_cron_job_monitor(
     if k8s_job is None:  # To tackle the race condition caused by Timer
         return "JobMetadataNotFound"
 
-    if not k8s_job.get("status", {}):
-        cron_job_status = "Activating"
-    else:
-        cron_job_status = "Active"
-
-    if k8s_job.get("status"):
-        for i in k8s_job.get("status", {}).get("active", [{}]):
-            if i.get("name") not in status.get("orbitJobOperator", {}).get("cronJobIds", []):
-                cron_job_ids: List[str] = status.get("orbitJobOperator", {}).get("cronJobIds", [])
-                cron_job_ids.append(i.get("name"))
-                patch["status"] = {
-                    "orbitJobOperator": {
-                        "jobStatus": cron_job_status,
-                        "jobName": k8s_job.get("name"),
-                        "cronJobIds": cron_job_ids,
-                    }
-                }
-            else:
-                return cron_job_status
-    else:
-        patch["status"] = {
-            "orbitJobOperator": {
-                "jobStatus": cron_job_status,
-                "jobName": k8s_job.get("name"),
-                "cronJobIds": status.get("orbitJobOperator", {}).get("cronJobIds", []),
-            }
-        }
-
-    return cron_job_status
+    cron_job_status = _cron_job_status(
+        cast(str, k8s_job.get("name")), k8s_job.get("status", {}), status.get("orbitJobOperator", {})
+    )
+    patch["status"] = {"orbitJobOperator": cron_job_status}
+    return cron_job_status["jobStatus"]
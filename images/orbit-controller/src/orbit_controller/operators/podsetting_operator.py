@@ -12,13 +12,14 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
+import functools
 import logging
 import os
 from typing import Any, Dict
 
 import kopf
 from orbit_controller import ORBIT_API_GROUP, ORBIT_API_VERSION, dynamic_client
-from orbit_controller.utils import poddefault_utils
+from orbit_controller.utils import metrics_utils, poddefault_utils, sharding_utils
 
 
 @kopf.on.startup()
@@ -31,6 +32,8 @@ def configure(settings: kopf.OperatorSettings, logger: kopf.Logger, **_: Any) ->
     )
     settings.persistence.finalizer = "podsetting-operator.orbit.aws/kopf-finalizer"
     settings.posting.level = logging.getLevelName(os.environ.get("EVENT_LOG_LEVEL", "INFO"))
+    metrics_utils.start_metrics_server()
+    sharding_utils.start(settings, [sharding_utils.Touch("PodSetting", sharding_utils.namespace_key)])
 
 
 def _should_index_namespaces(labels: kopf.Labels, **_: Any) -> bool:
@@ -59,11 +62,22 @@ def _should_process_podsetting(labels: kopf.Labels, status: kopf.Status, **_: An
     )
 
 
-@kopf.on.resume(ORBIT_API_GROUP, ORBIT_API_VERSION, "podsettings", when=_should_process_podsetting)  # type: ignore
-@kopf.on.create(ORBIT_API_GROUP, ORBIT_API_VERSION, "podsettings", when=_should_process_podsetting)
+@kopf.on.resume(  # type: ignore
+    ORBIT_API_GROUP,
+    ORBIT_API_VERSION,
+    "podsettings",
+    when=kopf.all_([_should_process_podsetting, sharding_utils.owns_namespace]),  # type: ignore
+)
+@kopf.on.create(
+    ORBIT_API_GROUP,
+    ORBIT_API_VERSION,
+    "podsettings",
+    when=kopf.all_([_should_process_podsetting, sharding_utils.owns_namespace]),  # type: ignore
+)
 def create_poddefaults(
     namespace: str,
     name: str,
+    uid: str,
     labels: kopf.Labels,
     spec: kopf.Spec,
     status: kopf.Status,
@@ -85,21 +99,34 @@ def create_poddefaults(
         labels={"orbit/space": "team", "orbit/team": team},
     )
     user_namespaces = [ns.get("name") for ns in namespaces_idx.get(team, [])]
-    poddefault_utils.copy_poddefaults_to_user_namespaces(
-        poddefaults=[poddefault],
-        user_namespaces=user_namespaces,
-        client=dynamic_client(),
-        logger=logger,
+    # the fan-out runs in the background, the handler is retried until it completes and has no failed namespaces
+    summary = poddefault_utils.run_in_background(
+        owner=uid,
+        key=("create", poddefault["spec"]["desc"]),
+        func=functools.partial(
+            poddefault_utils.copy_poddefaults_to_user_namespaces,
+            poddefaults=[poddefault],
+            user_namespaces=user_namespaces,
+            client=dynamic_client(),
+            logger=logger,
+        ),
     )
+    poddefault_utils.raise_on_failures("copy", summary)
 
     patch["status"] = {"podDefaultsCreation": "Complete"}
     return "PodDefaultsCreated"
 
 
-@kopf.on.update(ORBIT_API_GROUP, ORBIT_API_VERSION, "podsettings", when=_should_process_podsetting)  # type: ignore
+@kopf.on.update(  # type: ignore
+    ORBIT_API_GROUP,
+    ORBIT_API_VERSION,
+    "podsettings",
+    when=kopf.all_([_should_process_podsetting, sharding_utils.owns_namespace]),  # type: ignore
+)
 def update_poddefaults(
     namespace: str,
     name: str,
+    uid: str,
     labels: kopf.Labels,
     spec: kopf.Spec,
     logger: kopf.Logger,
@@ -118,20 +145,33 @@ def update_poddefaults(
         labels={"orbit/space": "team", "orbit/team": team},
     )
     user_namespaces = [namespace["name"] for namespace in namespaces_idx.get(team, [])]
-    poddefault_utils.modify_poddefaults_in_user_namespaces(
-        poddefaults=[poddefault],
-        user_namespaces=user_namespaces,
-        client=dynamic_client(),
-        logger=logger,
+    # the fan-out runs in the background, the handler is retried until it completes and has no failed namespaces
+    summary = poddefault_utils.run_in_background(
+        owner=uid,
+        key=("update", poddefault["spec"]["desc"]),
+        func=functools.partial(
+            poddefault_utils.modify_poddefaults_in_user_namespaces,
+            poddefaults=[poddefault],
+            user_namespaces=user_namespaces,
+            client=dynamic_client(),
+            logger=logger,
+        ),
     )
+    poddefault_utils.raise_on_failures("modify", summary)
 
     return "PodDefaultsUpdated"
 
 
-@kopf.on.delete(ORBIT_API_GROUP, ORBIT_API_VERSION, "podsettings", when=_should_process_podsetting)  # type: ignore
+@kopf.on.delete(  # type: ignore
+    ORBIT_API_GROUP,
+    ORBIT_API_VERSION,
+    "podsettings",
+    when=kopf.all_([_should_process_podsetting, sharding_utils.owns_namespace]),  # type: ignore
+)
 def delete_poddefaults(
     namespace: str,
     name: str,
+    uid: str,
     labels: kopf.Labels,
     spec: kopf.Spec,
     logger: kopf.Logger,
@@ -150,11 +190,18 @@ def delete_poddefaults(
         labels={"orbit/space": "team", "orbit/team": team},
     )
     user_namespaces = [namespace["name"] for namespace in namespaces_idx.get(team, [])]
-    poddefault_utils.delete_poddefaults_from_user_namespaces(
-        poddefaults=[poddefault],
-        user_namespaces=user_namespaces,
-        client=dynamic_client(),
-        logger=logger,
+    # the fan-out runs in the background, the handler is retried until it completes and has no failed namespaces
+    summary = poddefault_utils.run_in_background(
+        owner=uid,
+        key=("delete", poddefault["spec"]["desc"]),
+        func=functools.partial(
+            poddefault_utils.delete_poddefaults_from_user_namespaces,
+            poddefaults=[poddefault],
+            user_namespaces=user_namespaces,
+            client=dynamic_client(),
+            logger=logger,
+        ),
     )
+    poddefault_utils.raise_on_failures("delete", summary)
 
     return "PodDefaultsDeleted"
@@ -12,10 +12,13 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
+import functools
 import json
 import logging
 import os
-from typing import Any
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, NamedTuple, Set
 
 import kopf
 from kubernetes import dynamic
@@ -72,68 +75,167 @@ def uninstall_team(namespace: str, name: str, spec: kopf.Spec, patch: kopf.Patch
     team_spec = spec.get("team", None)
     logger.info(f"Preparing to Destroy all resources in team namespace {namespace}")
     if team_spec:
-        _remove_team_resources(namespace=namespace, team_spec=team_spec, logger=logger)
-        _remove_user_namespaces(namespace=namespace, team_spec=team_spec, logger=logger)
-        patch["status"] = {"teamspaceOperator": {"status": "DeleteProcessed"}}
+        progress = _Progress(namespace=namespace, name=name, logger=logger)
+        failed = _run_plan(_plan_teardown(team_spec=team_spec, logger=logger), progress=progress, logger=logger)
+        patch["status"] = {"teamspaceOperator": {"status": "DeleteProcessed", **progress.summary(), "failed": failed}}
     else:
         logging.warn("Team spec not found...moving on")
     return "Uninstalled"
 
 
-def _remove_user_namespaces(namespace: str, team_spec: str, logger: kopf.Logger, **_: Any):  # type: ignore
-    logger.info(
-        f"Removing all user namespaces with labels orbit/team={team_spec},orbit/space=user in namespace {namespace} "
-    )
+# List all the resources we want to force-delete:
+# group, version, plural, status_element
+CUSTOM_OBJECT_LIST = [
+    ["sagemaker.aws.amazon.com", "v1", "hyperparametertuningjobs", "trainingJobStatus"],
+    ["sagemaker.aws.amazon.com", "v1", "trainingjobs", "trainingJobStatus"],
+    ["sagemaker.aws.amazon.com", "v1", "batchtransformjobs", "transformJobStatus"],
+    ["sagemaker.aws.amazon.com", "v1", "hostingdeployments", "status"],
+    ["kubeflow.org", "v1", "notebooks", "NA"],
+    ["kubeflow.org", "v1", "profile", "NA"],
+    ["batch", "v1", "jobs", "NA"],
+    ["apps", "v1", "deployments", "NA"],
+    ["apps", "v1", "statefulsets", "NA"],
+]
+STUBBORN_CUSTOM_OBJECT_LIST = CUSTOM_OBJECT_LIST[0:4]
+TEARDOWN_WORKERS = int(os.environ.get("TEAMSPACE_TEARDOWN_WORKERS", "8"))
+PROGRESS_INTERVAL_SECONDS = 5.0
 
-    v1 = CoreV1Api()
-    label_selector = f"orbit/team={team_spec},orbit/space=user"
-    all_namespaces = v1.list_namespace(label_selector=label_selector).to_dict()
 
-    all_ns = [
-        item.get("metadata").get("name") for item in all_namespaces["items"] if item.get("metadata", {}).get("name")
-    ]
-    for ns in all_ns:
-        logger.info(f"Calling delete namespace {ns}")
+class _Step(NamedTuple):
+    func: Callable[[], None]
+    depends_on: List[str]
+
+
+class _Progress:
+    """Reports the progress of a teardown through the TeamSpace status, at most every PROGRESS_INTERVAL_SECONDS"""
+
+    def __init__(self, namespace: str, name: str, logger: kopf.Logger) -> None:
+        self.namespace = namespace
+        self.name = name
+        self.logger = logger
+        self.total = self.completed = self.errors = 0
+        self._reported = 0.0
+
+    def summary(self) -> Dict[str, int]:
+        return {"totalSteps": self.total, "completedSteps": self.completed, "failedSteps": self.errors}
+
+    def update(self, error: bool = False, force: bool = False) -> None:
+        if error:
+            self.errors += 1
+        if not force and time.monotonic() - self._reported < PROGRESS_INTERVAL_SECONDS:
+            return
+        self._reported = time.monotonic()
         try:
-            v1.delete_namespace(name=ns, async_req=True)
+            CustomObjectsApi().patch_namespaced_custom_object(
+                group=ORBIT_API_GROUP,
+                version=ORBIT_API_VERSION,
+                plural="teamspaces",
+                namespace=self.namespace,
+                name=self.name,
+                body={"status": {"teamspaceOperator": {"status": "Deleting", **self.summary()}}},
+            )
         except ApiException as e:
-            logger.warn("calling CoreV1API->delete_namespace had an error: %s\n" % e)
+            self.logger.warn("Unable to report the teardown progress: %s" % e)
 
 
-def _remove_team_resources(namespace: str, team_spec: str, logger: kopf.Logger, **_: Any):  # type: ignore
-    v1 = CoreV1Api()
-    logger.info(f"_remove_team_resources looking with orbit/label={team_spec}")
-    # Get all the namespaces with the team label
-    label_selector = f"orbit/team={team_spec}"
-    all_namespaces = v1.list_namespace(label_selector=label_selector).to_dict()
-    all_ns = [
+def _run_plan(plan: Dict[str, _Step], progress: _Progress, logger: kopf.Logger) -> List[str]:
+    """
+    Runs the steps of plan on TEARDOWN_WORKERS threads, each step as soon as the steps it depends on are done (failed
+    or not). Returns the failed steps.
+    """
+    progress.total = len(plan)
+    progress.update(force=True)
+    done: Set[str] = set()
+    failed: List[str] = []
+    running: Dict["Future[None]", str] = {}
+    pending = dict(plan)
+    with ThreadPoolExecutor(max_workers=TEARDOWN_WORKERS, thread_name_prefix="teardown") as executor:
+        while pending or running:
+            for key, step in list(pending.items()):
+                if all(dep in done or dep not in plan for dep in step.depends_on):
+                    running[executor.submit(step.func)] = key
+                    del pending[key]
+            if not running:
+                raise Exception(f"Teardown steps {list(pending)} depend on each other")
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                key = running.pop(future)
+                done.add(key)
+                progress.completed += 1
+                if future.exception() is not None:
+                    logger.warn("Teardown step %s failed: %s", key, future.exception())
+                    failed.append(key)
+                progress.update(error=future.exception() is not None)
+    progress.update(force=True)
+    return failed
+
+
+def _list_namespaces(label_selector: str) -> List[str]:
+    all_namespaces = CoreV1Api().list_namespace(label_selector=label_selector).to_dict()
+    return [
         item.get("metadata").get("name") for item in all_namespaces["items"] if item.get("metadata", {}).get("name")
     ]
-    # List all the resources we want to force-delete:
-    # group, version, plural, status_element
-    custom_object_list = [
-        ["sagemaker.aws.amazon.com", "v1", "hyperparametertuningjobs", "trainingJobStatus"],
-        ["sagemaker.aws.amazon.com", "v1", "trainingjobs", "trainingJobStatus"],
-        ["sagemaker.aws.amazon.com", "v1", "batchtransformjobs", "transformJobStatus"],
-        ["sagemaker.aws.amazon.com", "v1", "hostingdeployments", "status"],
-        ["kubeflow.org", "v1", "notebooks", "NA"],
-        ["kubeflow.org", "v1", "profile", "NA"],
-        ["batch", "v1", "jobs", "NA"],
-        ["apps", "v1", "deployments", "NA"],
-        ["apps", "v1", "statefulsets", "NA"],
-    ]
 
-    for namespace in all_ns:
-        logger.info(f"Looking at NS {namespace}")
 
-        for co in custom_object_list:
-            _delete_custom_objects(group=co[0], version=co[1], plural=co[2], namespace=namespace, logger=logger)
-        _delete_pods(namespace=namespace, logger=logger)
+def _plan_teardown(team_spec: str, logger: kopf.Logger) -> Dict[str, _Step]:
+    """
+    Plans the teardown of the team namespaces: in each namespace the workloads and custom resources are deleted, then
+    the pods left behind. The stubborn SageMaker custom resources of all the namespaces are then released in batches,
+    and the user namespaces deleted once empty.
+    """
+    logger.info(f"_plan_teardown looking with orbit/label={team_spec}")
+    # Get all the namespaces with the team label
+    all_ns = _list_namespaces(label_selector=f"orbit/team={team_spec}")
+    user_ns = _list_namespaces(label_selector=f"orbit/team={team_spec},orbit/space=user")
+    logger.info("Tearing down namespaces %s, user namespaces %s", all_ns, user_ns)
 
-        for co in custom_object_list[0:4]:
-            _patch_and_delete_stubborn_custom_resources(
-                group=co[0], version=co[1], plural=co[2], status_element=co[3], namespace=namespace, logger=logger
+    plan: Dict[str, _Step] = {}
+    for namespace in all_ns:
+        for group, version, plural, _ in CUSTOM_OBJECT_LIST:
+            plan[f"{namespace}/{plural}"] = _Step(
+                functools.partial(
+                    _delete_custom_objects,
+                    group=group,
+                    version=version,
+                    plural=plural,
+                    namespace=namespace,
+                    logger=logger,
+                    use_async=False,
+                ),
+                [],
             )
+        # pods once their controllers are gone, so they are not recreated
+        plan[f"{namespace}/pods"] = _Step(
+            functools.partial(_delete_pods, namespace=namespace, logger=logger, use_async=False),
+            [f"{namespace}/{co[2]}" for co in CUSTOM_OBJECT_LIST],
+        )
+    for group, version, plural, status_element in STUBBORN_CUSTOM_OBJECT_LIST:
+        plan[f"*/{plural}/finalizers"] = _Step(
+            functools.partial(
+                _patch_and_delete_stubborn_custom_resources,
+                group=group,
+                version=version,
+                plural=plural,
+                namespaces=all_ns,
+                status_element=status_element,
+                logger=logger,
+            ),
+            [f"{namespace}/{plural}" for namespace in all_ns],
+        )
+    for namespace in user_ns:
+        plan[f"namespace/{namespace}"] = _Step(
+            functools.partial(_delete_namespace, namespace=namespace, logger=logger),
+            [key for key in plan if key.startswith(f"{namespace}/") or key.startswith("*/")],
+        )
+    return plan
+
+
+def _delete_namespace(namespace: str, logger: kopf.Logger) -> None:
+    logger.info(f"Calling delete namespace {namespace}")
+    try:
+        CoreV1Api().delete_namespace(name=namespace)
+    except ApiException as e:
+        logger.warn("calling CoreV1API->delete_namespace had an error: %s\n" % e)
 
 
 def _delete_pods(namespace: str, logger: kopf.Logger, use_async=True, **_: Any):  # type: ignore
@@ -177,38 +279,61 @@ def _delete_custom_objects(  # type: ignore
         logger.warn("Assume it did not exist")
 
 
-def _patch_and_delete_stubborn_custom_resources(  # type: ignore
+def _patch_and_delete_stubborn_custom_resource(
+    group: str, version: str, plural: str, namespace: str, name: str, logger: kopf.Logger
+) -> None:
+    co = CustomObjectsApi()
+    try:
+        logger.info(f"Patching item {name} in {plural}.{group}")
+        patch = json.loads("""{"metadata":{"finalizers":[]}}""")
+        co.patch_namespaced_custom_object(
+            group=group, version=version, plural=plural, namespace=namespace, name=name, body=patch
+        )
+        logger.info(f"Deleting item {name} in {plural}.{group}")
+        co.delete_namespaced_custom_object(
+            group=group,
+            version=version,
+            plural=plural,
+            namespace=namespace,
+            name=name,
+        )
+    except ApiException as e:
+        logger.warn("Trying to patch and delete failed: %s\n" % e)
+
+
+def _patch_and_delete_stubborn_custom_resources(
     group: str,
     version: str,
     plural: str,
-    namespace: str,
+    namespaces: List[str],
     status_element: str,
     logger: kopf.Logger,
-    use_async=True,
-    **_: Any,
-):
-    logger.info(f"_patch_and_delete_stubborn_custom_resources for {plural}.{group} in namespace {namespace}")
-    co = CustomObjectsApi()
-    resp = co.list_namespaced_custom_object(group=group, version=version, plural=plural, namespace=namespace)
+) -> None:
+    """Releases the stubborn custom resources of all the namespaces, listed at once and patched concurrently"""
+    logger.info(f"_patch_and_delete_stubborn_custom_resources for {plural}.{group} in namespaces {namespaces}")
+    try:
+        resp = CustomObjectsApi().list_cluster_custom_object(group=group, version=version, plural=plural)
+    except ApiException as e:
+        if e.status == 404:
+            logger.info(f"{plural}.{group} not found, skipping")
+            return
+        raise
     failed_res = [
-        item.get("metadata").get("name")
+        (item["metadata"]["namespace"], item["metadata"]["name"])
         for item in resp["items"]
-        if item.get("status", {}).get(status_element) in ["Failed", "Completed", "InProgress"]
+        if item["metadata"].get("namespace") in namespaces
+        and item.get("status", {}).get(status_element) in ["Failed", "Completed", "InProgress"]
     ]
-    for item in failed_res:
-        try:
-            logger.info(f"Patching item {item} in {plural}.{group}")
-            patch = json.loads("""{"metadata":{"finalizers":[]}}""")
-            co.patch_namespaced_custom_object(
-                group=group, version=version, plural=plural, namespace=namespace, name=item, body=patch
-            )
-            logger.info(f"Deleting item {item} in {plural}.{group}")
-            co.delete_namespaced_custom_object(
+    if not failed_res:
+        return
+    with ThreadPoolExecutor(max_workers=min(TEARDOWN_WORKERS, len(failed_res))) as executor:
+        for namespace, name in failed_res:
+            executor.submit(
+                _patch_and_delete_stubborn_custom_resource,
                 group=group,
                 version=version,
                 plural=plural,
                 namespace=namespace,
-                name=item,
+                name=name,
+                logger=logger,
             )
-        except ApiException as e:
-            logger.warn("Trying to patch and delete failed: %s\n" % e)
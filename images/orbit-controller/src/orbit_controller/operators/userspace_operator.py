@@ -15,20 +15,26 @@
 import json
 import logging
 import os
-import random
-import string
 import time
-from typing import Any, Dict, Optional, cast
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, cast
 
 import boto3
 import kopf
 from kubernetes.client import CoreV1Api, V1ConfigMap
 from orbit_controller import ORBIT_API_GROUP, ORBIT_API_VERSION, dynamic_client, load_config, run_command
-from orbit_controller.utils import poddefault_utils
+from orbit_controller.utils import helm_utils, metrics_utils, poddefault_utils, sharding_utils
 
+HELM_REPOS = helm_utils.HelmRepoCache()
 
-@kopf.on.startup()
-def configure(settings: kopf.OperatorSettings, logger: kopf.Logger, **_: Any) -> None:
+
+@kopf.on.startup()  # type: ignore
+def configure(
+    settings: kopf.OperatorSettings,
+    logger: kopf.Logger,
+    podsettings_idx: kopf.Index[str, Dict[str, Any]],
+    **_: Any,
+) -> None:
     settings.persistence.progress_storage = kopf.MultiProgressStorage(
         [
             kopf.AnnotationsProgressStorage(prefix="orbit.aws"),
@@ -37,6 +43,11 @@ def configure(settings: kopf.OperatorSettings, logger: kopf.Logger, **_: Any) ->
     )
     settings.persistence.finalizer = "userspace-operator.orbit.aws/kopf-finalizer"
     settings.posting.level = logging.getLevelName(os.environ.get("EVENT_LOG_LEVEL", "INFO"))
+    # UserSpaces are installed concurrently, mostly waiting on helm
+    settings.execution.max_workers = int(os.environ.get("USERSPACE_OPERATOR_MAX_WORKERS", "32"))
+    metrics_utils.start_metrics_server()
+    metrics_utils.observe_index("podsettings_idx", podsettings_idx)
+    sharding_utils.start(settings, [sharding_utils.Touch("UserSpace", sharding_utils.team_key)])
 
 
 def _should_index_podsetting(labels: kopf.Labels, **_: Any) -> bool:
@@ -160,6 +171,49 @@ def _get_team_context(team: str, logger: kopf.Logger) -> Dict[str, Any]:
     return team_context
 
 
+def _install_helm_charts(
+    name: str,
+    team: str,
+    user: str,
+    user_email: str,
+    user_efsapid: str,
+    charts: List[str],
+    logger: kopf.Logger,
+) -> Optional[str]:
+    """Installs the charts of the user concurrently, returns the name of a failed chart"""
+    repo = helm_utils.repo_name(team)
+    releases = helm_utils.list_releases(namespace=team, prefix=f"{name}-")
+    logger.info("current installed releases: %s", releases)
+
+    def install(chart_name: str) -> bool:
+        helm_release = f"{name}-{chart_name}"
+        logger.info(f"install the helm package chart_name={chart_name} helm_release={helm_release}")
+        install_status = _install_helm_chart(
+            helm_release=helm_release,
+            namespace=name,
+            team=team,
+            user=user,
+            user_email=user_email,
+            user_efsapid=user_efsapid,
+            repo=repo,
+            package=chart_name,
+            logger=logger,
+        )
+        if install_status:
+            logger.info("Helm release %s installed at %s", helm_release, name)
+        return install_status
+
+    # do not install again the chart if its already installed as some charts are not upgradable.
+    pending = [chart_name for chart_name in charts if f"{name}-{chart_name}" not in releases]
+    if not pending:
+        return None
+    with ThreadPoolExecutor(max_workers=min(helm_utils.HELM_INSTALL_WORKERS, len(pending))) as executor:
+        for chart_name, install_status in zip(pending, executor.map(install, pending)):
+            if not install_status:
+                return chart_name
+    return None
+
+
 def _should_process_userspace(annotations: kopf.Annotations, spec: kopf.Spec, **_: Any) -> bool:
     return "orbit/helm-chart-installation" not in annotations and spec.get("space", None) == "user"
 
@@ -170,7 +224,7 @@ def _should_process_userspace(annotations: kopf.Annotations, spec: kopf.Spec, **
     "userspaces",
     field="status.userSpaceOperator.installationStatus",
     value=kopf.ABSENT,
-    when=_should_process_userspace,
+    when=kopf.all_([_should_process_userspace, sharding_utils.owns_team]),  # type: ignore
 )
 @kopf.on.create(
     ORBIT_API_GROUP,
@@ -178,8 +232,9 @@ def _should_process_userspace(annotations: kopf.Annotations, spec: kopf.Spec, **
     "userspaces",
     field="status.userSpaceOperator.installationStatus",
     value=kopf.ABSENT,
-    when=_should_process_userspace,
+    when=kopf.all_([_should_process_userspace, sharding_utils.owns_team]),  # type: ignore
 )
+@metrics_utils.timed("userspace_operator.install_team")
 def install_team(
     name: str,
     meta: kopf.Meta,
@@ -234,54 +289,19 @@ def install_team(
 
     team_context = _get_team_context(team=team, logger=logger)
     logger.info("team context keys: %s", team_context.keys())
-    helm_repo_url = team_context["UserHelmRepository"]
-    logger.debug("Adding Helm Repository: %s at %s", team, helm_repo_url)
-    repo = f"{team}--userspace"
-    # add the team repo
-    unique_hash = "".join(random.choice(string.ascii_lowercase) for i in range(6))
-    run_command(f"helm repo add {repo} {helm_repo_url}")
-    try:
-        # In isolated envs, we cannot refresh stable, and since we don't use it, we remove it
-        run_command("helm repo remove stable")
-    except Exception:
-        logger.info("Tried to remove stable repo...got an error, but moving on")
-    run_command("helm repo update")
-    run_command(f"helm search repo --devel {repo} -o json > /tmp/{unique_hash}-charts.json")
-    with open(f"/tmp/{unique_hash}-charts.json", "r") as f:
-        charts = json.load(f)
-    run_command(f"helm list -n {team} -o json > /tmp/{unique_hash}-releases.json")
-    with open(f"/tmp/{unique_hash}-releases.json", "r") as f:
-        releaseList = json.load(f)
-        releases = [r["name"] for r in releaseList]
-        logger.info("current installed releases: %s", releases)
-
-    for chart in charts:
-        chart_name = chart["name"].split("/")[1]
-        helm_release = f"{name}-{chart_name}"
-        # do not install again the chart if its already installed as some charts are not upgradable.
-        # namespaces might
-        if helm_release not in releaseList:
-            # install the helm package for this user space
-            logger.info(f"install the helm package chart_name={chart_name} helm_release={helm_release}")
-            install_status = _install_helm_chart(
-                helm_release=helm_release,
-                namespace=name,
-                team=team,
-                user=user,
-                user_email=user_email,
-                user_efsapid=access_point_id,
-                repo=repo,
-                package=chart_name,
-                logger=logger,
-            )
-            if install_status:
-                logger.info("Helm release %s installed at %s", helm_release, name)
-                continue
-            else:
-                patch["status"] = {
-                    "userSpaceOperator": {"installationStatus": "Failed to install", "chart_name": chart_name}
-                }
-                return "Failed"
+    charts = HELM_REPOS.charts(team=team, url=team_context["UserHelmRepository"], logger=logger)
+    failed_chart = _install_helm_charts(
+        name=name,
+        team=team,
+        user=user,
+        user_email=user_email,
+        user_efsapid=access_point_id,
+        charts=charts,
+        logger=logger,
+    )
+    if failed_chart is not None:
+        patch["status"] = {"userSpaceOperator": {"installationStatus": "Failed to install", "chart_name": failed_chart}}
+        return "Failed"
 
     logger.info("Copying PodDefaults from Team")
     logger.info("podsettings_idx:%s", podsettings_idx)
@@ -306,7 +326,8 @@ def install_team(
     return "Installed"
 
 
-@kopf.on.delete(ORBIT_API_GROUP, ORBIT_API_VERSION, "userspaces")  # type: ignore
+@kopf.on.delete(ORBIT_API_GROUP, ORBIT_API_VERSION, "userspaces", when=sharding_utils.owns_team)  # type: ignore
+@metrics_utils.timed("userspace_operator.uninstall_team_charts")
 def uninstall_team_charts(
     name: str,
     annotations: kopf.Annotations,
@@ -351,22 +372,11 @@ def uninstall_team_charts(
         _delete_user_efs_endpoint(user_name=user, user_namespace=f"{team}-{user}", logger=logger, meta=meta)
         team_context = _get_team_context(team=team, logger=logger)
         logger.info("team context keys: %s", team_context.keys())
-        helm_repo_url = team_context["UserHelmRepository"]
-        repo = f"{team}--userspace"
-        # add the team repo
-        unique_hash = "".join(random.choice(string.ascii_lowercase) for i in range(6))
-        run_command(f"helm repo add {repo} {helm_repo_url}")
-        run_command(f"helm search repo --devel {repo} -o json > /tmp/{unique_hash}-charts.json")
-        with open(f"/tmp/{unique_hash}-charts.json", "r") as f:
-            charts = json.load(f)
-        run_command(f"helm list -n {team} -o json > /tmp/{unique_hash}-releases.json")
-        with open(f"/tmp/{unique_hash}-releases.json", "r") as f:
-            releaseList = json.load(f)
-            releases = [r["name"] for r in releaseList]
-            logger.info("current installed releases: %s", releases)
-
-        for chart in charts:
-            chart_name = chart["name"].split("/")[1]
+        charts = HELM_REPOS.charts(team=team, url=team_context["UserHelmRepository"], logger=logger)
+        releases = helm_utils.list_releases(namespace=team, prefix=f"{name}-")
+        logger.info("current installed releases: %s", releases)
+
+        for chart_name in charts:
             helm_release = f"{name}-{chart_name}"
             if helm_release in releases:
                 install_status = _uninstall_chart(helm_release=helm_release, namespace=team, logger=logger)
@@ -0,0 +1,97 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License").
+#    You may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import json
+import os
+import subprocess
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple
+
+import kopf
+from orbit_controller import run_command
+
+HELM_REPO_CACHE_TTL_SECONDS = float(os.environ.get("HELM_REPO_CACHE_TTL_SECONDS", "300"))
+HELM_INSTALL_WORKERS = int(os.environ.get("HELM_INSTALL_WORKERS", "4"))
+
+
+def repo_name(team: str) -> str:
+    return f"{team}--userspace"
+
+
+def run_json(cmd: str) -> Any:
+    """Runs a helm command printing JSON, stderr (warnings) is kept out of the parsed output"""
+    result = subprocess.run(cmd, shell=True, capture_output=True, timeout=29, universal_newlines=True)
+    if result.returncode != 0:
+        raise Exception(result.stderr)
+    return json.loads(result.stdout or "[]")
+
+
+def list_releases(namespace: str, prefix: str) -> List[str]:
+    """Names of the releases of namespace starting with prefix"""
+    releases = run_json(f"helm list -n {namespace} --filter '^{prefix}' -o json")
+    return [r["name"] for r in releases]
+
+
+class _RepoIndex(NamedTuple):
+    url: str
+    charts: List[str]
+    fetched: float
+
+
+class HelmRepoCache:
+    """
+    In-process cache of the charts of the team user Helm repositories.
+
+    A team repository is added, updated and searched once per `ttl_seconds`, or as soon as its url in the team context
+    changes, instead of once per UserSpace. Concurrent lookups of a team wait on a single refresh.
+    """
+
+    def __init__(self, ttl_seconds: float = HELM_REPO_CACHE_TTL_SECONDS) -> None:
+        self.ttl_seconds = ttl_seconds
+        self._indexes: Dict[str, _RepoIndex] = {}
+        self._team_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        # helm repo add/remove/update rewrite the shared repositories file
+        self._repos_lock = threading.Lock()
+        self._stable_removed = False
+
+    def _team_lock(self, team: str) -> threading.Lock:
+        with self._lock:
+            return self._team_locks.setdefault(team, threading.Lock())
+
+    def _refresh(self, team: str, url: str, logger: kopf.Logger) -> List[str]:
+        repo = repo_name(team)
+        logger.debug("Adding Helm Repository: %s at %s", team, url)
+        with self._repos_lock:
+            run_command(f"helm repo add --force-update {repo} {url}")
+            if not self._stable_removed:
+                try:
+                    # In isolated envs, we cannot refresh stable, and since we don't use it, we remove it
+                    run_command("helm repo remove stable")
+                except Exception:
+                    logger.info("Tried to remove stable repo...got an error, but moving on")
+                self._stable_removed = True
+            run_command("helm repo update")
+        charts = [chart["name"].split("/")[1] for chart in run_json(f"helm search repo --devel {repo} -o json")]
+        logger.info("Helm Repository %s charts: %s", repo, charts)
+        return charts
+
+    def charts(self, team: str, url: str, logger: kopf.Logger) -> List[str]:
+        with self._team_lock(team):
+            index = self._indexes.get(team)
+            if index is None or index.url != url or time.time() - index.fetched > self.ttl_seconds:
+                index = _RepoIndex(url=url, charts=self._refresh(team, url, logger), fetched=time.time())
+                self._indexes[team] = index
+            return index.charts
@@ -12,10 +12,14 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
+import fnmatch
+import functools
 import logging
 import os
 import re
-from typing import Any, Dict, Optional, Tuple, Union
+import threading
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Pattern, Tuple, Union, cast
 
 import boto3
 import kopf
@@ -23,9 +27,27 @@ import yaml
 from kubernetes import dynamic
 from orbit_controller import ORBIT_API_GROUP, ORBIT_API_VERSION
 
+# Images found in ECR are cached for ECR_CACHE_TTL seconds, images not found for ECR_NEGATIVE_CACHE_TTL seconds
+ECR_CACHE_TTL = int(os.environ.get("ECR_CACHE_TTL", "3600"))
+ECR_NEGATIVE_CACHE_TTL = int(os.environ.get("ECR_NEGATIVE_CACHE_TTL", "60"))
+BATCH_GET_BUILDS_MAX_IDS = 100
+DOCKER_HUB_REGISTRY = "docker.io"
 
-def _generate_buildspec(repo_host: str, repo_prefix: str, src: str, dest: str) -> Dict[str, Any]:
-    repo = dest.replace(f"{repo_host}/", "").split(":")[0]
+_image_cache: Dict[str, Tuple[bool, float]] = {}
+_image_cache_lock = threading.Lock()
+
+
+def _generate_batch_buildspec(repo_host: str, repo_prefix: str, images: List[Tuple[str, str]]) -> Dict[str, Any]:
+    repos = sorted(set(dest.replace(f"{repo_host}/", "").split(":")[0] for _, dest in images))
+    build_commands = []
+    for src, dest in images:
+        # a failed image does not stop the others, the build fails at the end if any image failed
+        build_commands.append(
+            f"(docker pull {src} && docker tag {src} {dest} && docker push {dest}) "
+            f"|| echo {dest} >> /tmp/failed-images.txt"
+        )
+        build_commands.append(f"docker rmi {src} {dest} || true")
+    build_commands.append("if [ -s /tmp/failed-images.txt ]; then cat /tmp/failed-images.txt; exit 1; fi")
     build_spec = {
         "version": 0.2,
         "phases": {
@@ -44,19 +66,16 @@ def _generate_buildspec(repo_host: str, repo_prefix: str, src: str, dest: str) -
                     "/var/scripts/retrieve_docker_creds.py && echo 'Docker logins successful' "
                     "|| echo 'Docker logins failed'",
                     f"aws ecr get-login-password | docker login --username AWS --password-stdin {repo_host}",
+                ]
+                + [
                     (
                         f"aws ecr create-repository --repository-name {repo} "
                         f"--tags Key=Env,Value={repo_prefix} || echo 'Already exists'"
-                    ),
-                ]
-            },
-            "build": {
-                "commands": [
-                    f"docker pull {src}",
-                    f"docker tag {src} {dest}",
-                    f"docker push {dest}",
+                    )
+                    for repo in repos
                 ]
             },
+            "build": {"commands": build_commands},
         },
     }
     return build_spec
@@ -88,13 +107,36 @@ def get_config() -> Dict[str, Any]:
         "codebuild_image": os.environ.get("ORBIT_CODEBUILD_IMAGE", ""),
         "replicate_external_repos": os.environ.get("REPLICATE_EXTERNAL_REPOS", "False").lower() in ["true", "yes", "1"],
         "workers": int(os.environ.get("WORKERS", "4")),
+        "batch_size": int(os.environ.get("REPLICATION_BATCH_SIZE", "10")),
         "max_replication_attempts": int(os.environ.get("MAX_REPLICATION_ATTEMPTS", "3")),
+        "pin_digests": os.environ.get("REPLICATION_PIN_DIGESTS", "False").lower() in ["true", "yes", "1"],
+        "rewrite_rules": yaml.safe_load(os.environ.get("REPLICATION_RULES", "")) or [],
     }
     return config
 
 
+def get_build_concurrency(config: Dict[str, Any]) -> int:
+    """
+    Returns the number of replication builds to run at once: the configured workers, capped by the concurrent build
+    limit of the CodeBuild project when it has one.
+    """
+    try:
+        projects = boto3.client("codebuild").batch_get_projects(names=[config["codebuild_project"]])["projects"]
+        limit = projects[0].get("concurrentBuildLimit") if projects else None
+    except Exception:
+        limit = None
+    return min(config["workers"], limit) if limit else int(config["workers"])
+
+
 def replicate_image(src: str, dest: str, config: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
-    buildspec = yaml.safe_dump(_generate_buildspec(config["repo_host"], config["repo_prefix"], src, dest))
+    return replicate_images([(src, dest)], config)
+
+
+def replicate_images(images: List[Tuple[str, str]], config: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Starts one CodeBuild build replicating every (source, destination) image pair.
+    """
+    buildspec = yaml.safe_dump(_generate_batch_buildspec(config["repo_host"], config["repo_prefix"], images))
 
     try:
         client = boto3.client("codebuild")
@@ -111,27 +153,124 @@ def replicate_image(src: str, dest: str, config: Dict[str, Any]) -> Tuple[Option
         return None, str(e)
 
 
-def get_desired_image(image: str, config: Dict[str, Any]) -> str:
-    external_ecr_match = re.compile(r"^[0-9]{12}\.dkr\.ecr\..+\.amazonaws.com/")
-    public_ecr_match = re.compile(r"^public.ecr.aws/.+/")
+def _split_registry(image: str) -> Tuple[str, str]:
+    head, sep, tail = image.partition("/")
+    if sep and ("." in head or ":" in head or head == "localhost"):
+        return head, tail
+    return DOCKER_HUB_REGISTRY, image
 
-    if image.startswith(config["repo_host"]):
-        return image
-    elif external_ecr_match.match(image):
-        if config["replicate_external_repos"]:
-            return external_ecr_match.sub(
-                f"{config['repo_host']}/{config['repo_prefix']}/",
-                image.replace("@sha256", ""),
-            )
+
+def _compile_glob(pattern: Optional[str]) -> Optional[Pattern[str]]:
+    return re.compile(fnmatch.translate(pattern)) if pattern else None
+
+
+def _prefix_path(prefix: str, image: str, path: str) -> str:
+    return prefix + path
+
+
+def _prefix_image(prefix: str, image: str, path: str) -> str:
+    return prefix + image
+
+
+def _prefix_repository_name(prefix: str, image: str, path: str) -> str:
+    return prefix + path.rsplit("/", 1)[1]
+
+
+class _Rule(NamedTuple):
+    registry: Pattern[str]
+    repository: Optional[Pattern[str]]
+    # (image without digest marker, path after the registry) -> destination, None leaves the image untouched
+    rewrite: Optional[Callable[[str, str], str]]
+    pin_digest: bool
+
+
+class ImageRewriter:
+    """
+    Rewrites pod images to their replicas. The replication config is compiled once into an ordered rule table, the
+    first rule matching the registry (and repository) of an image wins, and results are memoized per image.
+
+    Extra rules come first, from the `rewrite_rules` config (REPLICATION_RULES), a list of:
+
+        registry: glob of the registry host, docker.io for images without one
+        repository: optional glob of the repository path
+        action: replicate (into REPO_HOST/REPO_PREFIX), mirror (to the `mirror` registry prefix) or skip
+        mirror: registry prefix used by the mirror action, e.g. mirror.gcr.io
+        pinDigest: leave images referenced by digest untouched, instead of replicating the digest as a tag
+    """
+
+    def __init__(self, config: Dict[str, Any], cache_size: int = 4096) -> None:
+        self.replica_prefix = f"{config['repo_host']}/{config['repo_prefix']}/"
+        # images already in the replica registry are never rewritten
+        self.rules = [_Rule(re.compile(re.escape(config["repo_host"]) + "$"), None, None, False)]
+        self.rules.extend(self._compile_rule(rule, config) for rule in config.get("rewrite_rules", []))
+        self.rules.extend(self._builtin_rules(config))
+        self.rewrite = functools.lru_cache(maxsize=cache_size)(self._rewrite)
+
+    @staticmethod
+    def _compile_rule(rule: Dict[str, Any], config: Dict[str, Any]) -> _Rule:
+        replica_prefix = f"{config['repo_host']}/{config['repo_prefix']}/"
+        action = rule.get("action", "replicate")
+        rewrite: Optional[Callable[[str, str], str]]
+        if action == "replicate":
+            rewrite = functools.partial(_prefix_path, replica_prefix)
+        elif action == "mirror":
+            if not rule.get("mirror"):
+                raise Exception(f"Replication rule {rule} is missing the mirror registry")
+            rewrite = functools.partial(_prefix_path, rule["mirror"].rstrip("/") + "/")
+        elif action == "skip":
+            rewrite = None
         else:
-            return image
-    elif public_ecr_match.match(image):
-        return public_ecr_match.sub(
-            f"{config['repo_host']}/{config['repo_prefix']}/",
-            image.replace("@sha256", ""),
+            raise Exception(f"Unknown action {action} in replication rule {rule}")
+        return _Rule(
+            registry=cast(Pattern[str], _compile_glob(rule.get("registry", "*"))),
+            repository=_compile_glob(rule.get("repository")),
+            rewrite=rewrite,
+            pin_digest=bool(rule.get("pinDigest", config.get("pin_digests", False))),
         )
-    else:
-        return f"{config['repo_host']}/{config['repo_prefix']}/{image.replace('@sha256', '')}"
+
+    @staticmethod
+    def _builtin_rules(config: Dict[str, Any]) -> List[_Rule]:
+        replica_prefix = f"{config['repo_host']}/{config['repo_prefix']}/"
+        pin_digest = bool(config.get("pin_digests", False))
+        return [
+            _Rule(
+                re.compile(r"[0-9]{12}\.dkr\.ecr\..+\.amazonaws\.com$"),
+                None,
+                functools.partial(_prefix_path, replica_prefix) if config["replicate_external_repos"] else None,
+                pin_digest,
+            ),
+            # public.ecr.aws images keep their last path component only
+            _Rule(
+                re.compile(r"public\.ecr\.aws$"),
+                re.compile(r".+/.+"),
+                functools.partial(_prefix_repository_name, replica_prefix),
+                pin_digest,
+            ),
+            _Rule(re.compile(".*"), None, functools.partial(_prefix_image, replica_prefix), pin_digest),
+        ]
+
+    def _rewrite(self, image: str) -> str:
+        registry, path = _split_registry(image)
+        for rule in self.rules:
+            if not rule.registry.match(registry) or (rule.repository and not rule.repository.match(path)):
+                continue
+            if rule.rewrite is None or (rule.pin_digest and "@sha256:" in image):
+                return image
+            return rule.rewrite(image.replace("@sha256", ""), path.replace("@sha256", ""))
+        return image
+
+    def is_replica(self, image: str) -> bool:
+        """
+        Whether image is replicated into REPO_HOST/REPO_PREFIX, as opposed to mirrored or left untouched.
+        """
+        return image.startswith(self.replica_prefix)
+
+
+def get_desired_image(image: str, config: Dict[str, Any]) -> str:
+    """
+    Returns the replica of image. Compiles the rules on every call, hold an ImageRewriter to rewrite many images.
+    """
+    return ImageRewriter(config, cache_size=0).rewrite(image)
 
 
 def create_imagereplication(
@@ -156,23 +295,86 @@ def create_imagereplication(
     return metadata.get("namespace", None), metadata.get("name", None)
 
 
-def image_replicated(image: str, logger: Union[kopf.Logger, logging.Logger]) -> bool:
+def image_replicated(image: str, logger: Union[kopf.Logger, logging.Logger], use_cache: bool = True) -> bool:
+    now = time.time()
+    if use_cache:
+        with _image_cache_lock:
+            cached = _image_cache.get(image)
+        if cached and cached[1] > now:
+            return cached[0]
+
+    client = boto3.client("ecr")
     try:
         repo, tag = image.split(":")
         repo = "/".join(repo.split("/")[1:])
-        client = boto3.client("ecr")
-        paginator = client.get_paginator("list_images")
-        for page in paginator.paginate(repositoryName=repo):
-            for imageId in page["imageIds"]:
-                if imageId.get("imageTag", None) == tag:
-                    logger.info("ECR Repository contains Image: %s", image)
-                    return True
-        logger.debug("Tag %s not found in ECR Repository %s", tag, repo)
-        return False
+        client.describe_images(repositoryName=repo, imageIds=[{"imageTag": tag}])
+        logger.info("ECR Repository contains Image: %s", image)
+        exists = True
+    except (client.exceptions.ImageNotFoundException, client.exceptions.RepositoryNotFoundException):
+        logger.debug("Image %s not found in ECR", image)
+        exists = False
     except Exception as e:
         logger.warn(str(e))
         return False
 
+    with _image_cache_lock:
+        _image_cache[image] = (exists, now + (ECR_CACHE_TTL if exists else ECR_NEGATIVE_CACHE_TTL))
+    return exists
+
+
+def mark_replicated(image: str) -> None:
+    with _image_cache_lock:
+        _image_cache[image] = (True, time.time() + ECR_CACHE_TTL)
+
+
+class BuildMonitor:
+    """
+    Tracks the in-flight replication builds and refreshes all of them with batch_get_builds calls, at most once every
+    `min_refresh_seconds`, instead of one call per build.
+    """
+
+    def __init__(self, min_refresh_seconds: float = 10) -> None:
+        self.min_refresh_seconds = min_refresh_seconds
+        self._lock = threading.Lock()
+        self._tracked: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._refreshed = 0.0
+
+    def track(self, build_id: str) -> None:
+        with self._lock:
+            self._tracked.setdefault(build_id, None)
+
+    def refresh(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Refreshes the tracked builds, completed builds are returned once and no longer tracked.
+        """
+        with self._lock:
+            build_ids = list(self._tracked)
+            client = boto3.client("codebuild")
+            for i in range(0, len(build_ids), BATCH_GET_BUILDS_MAX_IDS):
+                response = client.batch_get_builds(ids=build_ids[i : i + BATCH_GET_BUILDS_MAX_IDS])
+                for build in response["builds"]:
+                    self._tracked[build["id"]] = build
+                for build_id in response.get("buildsNotFound", []):
+                    del self._tracked[build_id]
+            self._refreshed = time.time()
+            builds = {build_id: build for build_id, build in self._tracked.items() if build}
+            for build_id, build in builds.items():
+                if build["buildStatus"] != "IN_PROGRESS":
+                    del self._tracked[build_id]
+            return builds
+
+    def get(self, build_id: str) -> Dict[str, Any]:
+        with self._lock:
+            build = self._tracked.get(build_id)
+            fresh = build is not None and time.time() - self._refreshed < self.min_refresh_seconds
+        if fresh:
+            return cast(Dict[str, Any], build)
+        self.track(build_id)
+        builds = self.refresh()
+        if build_id not in builds:
+            raise Exception(f"CodeBuild build {build_id} not found")
+        return builds[build_id]
+
 
 def update_imagereplication_status(
     namespace: str,
@@ -136,8 +136,25 @@ def construct_job_spec(
     if "labels" in compute:
         converted_compute["labels"] = compute["labels"]
     if "container" in compute:
+        converted_container = {}
         if "concurrentProcesses" in compute["container"]:
-            converted_compute["container"] = {"p_concurrent": compute["container"]["concurrentProcesses"]}
+            converted_container["p_concurrent"] = compute["container"]["concurrentProcesses"]
+        if "kernelPool" in compute["container"]:
+            converted_container["kernel_pool"] = compute["container"]["kernelPool"]
+        if "kernelPoolMaxTasks" in compute["container"]:
+            converted_container["kernel_pool_max_tasks"] = compute["container"]["kernelPoolMaxTasks"]
+        if "preloadImports" in compute["container"]:
+            converted_container["preload_imports"] = compute["container"]["preloadImports"]
+        if "maxFailures" in compute["container"]:
+            converted_container["max_failures"] = compute["container"]["maxFailures"]
+        if "taskTimeout" in compute["container"]:
+            converted_container["task_timeout"] = compute["container"]["taskTimeout"]
+        if "resultCache" in compute["container"]:
+            converted_container["result_cache"] = compute["container"]["resultCache"]
+        if "executor" in compute["container"]:
+            converted_container["executor"] = compute["container"]["executor"]
+        if converted_container:
+            converted_compute["container"] = converted_container
 
     pod_labels = {
         **labels,
@@ -0,0 +1,118 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License").
+#    You may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import functools
+import os
+import threading
+import time
+from typing import Any, Callable, Mapping, TypeVar, cast
+
+import boto3
+import kopf
+from orbit_controller import logger
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+METRICS_PORT = int(os.environ.get("ORBIT_CONTROLLER_METRICS_PORT", "9090"))
+SLOW_HANDLER_SECONDS = float(os.environ.get("ORBIT_CONTROLLER_SLOW_HANDLER_SECONDS", "1.0"))
+
+HANDLER_LATENCY = Histogram(
+    "orbit_controller_handler_duration_seconds",
+    "Duration of the kopf webhook, index, timer and event handlers",
+    ["handler"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+HANDLER_OUTCOMES = Counter(
+    "orbit_controller_handler_total",
+    "Number of handler calls by outcome (success, retry, permanent_error, error)",
+    ["handler", "outcome"],
+)
+INDEX_SIZE = Gauge("orbit_controller_index_size", "Number of keys in a kopf index", ["index"])
+QUEUE_DEPTH = Gauge("orbit_controller_queue_depth", "Number of items waiting or in progress in a queue", ["queue"])
+AWS_API_CALLS = Counter(
+    "orbit_controller_aws_api_calls_total", "Number of AWS API calls by service and operation", ["service", "operation"]
+)
+SHARD_MEMBERS = Gauge("orbit_controller_shard_members", "Number of Ready replicas sharing the operator work")
+SHARD_OWNED_OBJECTS = Gauge(
+    "orbit_controller_shard_owned_objects", "Number of objects owned by this replica at the last rebalance", ["kind"]
+)
+SHARD_REBALANCES = Counter("orbit_controller_shard_rebalances_total", "Number of shard membership changes")
+
+_server_lock = threading.Lock()
+_server_started = False
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def _count_aws_call(model: Any, **_: Any) -> None:
+    AWS_API_CALLS.labels(service=model.service_model.service_name, operation=model.name).inc()
+
+
+def start_metrics_server() -> None:
+    """
+    Serves the Prometheus metrics of this process on ORBIT_CONTROLLER_METRICS_PORT and starts counting the AWS API
+    calls of the boto3 clients created from now on. Safe to call from several startup handlers.
+    """
+    global _server_started
+    with _server_lock:
+        if _server_started:
+            return
+        start_http_server(METRICS_PORT)
+        boto3.setup_default_session()
+        boto3.DEFAULT_SESSION.events.register("before-call", _count_aws_call)
+        _server_started = True
+    logger.info("Serving Prometheus metrics on port %s", METRICS_PORT)
+
+
+def _outcome(error: BaseException) -> str:
+    if isinstance(error, kopf.TemporaryError):
+        return "retry"
+    if isinstance(error, kopf.PermanentError):
+        return "permanent_error"
+    return "error"
+
+
+def timed(handler: str) -> Callable[[F], F]:
+    """
+    Decorator recording the latency and outcome of a kopf handler. Apply it below the kopf decorators.
+    """
+
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            outcome = "success"
+            try:
+                return func(*args, **kwargs)
+            except BaseException as e:
+                outcome = _outcome(e)
+                raise
+            finally:
+                duration = time.perf_counter() - start
+                HANDLER_LATENCY.labels(handler=handler).observe(duration)
+                HANDLER_OUTCOMES.labels(handler=handler, outcome=outcome).inc()
+                if duration > SLOW_HANDLER_SECONDS:
+                    logger.warning("Slow handler %s: %.3fs (%s)", handler, duration, outcome)
+
+        return cast(F, wrapper)
+
+    return decorator
+
+
+def observe_index(name: str, index: Mapping[Any, Any]) -> None:
+    # kopf keeps one index object for the life of the operator, its size is read at scrape time
+    INDEX_SIZE.labels(index=name).set_function(lambda: len(index))
+
+
+def observe_queue(name: str, depth: Callable[[], float]) -> None:
+    QUEUE_DEPTH.labels(queue=name).set_function(depth)
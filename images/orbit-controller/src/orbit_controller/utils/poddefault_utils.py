@@ -12,16 +12,52 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
-from typing import Any, Dict, List, Optional
+import functools
+import os
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple, TypeVar, cast
 
 import kopf
 from kubernetes import dynamic
-from kubernetes.client.rest import ApiException
 from kubernetes.dynamic.client import DynamicClient
 
 KUBEFLOW_API_GROUP = "kubeflow.org"
 KUBEFLOW_API_VERSION = "v1alpha1"
 
+# User namespaces updated in parallel by a fan-out, conflicting (409) and throttled (429) calls are retried
+FAN_OUT_WORKERS = int(os.environ.get("PODDEFAULT_FAN_OUT_WORKERS", "16"))
+FAN_OUT_MAX_ATTEMPTS = 5
+FAN_OUT_MAX_BACKOFF = 30
+RETRYABLE_STATUSES = [409, 429]
+FAN_OUT_RETRY_DELAY = 30
+# Results of background work not collected by their handler in time are dropped, the work is run again if needed
+BACKGROUND_RESULT_TTL_SECONDS = 300
+
+T = TypeVar("T")
+
+
+class _BackgroundWork:
+    def __init__(self, key: Hashable, future: "Future[Any]") -> None:
+        self.key = key
+        self.future = future
+        self.finished: Optional[float] = None
+        future.add_done_callback(self._done)
+
+    def _done(self, _: "Future[Any]") -> None:
+        self.finished = time.monotonic()
+
+    def expired(self) -> bool:
+        return self.finished is not None and time.monotonic() - self.finished > BACKGROUND_RESULT_TTL_SECONDS
+
+
+_background: Dict[Hashable, _BackgroundWork] = {}
+_background_lock = threading.Lock()
+_background_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="poddefaults")
+
 
 def construct(
     name: str,
@@ -69,7 +105,7 @@ def modify_poddefault(
 ) -> None:
     api = client.resources.get(api_version=KUBEFLOW_API_VERSION, group=KUBEFLOW_API_GROUP, kind="PodDefault")
     patch = {"spec": {"desc": desc}}
-    api.patch(namespace=namespace, name=name, body=patch)
+    api.patch(namespace=namespace, name=name, body=patch, content_type="application/merge-patch+json")
     logger.debug("Modified PodDefault: %s in Namespace: %s", name, namespace)
 
 
@@ -79,46 +115,146 @@ def delete_poddefault(namespace: str, name: str, client: dynamic.DynamicClient,
     logger.debug("Deleted PodDefault: %s in Namesapce: %s", name, namespace)
 
 
+def _with_retries(func: Callable[[], str]) -> str:
+    for attempt in range(1, FAN_OUT_MAX_ATTEMPTS + 1):
+        try:
+            return func()
+        except Exception as e:
+            if getattr(e, "status", None) not in RETRYABLE_STATUSES or attempt == FAN_OUT_MAX_ATTEMPTS:
+                raise
+            time.sleep(min(FAN_OUT_MAX_BACKOFF, 0.5 * 2 ** attempt) * random.uniform(0.5, 1.5))
+    raise Exception("Unreachable")
+
+
+def _list_user_poddefaults(team: Optional[str], client: DynamicClient) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    if team is None:
+        return {}
+    api = client.resources.get(api_version=KUBEFLOW_API_VERSION, group=KUBEFLOW_API_GROUP, kind="PodDefault")
+    items = api.get(label_selector=f"orbit/space=user,orbit/team={team}").to_dict().get("items", [])
+    return {(item["metadata"]["namespace"], item["metadata"]["name"]): item for item in items}
+
+
+def _user_poddefault(poddefault: Dict[str, Any]) -> Dict[str, Any]:
+    return construct(
+        name=poddefault["metadata"]["name"],
+        desc=poddefault["spec"]["desc"],
+        labels={
+            "orbit/space": "user",
+            "orbit/team": poddefault["metadata"]["labels"].get("orbit/team", None),
+        },
+    )
+
+
+def _apply_poddefault(
+    namespace: str,
+    desired: Dict[str, Any],
+    existing: Optional[Dict[str, Any]],
+    client: DynamicClient,
+    logger: kopf.Logger,
+) -> str:
+    name = desired["metadata"]["name"]
+    if existing is not None:
+        labels = existing["metadata"].get("labels") or {}
+        if existing.get("spec") == desired["spec"] and labels.items() >= desired["metadata"]["labels"].items():
+            return "Unchanged"
+    else:
+        try:
+            create_poddefault(namespace=namespace, poddefault=desired, client=client, logger=logger)
+            return "Created"
+        except Exception as e:
+            if getattr(e, "status", None) != 409:
+                raise
+    api = client.resources.get(api_version=KUBEFLOW_API_VERSION, group=KUBEFLOW_API_GROUP, kind="PodDefault")
+    api.patch(
+        namespace=namespace,
+        name=name,
+        body={"metadata": {"labels": desired["metadata"]["labels"]}, "spec": desired["spec"]},
+        content_type="application/merge-patch+json",
+    )
+    logger.debug("Updated PodDefault: %s in Namespace: %s", name, namespace)
+    return "Updated"
+
+
+def _delete_poddefault(
+    namespace: str, name: str, existing: Optional[Dict[str, Any]], client: DynamicClient, logger: kopf.Logger
+) -> str:
+    if existing is None:
+        return "NotFound"
+    try:
+        delete_poddefault(namespace=namespace, name=name, client=client, logger=logger)
+        return "Deleted"
+    except Exception as e:
+        if getattr(e, "status", None) != 404:
+            raise
+        return "NotFound"
+
+
+def _fan_out(
+    action: str,
+    poddefaults: List[Dict[str, Any]],
+    user_namespaces: List[str],
+    client: DynamicClient,
+    logger: kopf.Logger,
+) -> Dict[str, Dict[str, str]]:
+    """
+    Applies or deletes the user copies of the team poddefaults in every user namespace, namespaces in parallel.
+
+    The existing copies are listed once, unchanged copies are skipped. Conflicting and throttled calls are retried
+    with backoff. Returns the result of each poddefault by namespace.
+    """
+    if not poddefaults or not user_namespaces:
+        return {}
+    teams = {pd["metadata"].get("labels", {}).get("orbit/team") for pd in poddefaults}
+    existing: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for team in teams:
+        existing.update(_list_user_poddefaults(team, client))
+    desired = [_user_poddefault(pd) for pd in poddefaults]
+
+    def process(namespace: str) -> Dict[str, str]:
+        results = {}
+        for poddefault in desired:
+            name = poddefault["metadata"]["name"]
+            current = existing.get((namespace, name))
+            try:
+                if action == "delete":
+                    results[name] = _with_retries(
+                        functools.partial(_delete_poddefault, namespace, name, current, client, logger)
+                    )
+                else:
+                    results[name] = _with_retries(
+                        functools.partial(_apply_poddefault, namespace, poddefault, current, client, logger)
+                    )
+            except Exception as e:
+                logger.warning("Unable to %s PodDefault %s in Namespace %s: %s", action, name, namespace, str(e))
+                results[name] = f"Failed: {getattr(e, 'status', None) or e}"
+        return results
+
+    with ThreadPoolExecutor(max_workers=min(FAN_OUT_WORKERS, len(user_namespaces))) as executor:
+        summary = dict(zip(user_namespaces, executor.map(process, user_namespaces)))
+
+    counts = Counter(result.split(":")[0] for results in summary.values() for result in results.values())
+    logger.info(
+        "PodDefaults %s %s in %s user Namespaces: %s",
+        [pd["metadata"]["name"] for pd in poddefaults],
+        action,
+        len(user_namespaces),
+        dict(counts),
+    )
+    return summary
+
+
 def copy_poddefaults_to_user_namespaces(
     poddefaults: List[Dict[str, Any]],
     user_namespaces: List[str],
     client: DynamicClient,
     logger: kopf.Logger,
-) -> None:
+) -> Dict[str, Dict[str, str]]:
     logger.debug(
         "Copying PodDefaults %s to user Namespaces %s",
         [pd["metadata"]["name"] for pd in poddefaults],
         user_namespaces,
     )
-    for poddefault in poddefaults:
-        for namespace in user_namespaces:
-            try:
-                kwargs = {
-                    "name": poddefault["metadata"]["name"],
-                    "desc": poddefault["spec"]["desc"],
-                    "labels": {
-                        "orbit/space": "user",
-                        "orbit/team": poddefault["metadata"]["labels"].get("orbit/team", None),
-                    },
-                }
-                create_poddefault(
-                    namespace=namespace,
-                    poddefault=construct(**kwargs),
-                    client=client,
-                    logger=logger,
-                )
-            except ApiException as e:
-                logger.warning(
-                    "Unable to create PodDefault %s in Namespace %s: %s",
-                    poddefault["metadata"]["name"],
-                    namespace,
-                    str(e.body),
-                )
-            except Exception as e:
-                logger.warning(
-                    "Failed to create PodDefault",
-                    str(e),
-                )
+    return _fan_out("apply", poddefaults, user_namespaces, client, logger)
 
 
 def modify_poddefaults_in_user_namespaces(
@@ -126,29 +262,13 @@ def modify_poddefaults_in_user_namespaces(
     user_namespaces: List[str],
     client: DynamicClient,
     logger: kopf.Logger,
-) -> None:
+) -> Dict[str, Dict[str, str]]:
     logger.debug(
         "Modifying PodDefaults %s in user Namespaces %s",
         [pd["metadata"]["name"] for pd in poddefaults],
         user_namespaces,
     )
-    for poddefault in poddefaults:
-        for namespace in user_namespaces:
-            try:
-                modify_poddefault(
-                    namespace=namespace,
-                    name=poddefault["metadata"]["name"],
-                    desc=poddefault["spec"]["desc"],
-                    client=client,
-                    logger=logger,
-                )
-            except Exception as e:
-                logger.warn(
-                    "Unable to delete PodDefault %s from Namespace %s: %s",
-                    poddefault["metadata"]["name"],
-                    namespace,
-                    str(e),
-                )
+    return _fan_out("apply", poddefaults, user_namespaces, client, logger)
 
 
 def delete_poddefaults_from_user_namespaces(
@@ -156,25 +276,46 @@ def delete_poddefaults_from_user_namespaces(
     user_namespaces: List[str],
     client: DynamicClient,
     logger: kopf.Logger,
-) -> None:
+) -> Dict[str, Dict[str, str]]:
     logger.debug(
         "Deleting PodDefaults %s from user Namespaces %s",
         [pd["metadata"]["name"] for pd in poddefaults],
         user_namespaces,
     )
-    for poddefault in poddefaults:
-        for namespace in user_namespaces:
-            try:
-                delete_poddefault(
-                    namespace=namespace,
-                    name=poddefault["metadata"]["name"],
-                    client=client,
-                    logger=logger,
-                )
-            except Exception as e:
-                logger.warn(
-                    "Unable to delete PodDefault %s from Namespace %s: %s",
-                    poddefault["metadata"]["name"],
-                    namespace,
-                    str(e),
-                )
+    return _fan_out("delete", poddefaults, user_namespaces, client, logger)
+
+
+def raise_on_failures(action: str, summary: Dict[str, Dict[str, str]]) -> None:
+    """Retries the calling kopf handler when the fan-out summary has failed namespaces"""
+    failed = sorted(ns for ns, results in summary.items() if any(r.startswith("Failed") for r in results.values()))
+    if failed:
+        raise kopf.TemporaryError(f"Unable to {action} PodDefaults in Namespaces {failed}", delay=FAN_OUT_RETRY_DELAY)
+
+
+def run_in_background(owner: Hashable, key: Hashable, func: Callable[[], T], retry_delay: float = 5) -> T:
+    """
+    Runs func outside of the kopf handler calling it: the handler is retried with kopf.TemporaryError until func
+    completes, then returns its result.
+
+    An owner (the uid of the handled object) has at most one background work, identified by key across the retries
+    of the handler. Work with another key supersedes it, so the result of a superseded change is never collected by a
+    later one, and starts once the superseded work finished, so the changes of an owner are never applied concurrently.
+    """
+    with _background_lock:
+        for expired in [o for o, work in _background.items() if work.expired()]:
+            del _background[expired]
+        work = _background.get(owner)
+        if work is None or work.key != key:
+            previous = work.future if work is not None and not work.future.done() else None
+
+            def _after_previous() -> T:
+                if previous is not None:
+                    wait([previous])
+                return func()
+
+            _background[owner] = _BackgroundWork(key, _background_executor.submit(_after_previous))
+            raise kopf.TemporaryError(f"{key} started in the background", delay=retry_delay)
+        if not work.future.done():
+            raise kopf.TemporaryError(f"{key} running in the background", delay=retry_delay)
+        del _background[owner]
+    return cast(T, work.future.result())
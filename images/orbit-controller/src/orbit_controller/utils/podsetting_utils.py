@@ -13,7 +13,8 @@
 #    limitations under the License.
 
 import re
-from typing import Any, Dict, List
+import threading
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
 
 import jsonpath_ng
 import kopf
@@ -110,6 +111,111 @@ def filter_podsettings(
     return filtered_podsettings
 
 
+class CompiledSelector:
+    """
+    A PodSetting podSelector compiled for matching, with the label (key, value) pairs (or keys, for Exists) a pod
+    must carry to possibly match it.
+    """
+
+    def __init__(self, pod_selector: Dict[str, Any]) -> None:
+        self.labels: Dict[str, str] = dict(pod_selector.get("matchLabels") or {})
+        self.expressions: List[Tuple[str, str, FrozenSet[str]]] = [
+            (e["key"], e["operator"], frozenset(e.get("values") or []))
+            for e in pod_selector.get("matchExpressions") or []
+        ]
+        self.empty = not self.labels and not self.expressions
+        self.anchors: List[Tuple[str, Optional[str]]] = []
+        if self.labels:
+            self.anchors = [next(iter(self.labels.items()))]
+        else:
+            for key, operator, values in self.expressions:
+                if operator == "In":
+                    self.anchors = [(key, value) for value in values]
+                    break
+                if operator == "Exists":
+                    self.anchors = [(key, None)]
+                    break
+
+    def matches(self, pod_labels: kopf.Labels) -> bool:
+        if self.empty or not pod_labels:
+            return False
+        for key, value in self.labels.items():
+            if pod_labels.get(key, None) != value:
+                return False
+        for key, operator, values in self.expressions:
+            pod_label_value = pod_labels.get(key, None)
+            if operator == "Exists" and pod_label_value is None:
+                return False
+            if operator == "NotExists" and pod_label_value is not None:
+                return False
+            if operator == "In" and pod_label_value not in values:
+                return False
+            if operator == "NotIn" and pod_label_value in values:
+                return False
+        return True
+
+
+class PodSettingSelectorIndex:
+    """
+    Per team inverted index of the compiled PodSetting selectors, keyed by their anchor label (key, value) pairs.
+
+    Selectors are compiled by the kopf index handler when a PodSetting changes. kopf stores a new entry for every
+    change, so the inverted index of a team is rebuilt whenever its entries are not the very objects it was built
+    from, and matching a pod only evaluates the selectors anchored on one of its labels.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._teams: Dict[str, Dict[str, Any]] = {}
+
+    def _team_index(self, team: str, podsettings: List[Dict[str, Any]]) -> Dict[str, Any]:
+        with self._lock:
+            index = self._teams.get(team)
+            # the cached entries are referenced by the index, so their identities cannot be reused by new entries
+            if (
+                index
+                and len(index["podsettings"]) == len(podsettings)
+                and all(cached is current for cached, current in zip(index["podsettings"], podsettings))
+            ):
+                return index
+
+            entries = list(podsettings)
+            selectors = [ps.get("selector") or CompiledSelector(ps["spec"]["podSelector"]) for ps in entries]
+            by_label: Dict[Tuple[str, Optional[str]], Set[int]] = {}
+            unanchored: Set[int] = set()
+            for position, selector in enumerate(selectors):
+                if selector.empty:
+                    continue
+                if not selector.anchors:
+                    unanchored.add(position)
+                for anchor in selector.anchors:
+                    by_label.setdefault(anchor, set()).add(position)
+            index = {
+                "podsettings": entries,
+                "selectors": selectors,
+                "by_label": by_label,
+                "unanchored": unanchored,
+            }
+            self._teams[team] = index
+            return index
+
+    def match(self, team: str, podsettings: List[Dict[str, Any]], pod_labels: kopf.Labels) -> List[Dict[str, Any]]:
+        """
+        Returns the PodSettings of the team whose selector matches the pod labels, in the team index order.
+        """
+        if not pod_labels:
+            return []
+        entries = list(podsettings)
+        index = self._team_index(team, entries)
+        by_label = index["by_label"]
+        candidates = set(index["unanchored"])
+        for key, value in pod_labels.items():
+            candidates.update(by_label.get((key, value), ()))
+            candidates.update(by_label.get((key, None), ()))
+        selectors = index["selectors"]
+        return [entries[i] for i in sorted(candidates) if selectors[i].matches(pod_labels)]
+
+
 def filter_pod_containers(
     containers: List[Dict[str, Any]],
     pod: Dict[str, Any],
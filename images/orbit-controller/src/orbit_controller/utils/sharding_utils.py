@@ -0,0 +1,227 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License").
+#    You may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import bisect
+import hashlib
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import kopf
+from kubernetes import dynamic
+from kubernetes.client import CoreV1Api
+from orbit_controller import ORBIT_API_GROUP, ORBIT_API_VERSION, ORBIT_SYSTEM_NAMESPACE, dynamic_client, logger
+from orbit_controller.utils import metrics_utils
+
+# Sharding is enabled by the label selector of the operator replicas, each replica owns a slice of the shard keys
+SHARD_SELECTOR = os.environ.get("ORBIT_CONTROLLER_SHARD_SELECTOR", "")
+SHARD_REFRESH_SECONDS = float(os.environ.get("ORBIT_CONTROLLER_SHARD_REFRESH_SECONDS", "15"))
+SHARD_DEFER_SECONDS = 10
+SHARD_ANNOTATION = f"{ORBIT_API_GROUP}/shard-owner"
+VIRTUAL_NODES = 64
+TOUCH_ATTEMPTS = 3
+
+POD_NAME = os.environ.get("POD_NAME", "")
+POD_NAMESPACE = os.environ.get("POD_NAMESPACE", ORBIT_SYSTEM_NAMESPACE)
+
+
+def _hash(value: str) -> int:
+    return int(hashlib.md5(value.encode("utf-8")).hexdigest()[:16], 16)
+
+
+class HashRing:
+    """
+    Consistent hash ring of the operator replicas, adding or removing a replica only moves the keys of its neighbours.
+    """
+
+    def __init__(self, members: List[str], virtual_nodes: int = VIRTUAL_NODES) -> None:
+        self.members = sorted(members)
+        points = sorted((_hash(f"{member}#{i}"), member) for member in self.members for i in range(virtual_nodes))
+        self._hashes = [point for point, _ in points]
+        self._owners = [member for _, member in points]
+
+    def owner(self, key: str) -> str:
+        i = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._owners[i]
+
+
+class Touch(NamedTuple):
+    """Resource whose objects are annotated, to trigger their handlers, when their shard moves to this replica"""
+
+    kind: str
+    key: Callable[[Dict[str, Any]], str]
+    group: str = ORBIT_API_GROUP
+    api_version: str = ORBIT_API_VERSION
+
+
+_ring = HashRing([POD_NAME or "standalone"])
+_touches: List[Touch] = []
+_finalizer_prefix: Optional[str] = None
+_started = False
+_lock = threading.Lock()
+
+
+def owns(key: Optional[str]) -> bool:
+    if not SHARD_SELECTOR or key is None:
+        return True
+    return _ring.owner(key) == POD_NAME
+
+
+def owns_namespace(namespace: Optional[str], **_: Any) -> bool:
+    """kopf filter of the objects of the team (and user) namespaces owned by this replica"""
+    return owns(namespace)
+
+
+def owns_team(spec: kopf.Spec, namespace: Optional[str], **_: Any) -> bool:
+    """kopf filter of the objects whose spec.team is owned by this replica"""
+    return owns(spec.get("team", namespace))
+
+
+def owns_name(name: Optional[str], **_: Any) -> bool:
+    """kopf filter of the cluster wide objects owned by this replica, by name"""
+    return owns(name)
+
+
+def namespace_key(obj: Dict[str, Any]) -> str:
+    return str(obj["metadata"].get("namespace"))
+
+
+def team_key(obj: Dict[str, Any]) -> str:
+    return str(obj.get("spec", {}).get("team", obj["metadata"].get("namespace")))
+
+
+def name_key(obj: Dict[str, Any]) -> str:
+    return str(obj["metadata"]["name"])
+
+
+def _list_members() -> List[str]:
+    pods = CoreV1Api().list_namespaced_pod(namespace=POD_NAMESPACE, label_selector=SHARD_SELECTOR).items
+    members = {POD_NAME}
+    for pod in pods:
+        ready = any(c.type == "Ready" and c.status == "True" for c in (pod.status.conditions or []))
+        if ready and pod.metadata.deletion_timestamp is None:
+            members.add(pod.metadata.name)
+    return sorted(members)
+
+
+def _stale_finalizers(metadata: Dict[str, Any]) -> List[str]:
+    """Finalizers of this operator held by replicas which left (or by the unsharded operator)"""
+    stale = []
+    for finalizer in metadata.get("finalizers", []):
+        prefix, _, member = finalizer.partition("/")
+        if prefix == _finalizer_prefix and member not in _ring.members:
+            stale.append(finalizer)
+    return stale
+
+
+def _touch(api: Any, item: Dict[str, Any]) -> bool:
+    for attempt in range(TOUCH_ATTEMPTS):
+        metadata = item["metadata"]
+        stale = _stale_finalizers(metadata)
+        if metadata.get("annotations", {}).get(SHARD_ANNOTATION) == POD_NAME and not stale:
+            return False
+        patch: Dict[str, Any] = {"annotations": {SHARD_ANNOTATION: POD_NAME}}
+        if stale:
+            if metadata.get("deletionTimestamp"):
+                logger.warning("Releasing %s being deleted from the finalizers %s", metadata["name"], stale)
+            # the finalizers list is replaced as a whole, guarded by the resourceVersion
+            patch["finalizers"] = [f for f in metadata["finalizers"] if f not in stale]
+            patch["resourceVersion"] = metadata["resourceVersion"]
+        try:
+            api.patch(
+                namespace=metadata.get("namespace"),
+                name=metadata["name"],
+                body={"metadata": patch},
+                content_type="application/merge-patch+json",
+            )
+            return True
+        except dynamic.exceptions.ConflictError:
+            if attempt == TOUCH_ATTEMPTS - 1:
+                raise
+            item = api.get(namespace=metadata.get("namespace"), name=metadata["name"]).to_dict()
+    return False
+
+
+def _touch_owned(touch: Touch) -> Tuple[int, int]:
+    api = dynamic_client().resources.get(api_version=touch.api_version, group=touch.group, kind=touch.kind)
+    owned = touched = 0
+    for item in api.get().to_dict().get("items", []):
+        if _ring.owner(touch.key(item)) != POD_NAME:
+            continue
+        owned += 1
+        try:
+            if _touch(api, item):
+                touched += 1
+        except Exception:
+            logger.exception("Error touching %s %s", touch.kind, item["metadata"]["name"])
+    metrics_utils.SHARD_OWNED_OBJECTS.labels(kind=touch.kind).set(owned)
+    return owned, touched
+
+
+def _rebalance(members: List[str]) -> None:
+    global _ring
+    _ring = HashRing(members)
+    metrics_utils.SHARD_MEMBERS.set(len(members))
+    metrics_utils.SHARD_REBALANCES.inc()
+    logger.info("Shard members: %s", members)
+    for touch in _touches:
+        try:
+            owned, touched = _touch_owned(touch)
+            logger.info("Owning %s %s objects, %s moved to this shard", owned, touch.kind, touched)
+        except Exception:
+            logger.exception("Error touching the %s objects of this shard", touch.kind)
+
+
+def _watch_members(members: List[str]) -> None:
+    while True:
+        time.sleep(SHARD_REFRESH_SECONDS)
+        try:
+            current = _list_members()
+            if current != members:
+                _rebalance(current)
+                members = current
+        except Exception:
+            logger.exception("Error refreshing the shard members")
+
+
+def start(settings: kopf.OperatorSettings, touches: List[Touch]) -> None:
+    """
+    Starts tracking the operator replicas matching ORBIT_CONTROLLER_SHARD_SELECTOR, to be called from the startup
+    handler after the finalizer is configured. The replicas own the shard keys of a consistent hash ring of the Ready
+    replicas, on every membership change the objects moving to this replica are annotated so their handlers and timers
+    start here.
+
+    All the handlers, deletion included, are to be filtered by shard: other replicas are blind to the objects of this
+    one and never write their kopf state. As kopf releases its finalizer from the objects no handler matches, each
+    replica holds its own finalizer (<operator finalizer prefix>/<pod name>), and the finalizers of the replicas which
+    left are released by the new owners.
+    """
+    global _started, _touches, _finalizer_prefix
+    if not SHARD_SELECTOR:
+        return
+    if not POD_NAME:
+        raise Exception("POD_NAME is required to shard the operator")
+    # replicas share the work instead of pausing each other
+    settings.peering.standalone = True
+    _finalizer_prefix = settings.persistence.finalizer.split("/")[0]
+    settings.persistence.finalizer = f"{_finalizer_prefix}/{POD_NAME}"
+    with _lock:
+        if _started:
+            return
+        _touches = touches
+        members = _list_members()
+        _rebalance(members)
+        threading.Thread(target=_watch_members, args=(members,), name="shard-members", daemon=True).start()
+        _started = True
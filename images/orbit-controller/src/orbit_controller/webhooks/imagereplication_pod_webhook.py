@@ -19,13 +19,19 @@ from typing import Any, Dict, List, Optional
 
 import kopf
 from orbit_controller import ORBIT_API_GROUP, ORBIT_API_VERSION, dynamic_client
-from orbit_controller.utils import imagereplication_utils
+from orbit_controller.utils import imagereplication_utils, metrics_utils
 
 CONFIG: Dict[str, Any]
+REWRITER: imagereplication_utils.ImageRewriter
 
 
-@kopf.on.startup()
-def configure(settings: kopf.OperatorSettings, logger: kopf.Logger, **_: Any) -> None:
+@kopf.on.startup()  # type: ignore
+def configure(
+    settings: kopf.OperatorSettings,
+    logger: kopf.Logger,
+    imagereplications_idx: kopf.Index[str, str],
+    **_: Any,
+) -> None:
     settings.admission.server = kopf.WebhookServer(
         cafile="/certs/ca.crt",
         certfile="/certs/tls.crt",
@@ -40,11 +46,16 @@ def configure(settings: kopf.OperatorSettings, logger: kopf.Logger, **_: Any) ->
     )
     settings.persistence.finalizer = "imagereplication-pod-webhook.orbit.aws/kopf-finalizer"
     settings.posting.level = logging.getLevelName(os.environ.get("EVENT_LOG_LEVEL", "INFO"))
+    metrics_utils.start_metrics_server()
+    metrics_utils.observe_index("imagereplications_idx", imagereplications_idx)
 
     global CONFIG
     CONFIG = imagereplication_utils.get_config()
     logger.info("CONFIG: %s", CONFIG)
 
+    global REWRITER
+    REWRITER = imagereplication_utils.ImageRewriter(CONFIG)
+
 
 def _check_replication_status(value: str, **_: Any) -> bool:
     return value not in ["Failed", "MaxAttemptsExceeded"]
@@ -70,6 +81,7 @@ def imagereplications_idx(namespace: str, name: str, spec: kopf.Spec, status: ko
 
 
 @kopf.on.mutate("pods", id="update-pod-images")  # type: ignore
+@metrics_utils.timed("imagereplication_pod_webhook.update_pod_images")
 def update_pod_images(
     spec: kopf.Spec,
     patch: kopf.Patch,
@@ -92,12 +104,13 @@ def update_pod_images(
     ) -> None:
         for container in src_containers if src_containers else []:
             image = container.get("image", "")
-            desired_image = imagereplication_utils.get_desired_image(image=image, config=CONFIG)
+            desired_image = REWRITER.rewrite(image)
             if image != desired_image:
                 container_copy = deepcopy(container)
                 container_copy["image"] = desired_image
                 dest_containers.append(container_copy)
-                replications[image] = desired_image
+                if REWRITER.is_replica(desired_image):
+                    replications[image] = desired_image
                 annotations[f"original-container-image~1{container['name']}"] = image
 
     process_containers(spec.get("initContainers", []), init_containers)
@@ -19,11 +19,18 @@ from typing import Any, Dict, List, Optional, cast
 
 import kopf
 from orbit_controller import ORBIT_API_GROUP, ORBIT_API_VERSION
-from orbit_controller.utils import podsetting_utils
+from orbit_controller.utils import metrics_utils, podsetting_utils
 
+SELECTOR_INDEX = podsetting_utils.PodSettingSelectorIndex()
 
-@kopf.on.startup()
-def configure(settings: kopf.OperatorSettings, logger: kopf.Logger, **_: Any) -> None:
+
+@kopf.on.startup()  # type: ignore
+def configure(
+    settings: kopf.OperatorSettings,
+    logger: kopf.Logger,
+    podsettings_idx: kopf.Index[str, Dict[str, Any]],
+    **_: Any,
+) -> None:
     settings.admission.server = kopf.WebhookServer(
         cafile="/certs/ca.crt",
         certfile="/certs/tls.crt",
@@ -38,6 +45,8 @@ def configure(settings: kopf.OperatorSettings, logger: kopf.Logger, **_: Any) ->
     )
     settings.persistence.finalizer = "podsetting-pod-webhook.orbit.aws/kopf-finalizer"
     settings.posting.level = logging.getLevelName(os.environ.get("EVENT_LOG_LEVEL", "INFO"))
+    metrics_utils.start_metrics_server()
+    metrics_utils.observe_index("podsettings_idx", podsettings_idx)
 
 
 @kopf.index("namespaces")  # type: ignore
@@ -56,18 +65,20 @@ def _should_index_podsetting(labels: kopf.Labels, **_: Any) -> bool:
 def podsettings_idx(
     namespace: str, name: str, labels: kopf.Labels, spec: kopf.Spec, **_: Any
 ) -> Optional[Dict[str, Dict[str, Any]]]:
-    """Index of podsettings by team"""
+    """Index of podsettings by team, with their compiled podSelector"""
     return {
         labels["orbit/team"]: {
             "namespace": namespace,
             "name": name,
             "labels": labels,
             "spec": spec,
+            "selector": podsetting_utils.CompiledSelector(spec.get("podSelector", {})),
         }
     }
 
 
 @kopf.on.mutate("pods", id="apply-pod-settings")  # type: ignore
+@metrics_utils.timed("podsetting_pod_webhook.apply_pod_settings")
 def update_pod_images(
     namespace: str,
     labels: kopf.Labels,
@@ -101,20 +112,14 @@ def update_pod_images(
         # warnings.append(f"No PodSettings found for Pod's Team: {team}")
         return patch
 
-    fitlered_podsettings = podsetting_utils.filter_podsettings(
-        podsettings=team_podsettings, pod_labels=labels, logger=logger
-    )
+    fitlered_podsettings = SELECTOR_INDEX.match(team=team, podsettings=team_podsettings, pod_labels=labels)
     if not fitlered_podsettings:
         logger.info("No PodSetting Selectors matched the Pod")
         return patch
 
     applied_podsetting_names = []
-    body_dict = {
-        "metadata": {k: v for k, v in body["metadata"].items()},
-        "spec": {k: v for k, v in body["spec"].items()},
-    }
-    logger.debug("BodyDict: %s", body_dict)
-    mutable_body = deepcopy(body)
+    # PodSettings only modify the metadata and spec
+    mutable_body = {"metadata": deepcopy(body["metadata"]), "spec": deepcopy(body["spec"])}
     for podsetting in fitlered_podsettings:
         try:
             podsetting_utils.apply_settings_to_pod(namespace=ns, podsetting=podsetting, pod=mutable_body, logger=logger)
@@ -123,7 +128,7 @@ def update_pod_images(
             logger.exception("Error applying PodSetting %s: %s", podsetting["name"], str(e))
             warnings.append(f"Error applying PodSetting {podsetting['name']}: {str(e)}")
 
-    if body_dict["spec"] == mutable_body["spec"] and body_dict["metadata"] == mutable_body["metadata"]:
+    if body["spec"] == mutable_body["spec"] and body["metadata"] == mutable_body["metadata"]:
         logger.warn("PodSetting Selectors matched the Pod but no changes were applied")
         warnings.append("PodSetting Selectors matched the Pod but no changes were applied")
         return patch
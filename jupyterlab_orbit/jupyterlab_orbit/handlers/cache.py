@@ -0,0 +1,92 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License").
+#    You may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import hashlib
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, NamedTuple, Tuple
+
+from jupyter_server.base.handlers import APIHandler
+
+# Seconds a serialized response is reused, per endpoint
+TTL_SECONDS: Dict[str, float] = {
+    "containers": float(os.environ.get("ORBIT_CACHE_TTL_CONTAINERS", "10")),
+    "storage": float(os.environ.get("ORBIT_CACHE_TTL_STORAGE", "30")),
+    "catalog": float(os.environ.get("ORBIT_CACHE_TTL_CATALOG", "300")),
+    "team": float(os.environ.get("ORBIT_CACHE_TTL_TEAM", "300")),
+    "eks": float(os.environ.get("ORBIT_CACHE_TTL_EKS", "60")),
+}
+
+
+class _Entry(NamedTuple):
+    body: str
+    etag: str
+    expires: float
+
+
+_entries: Dict[Tuple[str, Hashable], _Entry] = {}
+_values: Dict[Tuple[str, Hashable], Tuple[Any, float]] = {}
+
+
+def _matches(entry_key: Hashable, key: Hashable) -> bool:
+    return entry_key == key or (isinstance(entry_key, tuple) and len(entry_key) > 0 and entry_key[0] == key)
+
+
+def invalidate(endpoint: str, key: Hashable = None) -> None:
+    """Drops the cached responses and values of endpoint whose key is key, or a tuple starting with key (all of them
+    without key)"""
+    for cache in (_entries, _values):
+        for entry_key in [k for k in cache if k[0] == endpoint and (key is None or _matches(k[1], key))]:
+            cache.pop(entry_key, None)
+
+
+def is_refresh(handler: APIHandler) -> bool:
+    return handler.get_argument("refresh", default="").lower() in ("1", "true")
+
+
+async def cached_value(endpoint: str, key: Hashable, load: Callable[[], Awaitable[Any]], refresh: bool = False) -> Any:
+    """
+    Returns the value loaded by load for endpoint and key, reloaded at most once per TTL of the endpoint. Lets the
+    responses derived from a same listing (pages, details) share it.
+    """
+    value = _values.get((endpoint, key))
+    if refresh or value is None or value[1] < time.monotonic():
+        value = (await load(), time.monotonic() + TTL_SECONDS.get(endpoint, 0))
+        _values[(endpoint, key)] = value
+    return value[0]
+
+
+async def finish_cached(
+    handler: APIHandler, endpoint: str, load: Callable[[], Awaitable[str]], key: Hashable = None
+) -> None:
+    """
+    Finishes handler with the serialized response of endpoint (and key), loaded by load at most once per TTL.
+
+    The response carries a strong ETag over its payload and an If-None-Match matching it is answered with a 304. The
+    refresh query argument (?refresh=true) bypasses the cache.
+    """
+    entry = _entries.get((endpoint, key))
+    if is_refresh(handler) or entry is None or entry.expires < time.monotonic():
+        body = await load()
+        etag = '"%s"' % hashlib.sha256(body.encode("utf-8")).hexdigest()
+        entry = _Entry(body=body, etag=etag, expires=time.monotonic() + TTL_SECONDS.get(endpoint, 0))
+        _entries[(endpoint, key)] = entry
+
+    handler.set_header("ETag", entry.etag)
+    handler.set_header("Cache-Control", "private, no-cache")
+    if handler.check_etag_header():
+        handler.set_status(304)
+        handler.finish()
+    else:
+        handler.finish(entry.body)
@@ -15,33 +15,63 @@
 import json
 import os
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Optional
 
 from aws_orbit_sdk import glue_catalog
 from jupyter_server.base.handlers import APIHandler
 from tornado import web
 
-DATA: List[Dict[str, Any]] = []
+from .cache import finish_cached, invalidate, is_refresh
+from .executor import run_blocking
 
-DATA2: Dict[str, Any] = {}
+TIMEOUT_SECONDS = 60
 
 
 class CatalogRouteHandler(APIHandler):
-    @web.authenticated
-    def get(self):
-        self.log.info(f"GET - {self.__class__}")
-        global DATA
-        if "MOCK" not in os.environ or os.environ["MOCK"] == "0":
-            DATA = glue_catalog.getCatalogAsDict()
-            self.log.info(f"GET - {self.__class__}")
-            if "MOCK" in os.environ:
-                path = f"{Path(__file__).parent.parent.parent}/test/mockup/catalog.json"
-                self.log.info(f"writing mockup data to {path}")
-                with open(path, "w") as outfile:
-                    json.dump(DATA, outfile, indent=4)
+    """
+    Catalog tree, one level per request: a page of databases, a page of the tables of ?database, or the columns of
+    ?database&table. Pages are continued with ?nextToken.
+    """
+
+    @staticmethod
+    def _mock(database: Optional[str], table: Optional[str]) -> Any:
+        path = f"{Path(__file__).parent.parent.parent}/test/mockup/catalog.json"
+        with open(path) as f:
+            nodes = json.load(f)
+        if database:
+            nodes = next((d["children"] for d in nodes if d["title"] == database), [])
+        if table:
+            nodes = next((t["children"] for t in nodes if t["title"] == table), [])
+        items = [{k: v for k, v in n.items() if k != "children"} for n in nodes]
+        return items if table else {"items": items, "nextToken": None}
+
+    async def _load(self, database: Optional[str], table: Optional[str], next_token: Optional[str]) -> str:
+        key = ("catalog", database, table, next_token)
+        if "MOCK" in os.environ and os.environ["MOCK"] != "0":
+            data = self._mock(database, table)
+        elif database and table:
+            data = await run_blocking(
+                glue_catalog.list_catalog_columns, database, table, key=key, timeout=TIMEOUT_SECONDS
+            )
+        elif database:
+            data = await run_blocking(
+                glue_catalog.list_catalog_tables, database, next_token or None, key=key, timeout=TIMEOUT_SECONDS
+            )
         else:
-            path = f"{Path(__file__).parent.parent.parent}/test/mockup/catalog.json"
-            with open(path) as f:
-                DATA = json.load(f)
+            data = await run_blocking(
+                glue_catalog.list_catalog_databases, next_token or None, key=key, timeout=TIMEOUT_SECONDS
+            )
+        return json.dumps(data)
 
-        self.finish(json.dumps(DATA))
+    @web.authenticated
+    async def get(self):
+        database: Optional[str] = self.get_argument("database", default="")
+        table: Optional[str] = self.get_argument("table", default="")
+        next_token: Optional[str] = self.get_argument("nextToken", default="")
+        self.log.info(f"GET - {self.__class__} - {database} {table}")
+        if is_refresh(self):
+            # the tables and columns opened after a refresh are reloaded too, not only the requested page
+            invalidate("catalog")
+        await finish_cached(
+            self, "catalog", lambda: self._load(database, table, next_token), key=(database, table, next_token)
+        )
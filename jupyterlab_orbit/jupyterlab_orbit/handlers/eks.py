@@ -22,6 +22,9 @@ from aws_orbit_sdk.common import get_workspace
 from jupyter_server.base.handlers import APIHandler
 from tornado import web
 
+from .cache import finish_cached
+from .executor import run_blocking
+
 DATA: Dict[str, List[Dict[str, str]]] = {}
 
 
@@ -38,14 +41,14 @@ class EksRouteHandler(APIHandler):
         ret_resp = {"nodegroups": ret}
         return json.dumps(ret_resp)
 
-    @web.authenticated
-    def get(self):
+    async def _load(self) -> str:
         global DATA
-        self.log.info(f"GET - {self.__class__}")
         if "MOCK" not in os.environ or os.environ["MOCK"] == "0":
-            DATA = get_workspace()
+            DATA = await run_blocking(get_workspace, key="workspace")
             cluster_name = "orbit-" + DATA["env_name"]
-            eks_nodegroups = controller.get_nodegroups(cluster_name=cluster_name)
+            eks_nodegroups = await run_blocking(
+                controller.get_nodegroups, cluster_name=cluster_name, key=("nodegroups", cluster_name)
+            )
             self.log.debug(f"eks_nodegroups={eks_nodegroups}")
             if "MOCK" in os.environ:
                 path = f"{Path(__file__).parent.parent.parent}/test/mockup/compute-eks.json"
@@ -57,4 +60,9 @@ class EksRouteHandler(APIHandler):
             with open(path) as f:
                 eks_nodegroups = json.load(f)
 
-        self.finish(self._dump(eks_nodegroups))
+        return self._dump(eks_nodegroups)
+
+    @web.authenticated
+    async def get(self):
+        self.log.info(f"GET - {self.__class__}")
+        await finish_cached(self, "eks", self._load)
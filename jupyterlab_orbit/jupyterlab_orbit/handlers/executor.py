@@ -0,0 +1,55 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License").
+#    You may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from tornado import web
+
+# Blocking SDK calls (Kubernetes, Glue, SSM, EKS, Redshift) run on this pool, off the Jupyter server IOLoop
+EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("ORBIT_HANDLER_WORKERS", "8")), thread_name_prefix="jupyterlab-orbit"
+)
+DEFAULT_TIMEOUT_SECONDS = float(os.environ.get("ORBIT_HANDLER_TIMEOUT_SECONDS", "60"))
+
+_inflight: Dict[Hashable, "asyncio.Future[Any]"] = {}
+
+
+async def run_blocking(
+    func: Callable[..., Any],
+    *args: Any,
+    key: Optional[Hashable] = None,
+    timeout: float = DEFAULT_TIMEOUT_SECONDS,
+    **kwargs: Any,
+) -> Any:
+    """
+    Runs func on the handler executor and waits for its result for at most timeout seconds (HTTP 504 past it).
+
+    Concurrent calls with the same key share a single call of func, calls without a key are never shared. A timed out
+    call keeps running on the executor, and is still shared with the calls made meanwhile.
+    """
+    future = _inflight.get(key) if key is not None else None
+    if future is None:
+        loop = asyncio.get_event_loop()
+        future = loop.run_in_executor(EXECUTOR, functools.partial(func, *args, **kwargs))
+        if key is not None:
+            _inflight[key] = future
+            future.add_done_callback(lambda _: _inflight.pop(key, None))
+    try:
+        return await asyncio.wait_for(asyncio.shield(future), timeout=timeout)
+    except asyncio.TimeoutError:
+        raise web.HTTPError(504, f"{getattr(func, '__name__', func)} did not complete in {timeout}s")
@@ -0,0 +1,73 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License").
+#    You may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import base64
+import json
+from typing import Any, Dict, List, Sequence, Tuple
+
+from jupyter_server.base.handlers import APIHandler
+from tornado import web
+
+MAX_LIMIT = 500
+
+
+def paging_args(handler: APIHandler) -> Tuple[str, str, str, str]:
+    """The sort, filter, limit and cursor query arguments of a listing"""
+    return (
+        handler.get_argument("sort", default=""),
+        handler.get_argument("filter", default=""),
+        handler.get_argument("limit", default=""),
+        handler.get_argument("cursor", default=""),
+    )
+
+
+def _encode_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(str(offset).encode("utf-8")).decode("utf-8")
+
+
+def _decode_cursor(cursor: str) -> int:
+    try:
+        return int(base64.urlsafe_b64decode(cursor.encode("utf-8")).decode("utf-8"))
+    except ValueError:
+        raise web.HTTPError(400, f"Invalid cursor: {cursor}")
+
+
+def paged_body(handler: APIHandler, items: List[Dict[str, Any]], filter_fields: Sequence[str]) -> str:
+    """
+    Serializes a listing, filtered on filter_fields by ?filter (case insensitive substring) and sorted by ?sort (a
+    field, descending when prefixed by -). With ?limit, a page {"items": [...], "nextCursor": ...} is returned,
+    continued with ?cursor; without it the whole listing.
+    """
+    sort, filter, limit, cursor = paging_args(handler)
+    if filter:
+        needle = filter.lower()
+        items = [i for i in items if any(needle in str(i.get(f, "")).lower() for f in filter_fields)]
+    if sort:
+        field = sort.lstrip("-")
+        items = sorted(items, key=lambda i: str(i.get(field, "")), reverse=sort.startswith("-"))
+    if not limit:
+        return json.dumps(items)
+
+    try:
+        size = max(1, min(int(limit), MAX_LIMIT))
+    except ValueError:
+        raise web.HTTPError(400, f"Invalid limit: {limit}")
+    offset = max(0, _decode_cursor(cursor)) if cursor else 0
+    next_offset = offset + size
+    return json.dumps(
+        {
+            "items": items[offset:next_offset],
+            "nextCursor": _encode_cursor(next_offset) if next_offset < len(items) else None,
+        }
+    )
@@ -19,6 +19,8 @@ from aws_orbit_sdk.database import RedshiftUtils
 from jupyter_server.base.handlers import APIHandler
 from tornado import web
 
+from .executor import run_blocking
+
 DATA: List[Dict[str, str]] = []
 
 
@@ -43,28 +45,29 @@ class RedshiftRouteHandler(APIHandler):
         return json.dumps(data, default=str)
 
     @web.authenticated
-    def get(self):
+    async def get(self):
         global DATA
-        DATA = RedshiftUtils().get_team_clusters()
+        DATA = await run_blocking(RedshiftUtils().get_team_clusters, key="redshift")
         self.log.info(f"GET - {self.__class__}")
         self.finish(self._dump())
 
     @web.authenticated
-    def delete(self):
+    async def delete(self):
         global DATA
         input_data = self.get_json_body()
         self.log.info(f"DELETE - {self.__class__} - %s", input_data)
-        RedshiftUtils().delete_redshift_cluster(cluster_name=input_data["name"])
+        await run_blocking(RedshiftUtils().delete_redshift_cluster, cluster_name=input_data["name"])
         # Refresh the data to get latest status of the redshift clusters
-        DATA = RedshiftUtils().get_team_clusters()
+        DATA = await run_blocking(RedshiftUtils().get_team_clusters)
         self.finish(self._dump())
 
     @web.authenticated
-    def post(self):
+    async def post(self):
         global DATA
         input_data = self.get_json_body()
         self.log.info(f"POST - {self.__class__} - %s", input_data)
-        create_response = RedshiftUtils().create_cluster(
+        create_response = await run_blocking(
+            RedshiftUtils().create_cluster,
             cluster_name=input_data["name"],
             number_of_nodes=input_data["numberofnodes"],
             node_type=input_data["nodetype"],
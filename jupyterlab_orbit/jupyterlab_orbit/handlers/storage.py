@@ -15,20 +15,28 @@
 import json
 import os
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 
 from aws_orbit_sdk import controller
 from jupyter_server.base.handlers import APIHandler
 from tornado import web
 
+from .cache import cached_value, finish_cached, invalidate, is_refresh
+from .executor import run_blocking
+from .paging import paged_body, paging_args
+
 TEAM_PVCS: List[Dict[str, str]] = []
 CLUSTER_PVS: List[Dict[str, str]] = []
 CLUSTER_STORAGECLASSES: List[Dict[str, str]] = []
 
+# Fields of the compact items matched by ?filter
+FILTER_FIELDS = ("name", "size", "provisioner")
+
 
 class StorageRouteHandler(APIHandler):
     @staticmethod
-    def _dump(slist, type) -> str:
+    def _dump(slist, type) -> List[Dict[str, str]]:
+        """Compact items of the storage objects, the full objects are served by the detail endpoint"""
         data: List[Dict[str, str]] = []
         for s in slist:
             pass
@@ -46,38 +54,29 @@ class StorageRouteHandler(APIHandler):
                 storage["provisioner"] = s["provisioner"]
             else:
                 pass
-            storage["info"] = s
             data.append(storage)
-        data = sorted(
+        return sorted(
             data,
             key=lambda i: (i["creationTimestamp"] if "creationTimestamp" in i else i["name"]),
         )
 
-        return json.dumps(data)
-
-    @web.authenticated
-    def get(self):
-        self.log.debug("Entered storage GET")
+    @staticmethod
+    async def _objects(type: Optional[str]) -> List[Dict[str, Any]]:
         global TEAM_PVCS
         global CLUSTER_PVS
         global CLUSTER_STORAGECLASSES
-        type: Optional[str] = self.get_argument("type", default="")
-        self.log.info(f"GET - {self.__class__} - {type} {format}")
         if "MOCK" not in os.environ or os.environ["MOCK"] == "0":
             if type == "teampvc":
-                self.log.debug("***teampvc***")
-                TEAM_PVCS = controller.list_storage_pvc()
+                TEAM_PVCS = await run_blocking(controller.list_storage_pvc, key=("storage", type))
                 data = TEAM_PVCS
             elif type == "clusterpv":
-                self.log.debug("***clusterpv***")
-                CLUSTER_PVS = controller.list_storage_pv()
+                CLUSTER_PVS = await run_blocking(controller.list_storage_pv, key=("storage", type))
                 data = CLUSTER_PVS
             elif type == "clusterstorageclass":
-                self.log.debug("***clusterstorageclass***")
-                CLUSTER_STORAGECLASSES = controller.list_storage_class()
+                CLUSTER_STORAGECLASSES = await run_blocking(controller.list_storage_class, key=("storage", type))
                 data = CLUSTER_STORAGECLASSES
             else:
-                raise Exception("Unknown type: %s", type)
+                raise web.HTTPError(400, f"Unknown type: {type}")
 
             if "MOCK" in os.environ:
                 with open(
@@ -87,7 +86,6 @@ class StorageRouteHandler(APIHandler):
                     json.dump(data, outfile, indent=4)
         else:
             path = f"{Path(__file__).parent.parent.parent}/test/mockup/storage-{type}.json"
-            self.log.info("Path: %s", path)
             with open(path) as f:
                 if type == "teampvc":
                     TEAM_PVCS = json.load(f)
@@ -99,13 +97,25 @@ class StorageRouteHandler(APIHandler):
                     CLUSTER_STORAGECLASSES = json.load(f)
                     data = CLUSTER_STORAGECLASSES
                 else:
-                    raise Exception("Unknown type: %s", type)
+                    raise web.HTTPError(400, f"Unknown type: {type}")
+
+        return data
 
-        self.finish(self._dump(data, type))
+    async def _load(self, type: Optional[str]) -> str:
+        # pages, filters and details of a type share one listing per TTL
+        objects = await cached_value("storage", type, lambda: self._objects(type), refresh=is_refresh(self))
+        return paged_body(self, self._dump(objects, type), FILTER_FIELDS)
+
+    @web.authenticated
+    async def get(self):
+        self.log.debug("Entered storage GET")
+        type: Optional[str] = self.get_argument("type", default="")
+        self.log.info(f"GET - {self.__class__} - {type} {format}")
+        await finish_cached(self, "storage", lambda: self._load(type), key=(type, *paging_args(self)))
         self.log.debug("Exit storage GET")
 
     @web.authenticated
-    def delete(self):
+    async def delete(self):
         global TEAM_PVCS
         global CLUSTER_PVS
         input_data = self.get_json_body()
@@ -114,7 +124,7 @@ class StorageRouteHandler(APIHandler):
         self.log.info(f"DELETE - {self.__class__} - %s type: %s", name, type)
         if "MOCK" not in os.environ or os.environ["MOCK"] == "0":
             if type == "teampvc":
-                response = controller.delete_storage_pvc(name)
+                response = await run_blocking(controller.delete_storage_pvc, name)
             else:
                 raise Exception("Unknown type: %s", type)
         else:
@@ -130,5 +140,22 @@ class StorageRouteHandler(APIHandler):
                 "message": f"Successfully deleted ={name}",
             }
 
+        invalidate("storage", type)
         self.log.info(f"Delete response={response}")
         self.finish(json.dumps(response))
+
+
+class StorageDetailRouteHandler(APIHandler):
+    """Full Kubernetes object of a storage listed by StorageRouteHandler, fetched when its row is expanded"""
+
+    @web.authenticated
+    async def get(self):
+        type: Optional[str] = self.get_argument("type", default="")
+        name: str = self.get_argument("name")
+        self.log.info(f"GET - {self.__class__} - {type} {name}")
+        objects = await cached_value("storage", type, lambda: StorageRouteHandler._objects(type))
+        for s in objects:
+            if s["metadata"]["name"] == name:
+                self.finish(json.dumps(s))
+                return
+        raise web.HTTPError(404, f"Storage {name} not found")
@@ -21,6 +21,9 @@ from aws_orbit_sdk.common import get_workspace
 from jupyter_server.base.handlers import APIHandler
 from tornado import web
 
+from .cache import finish_cached
+from .executor import run_blocking
+
 DATA: Dict[str, List[Dict[str, str]]] = {}
 
 
@@ -74,12 +77,10 @@ class TeamRouteHandler(APIHandler):
 
         return json.dumps(ret)
 
-    @web.authenticated
-    def get(self):
+    async def _load(self) -> str:
         global DATA
-        self.log.info(f"GET - {self.__class__}")
         if "MOCK" not in os.environ or os.environ["MOCK"] == "0":
-            DATA = get_workspace()
+            DATA = dict(await run_blocking(get_workspace, key="workspace"))
             # hide some details
             if "Elbs" in DATA:
                 del DATA["Elbs"]
@@ -96,4 +97,9 @@ class TeamRouteHandler(APIHandler):
             with open(path) as f:
                 DATA = json.load(f)
 
-        self.finish(self._dump(DATA))
+        return self._dump(DATA)
+
+    @web.authenticated
+    async def get(self):
+        self.log.info(f"GET - {self.__class__}")
+        await finish_cached(self, "team", self._load)
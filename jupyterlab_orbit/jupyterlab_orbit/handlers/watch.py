@@ -0,0 +1,241 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License").
+#    You may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from aws_orbit_sdk import controller
+from aws_orbit_sdk.common import get_properties
+from jupyter_server.base.handlers import JupyterHandler
+from jupyter_server.base.zmqhandlers import WebSocketMixin
+from kubernetes import watch as k8_watch
+from kubernetes.client import CoreV1Api, CustomObjectsApi
+from kubernetes.client.rest import ApiException
+from tornado import web, websocket
+from tornado.ioloop import IOLoop
+
+from .containers import ContainersRouteHandler
+
+_logger = logging.getLogger(__name__)
+
+WATCH_TIMEOUT_SECONDS = 300
+RETRY_SECONDS = 5
+
+# (event, object) callbacks, event is one of snapshot (object is the list of objects), added, modified or deleted
+Subscriber = Callable[[str, Any], None]
+
+
+class SharedWatch:
+    """
+    Kubernetes watch of the objects of a kind in a namespace, shared by all the subscribers of this server process.
+
+    The objects are listed once, then watched from the last resourceVersion seen, so the watch resumes where it left
+    after the API server closes it. A subscriber receives the current objects as a snapshot, then the changes only.
+    """
+
+    def __init__(self, namespace: str, kind: str) -> None:
+        self.namespace = namespace
+        self.kind = kind
+        self._objects: Dict[str, Dict[str, Any]] = {}
+        self._resource_version: Optional[str] = None
+        self._synced = False
+        self._subscribers: List[Subscriber] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def _list_func(self) -> Tuple[Callable[..., Any], Dict[str, Any]]:
+        if self.kind == "pods":
+            app_list = ",".join(controller.APP_LABEL_SELECTOR)
+            return CoreV1Api().list_namespaced_pod, {
+                "namespace": self.namespace,
+                "label_selector": f"app in ({app_list})",
+            }
+        elif self.kind == "orbitjobs":
+            return CustomObjectsApi().list_namespaced_custom_object, {
+                "group": controller.ORBIT_API_GROUP,
+                "version": controller.ORBIT_API_VERSION,
+                "plural": "orbitjobs",
+                "namespace": self.namespace,
+                "label_selector": "k8sJobType=CronJob",
+            }
+        raise Exception("Unknown kind: %s", self.kind)
+
+    def _publish(self, event: str, obj: Any) -> None:
+        for subscriber in self._subscribers:
+            subscriber(event, obj)
+
+    def _relist(self) -> None:
+        func, kwargs = self._list_func()
+        response = json.loads(func(_preload_content=False, **kwargs).data)
+        objects = {o["metadata"]["name"]: o for o in response.get("items", [])}
+        with self._lock:
+            if not self._synced:
+                self._synced = True
+                self._publish("snapshot", list(objects.values()))
+            else:
+                # changes missed while the watch was expired
+                for name, obj in objects.items():
+                    if name not in self._objects:
+                        self._publish("added", obj)
+                    elif obj != self._objects[name]:
+                        self._publish("modified", obj)
+                for name, obj in self._objects.items():
+                    if name not in objects:
+                        self._publish("deleted", obj)
+            self._objects = objects
+            self._resource_version = response["metadata"]["resourceVersion"]
+
+    def _watch(self) -> None:
+        func, kwargs = self._list_func()
+        stream = k8_watch.Watch().stream(
+            func, resource_version=self._resource_version, timeout_seconds=WATCH_TIMEOUT_SECONDS, **kwargs
+        )
+        for event in stream:
+            obj = event["raw_object"]
+            if event["type"] == "ERROR":
+                if obj.get("code") == 410:
+                    # resourceVersion too old, relist
+                    self._resource_version = None
+                    return
+                raise Exception(obj.get("message"))
+            if event["type"] == "BOOKMARK":
+                self._resource_version = obj["metadata"]["resourceVersion"]
+                continue
+            name = obj["metadata"]["name"]
+            with self._lock:
+                if event["type"] == "DELETED":
+                    self._objects.pop(name, None)
+                else:
+                    self._objects[name] = obj
+                self._resource_version = obj["metadata"]["resourceVersion"]
+                self._publish(event["type"].lower(), obj)
+
+    def _run(self) -> None:
+        controller.load_kube_config()
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = None
+                    self._synced = False
+                    return
+            try:
+                if self._resource_version is None:
+                    self._relist()
+                self._watch()
+            except ApiException as e:
+                if e.status == 410:
+                    self._resource_version = None
+                    continue
+                _logger.warning("Watch of %s in %s failed: %s", self.kind, self.namespace, e)
+                time.sleep(RETRY_SECONDS)
+            except Exception as e:
+                _logger.warning("Watch of %s in %s failed: %s", self.kind, self.namespace, e)
+                time.sleep(RETRY_SECONDS)
+
+    def subscribe(self, subscriber: Subscriber) -> None:
+        with self._lock:
+            self._subscribers.append(subscriber)
+            if self._synced:
+                subscriber("snapshot", list(self._objects.values()))
+            if self._thread is None:
+                self._resource_version = None
+                self._thread = threading.Thread(
+                    target=self._run, name=f"watch-{self.namespace}-{self.kind}", daemon=True
+                )
+                self._thread.start()
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        # the watch stops when it next reconnects without subscribers
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+
+_watches: Dict[Tuple[str, str], SharedWatch] = {}
+_watches_lock = threading.Lock()
+
+
+def get_watch(namespace: str, kind: str) -> SharedWatch:
+    with _watches_lock:
+        if (namespace, kind) not in _watches:
+            _watches[(namespace, kind)] = SharedWatch(namespace=namespace, kind=kind)
+        return _watches[(namespace, kind)]
+
+
+class ContainersWatchHandler(WebSocketMixin, JupyterHandler, websocket.WebSocketHandler):
+    """
+    Pushes the containers of a type (user, team or cron) to the JupyterLab containers panel: the full list when the
+    websocket opens, then {"event": "added"|"modified"|"deleted", "item": ...} messages.
+    """
+
+    async def get(self, *args, **kwargs):
+        if not self.get_current_user():
+            raise web.HTTPError(403)
+        return await super().get(*args, **kwargs)
+
+    def _watch_of(self, type: Optional[str]) -> SharedWatch:
+        team_name = get_properties()["AWS_ORBIT_TEAM_SPACE"]
+        user_namespace = os.environ.get("AWS_ORBIT_USER_SPACE", team_name)
+        if type == "user":
+            return get_watch(user_namespace, "pods")
+        elif type == "team":
+            return get_watch(team_name, "pods")
+        elif type == "cron":
+            return get_watch(user_namespace, "orbitjobs")
+        raise web.HTTPError(400, f"Unknown type: {type}")
+
+    def _item(self, obj: Dict[str, Any]) -> Dict[str, str]:
+        return ContainersRouteHandler._item(obj, self.job_type)
+
+    def _visible(self, obj: Dict[str, Any]) -> bool:
+        # same filter as controller.list_running_cronjobs
+        if self.job_type == "cron":
+            return obj.get("status", {}).get("orbitJobOperator", {}).get("jobStatus") == "Active"
+        return True
+
+    def _send(self, event: str, obj: Any) -> None:
+        try:
+            if event == "snapshot":
+                items = [self._item(o) for o in obj if self._visible(o)]
+                message = {"event": event, "items": ContainersRouteHandler._sorted(items)}
+            else:
+                if event == "modified" and not self._visible(obj):
+                    event = "deleted"
+                elif event != "deleted" and not self._visible(obj):
+                    return
+                message = {"event": event, "item": self._item(obj)}
+            self.write_message(json.dumps(message))
+        except websocket.WebSocketClosedError:
+            pass
+        except Exception as e:
+            self.log.warning("Unable to send %s %s: %s", event, obj.get("metadata", {}).get("name"), e)
+
+    def _on_event(self, event: str, obj: Any) -> None:
+        # called from the watch thread
+        self._loop.add_callback(self._send, event, obj)
+
+    def open(self):
+        self.job_type = self.get_argument("type", default="")
+        self.log.info(f"WATCH - {self.__class__} - {self.job_type}")
+        self._loop = IOLoop.current()
+        self._watch = self._watch_of(self.job_type)
+        self._watch.subscribe(self._on_event)
+
+    def on_close(self):
+        if hasattr(self, "_watch"):
+            self._watch.unsubscribe(self._on_event)
@@ -16,11 +16,12 @@ from notebook.utils import url_path_join
 
 from .handlers.athena import AthenaRouteHandler
 from .handlers.catalog import CatalogRouteHandler
-from .handlers.containers import ContainersRouteHandler
+from .handlers.containers import ContainerDetailRouteHandler, ContainersRouteHandler
 from .handlers.eks import EksRouteHandler
 from .handlers.redshift import RedshiftRouteHandler
-from .handlers.storage import StorageRouteHandler
+from .handlers.storage import StorageDetailRouteHandler, StorageRouteHandler
 from .handlers.team import TeamRouteHandler
+from .handlers.watch import ContainersWatchHandler
 
 
 def setup_handlers(web_app):
@@ -31,10 +32,22 @@ def setup_handlers(web_app):
             url_path_join(base_url, "jupyterlab_orbit", "containers"),
             ContainersRouteHandler,
         ),
+        (
+            url_path_join(base_url, "jupyterlab_orbit", "containers", "watch"),
+            ContainersWatchHandler,
+        ),
+        (
+            url_path_join(base_url, "jupyterlab_orbit", "containers", "detail"),
+            ContainerDetailRouteHandler,
+        ),
         (url_path_join(base_url, "jupyterlab_orbit", "team"), TeamRouteHandler),
         (url_path_join(base_url, "jupyterlab_orbit", "redshift"), RedshiftRouteHandler),
         (url_path_join(base_url, "jupyterlab_orbit", "athena"), AthenaRouteHandler),
         (url_path_join(base_url, "jupyterlab_orbit", "storage"), StorageRouteHandler),
+        (
+            url_path_join(base_url, "jupyterlab_orbit", "storage", "detail"),
+            StorageDetailRouteHandler,
+        ),
         (url_path_join(base_url, "jupyterlab_orbit", "eks"), EksRouteHandler),
     ]
 
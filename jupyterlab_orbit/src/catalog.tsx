@@ -25,35 +25,96 @@ const ICON: LabIcon = catalogIcon;
 interface IUseItemsReturn {
   treeItems: any[];
   refreshCallback: () => void;
+  loadData: (node: any) => Promise<void>;
+  loadMore: (node: any) => Promise<void>;
 }
 
+// children of the node with key, in a copy of the tree
+const setChildren = (nodes: any[], key: string, children: any[]): any[] =>
+  nodes.map(node => {
+    if (node.key === key) {
+      return { ...node, children: children };
+    }
+    if (node.children) {
+      return { ...node, children: setChildren(node.children, key, children) };
+    }
+    return node;
+  });
+
+// the node with key replaced by nodes, in a copy of the tree
+const replaceNode = (tree: any[], key: string, nodes: any[]): any[] =>
+  tree.reduce((ret: any[], node: any) => {
+    if (node.key === key) {
+      return ret.concat(nodes);
+    }
+    if (node.children) {
+      node = { ...node, children: replaceNode(node.children, key, nodes) };
+    }
+    return ret.concat([node]);
+  }, []);
+
 const useItems = (): IUseItemsReturn => {
   const [treeItems, setTreeItems] = useState([]);
-  const updateList = (data: any[]) => {
-    data.forEach(database => {
-      database.children.forEach((table: { icon: JSX.Element }) => {
-        table.icon = <TableOutlined />;
+
+  // a page of databases, or of the tables of a database, followed by a node loading the next page
+  const loadPage = async (
+    parameters: IDictionary<string | boolean>
+  ): Promise<any[]> => {
+    const page: any = await request('catalog', parameters);
+    const nodes: any[] = page.items.map((node: any) =>
+      node._class === 'table' ? { ...node, icon: <TableOutlined /> } : node
+    );
+    if (page.nextToken) {
+      nodes.push({
+        title: 'Load more...',
+        key: `${parameters.database || ''}#more#${page.nextToken}`,
+        _class: 'more',
+        db: parameters.database,
+        nextToken: page.nextToken,
+        isLeaf: true
       });
-    });
+    }
+    return nodes;
+  };
+
+  const loadData = async (node: any): Promise<void> => {
+    if (node.children) {
+      return;
+    }
+    let children: any[] = [];
+    if (node._class === 'database') {
+      children = await loadPage({ database: node.db });
+    } else if (node._class === 'table') {
+      children = await request('catalog', {
+        database: node.db,
+        table: node.table
+      });
+    }
+    setTreeItems(items => setChildren(items, node.key, children));
+  };
+
+  const loadMore = async (node: any): Promise<void> => {
+    const parameters: IDictionary<string> = { nextToken: node.nextToken };
+    if (node.db) {
+      parameters.database = node.db;
+    }
+    const nodes = await loadPage(parameters);
+    setTreeItems(items => replaceNode(items, node.key, nodes));
   };
 
   const refreshCallback = async () => {
     console.log(`[${NAME}] Refresh!`);
-    const ret: any[] = await request('catalog');
-    updateList(ret);
-    setTreeItems(ret);
+    setTreeItems(await loadPage({ refresh: true }));
   };
 
   useEffect(() => {
     const fetchData = async () => {
-      const ret: any[] = await request('catalog');
-      updateList(ret);
-      setTreeItems(ret);
+      setTreeItems(await loadPage({}));
     };
     fetchData();
   }, []);
 
-  return { treeItems, refreshCallback };
+  return { treeItems, refreshCallback, loadData, loadMore };
 };
 
 const CentralWidgetComponent = (props: {
@@ -146,12 +207,16 @@ const LeftWidgetComponent = (props: {
   launchCallback: () => void;
   app: JupyterFrontEnd;
 }): JSX.Element => {
-  const { treeItems, refreshCallback } = useItems();
+  const { treeItems, refreshCallback, loadData, loadMore } = useItems();
   const [state, setState] = useState<any>([
     { database: undefined, table: undefined }
   ]);
 
   const onSelect = (selectedKeys: React.Key[], info: any) => {
+    if (info.node._class === 'more') {
+      loadMore(info.node);
+      return;
+    }
     setState({ database: info.node.db, table: info.node.table });
     console.log('selected', state.database, state.table);
   };
@@ -176,6 +241,7 @@ const LeftWidgetComponent = (props: {
         showIcon={true}
         defaultExpandedKeys={['0-0-0']}
         onSelect={onSelect}
+        loadData={loadData}
         treeData={treeItems}
       />
     </div>
@@ -11,6 +11,25 @@ const encodeQueryData = (data: IDictionary<any>): string => {
   return ret.join('&');
 };
 
+// Last ETag and payload of each GET url, revalidated with If-None-Match
+const etags = new Map<string, { etag: string; data: any }>();
+
+export function openWebSocket(
+  endPoint = '',
+  parameters: IDictionary<any> = {}
+): WebSocket {
+  const settings = ServerConnection.makeSettings();
+  let url = URLExt.join(settings.wsUrl, 'jupyterlab_orbit', endPoint);
+  const query = { ...parameters };
+  if (settings.token) {
+    query['token'] = settings.token;
+  }
+  if (Object.entries(query).length > 0) {
+    url = url.concat('?', encodeQueryData(query));
+  }
+  return new settings.WebSocket(url);
+}
+
 export async function request<T>(
   endPoint = '',
   parameters: IDictionary<any> = {},
@@ -24,6 +43,14 @@ export async function request<T>(
   }
 
   console.log(`Requesting: ${requestUrl}`);
+  const isGet = !init.method || init.method.toUpperCase() === 'GET';
+  const cached = isGet ? etags.get(requestUrl) : undefined;
+  if (cached) {
+    init = {
+      ...init,
+      headers: { ...(init.headers as any), 'If-None-Match': cached.etag }
+    };
+  }
   let response: Response;
   try {
     response = await ServerConnection.makeRequest(requestUrl, init, settings);
@@ -31,6 +58,10 @@ export async function request<T>(
     throw new ServerConnection.NetworkError(error);
   }
 
+  if (response.status === 304 && cached) {
+    return cached.data;
+  }
+
   let data: any = await response.text();
 
   if (data.length > 0) {
@@ -45,5 +76,10 @@ export async function request<T>(
     throw new ServerConnection.ResponseError(response, data.message || data);
   }
 
+  const etag = response.headers.get('ETag');
+  if (isGet && etag) {
+    etags.set(requestUrl, { etag, data });
+  }
+
   return data;
 }
@@ -0,0 +1,63 @@
+import React, { useEffect, useState } from 'react';
+import ReactJson from 'react-json-view';
+import { LoadingOutlined } from '@ant-design/icons';
+
+import { request } from './backend';
+
+// Full object of a listed item, fetched from endPoint/detail when its row is expanded
+export const DetailView = (props: {
+  endPoint: string;
+  type: string;
+  name: string;
+  title: string;
+}): JSX.Element => {
+  const [data, setData] = useState<object | undefined>(undefined);
+  const [error, setError] = useState<string | undefined>(undefined);
+
+  useEffect(() => {
+    request(`${props.endPoint}/detail`, {
+      type: props.type,
+      name: props.name
+    })
+      .then((reply: object) => setData(reply))
+      .catch((e: Error) => setError(`${e.message}`));
+  }, [props.type, props.name]);
+
+  if (error) {
+    return <p>{error}</p>;
+  }
+  if (!data) {
+    return (
+      <p>
+        <LoadingOutlined />
+      </p>
+    );
+  }
+  return (
+    <p>
+      <ReactJson
+        src={data}
+        name={props.title}
+        collapsed={1}
+        displayDataTypes={false}
+      />
+    </p>
+  );
+};
+
+export const detailExpandable = (
+  endPoint: string,
+  type: string,
+  title: string
+): {} => {
+  return {
+    expandedRowRender: (record: { name: string }) => (
+      <DetailView
+        endPoint={endPoint}
+        type={type}
+        name={record.name}
+        title={title}
+      />
+    )
+  };
+};
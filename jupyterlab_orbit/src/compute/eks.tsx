@@ -25,7 +25,7 @@ const useItems = (): IUseItemsReturn => {
 
   const refreshCallback = async () => {
     console.log(`[${NAME}] Refresh!`);
-    setData(await request('eks'));
+    setData(await request('eks', { refresh: true }));
   };
   const nodeGroups = data.nodegroups;
   return { nodeGroups, refreshCallback };
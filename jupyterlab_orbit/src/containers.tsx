@@ -1,4 +1,10 @@
-import React, { Dispatch, SetStateAction, useEffect, useState } from 'react';
+import React, {
+  Dispatch,
+  SetStateAction,
+  useEffect,
+  useRef,
+  useState
+} from 'react';
 import { JupyterFrontEnd } from '@jupyterlab/application';
 import { ILauncher } from '@jupyterlab/launcher';
 import {
@@ -32,7 +38,7 @@ import {
   ScheduleOutlined
 } from '@ant-design/icons';
 
-import { request } from './common/backend';
+import { openWebSocket, request } from './common/backend';
 import { IDictionary } from './typings/utils';
 
 const NAME = 'Containers';
@@ -44,7 +50,7 @@ const refreshCallback = () => {
 
 export interface IItem {
   name: string;
-  hint: string;
+  tasks: any;
   time: string;
   node_type: string;
   job_state: string;
@@ -57,6 +63,7 @@ export interface IUseItemsReturn {
   data: any[];
   closeAllCallback: (name: string) => void;
   refreshCallback: () => void;
+  pollCallback: () => void;
   setData: Dispatch<SetStateAction<any[]>>;
   connect: (
     podName: string,
@@ -185,8 +192,26 @@ export const deleteItem = async (
   }
 };
 
+// same order as the server: running jobs first, then by name
+const sortItems = (items: any[]): any[] =>
+  items.sort((a, b) =>
+    a.rank !== b.rank ? a.rank - b.rank : a.name.localeCompare(b.name)
+  );
+
+const applyEvent = (items: any[], message: any): any[] => {
+  if (message.event === 'snapshot') {
+    return message.items;
+  }
+  const others = items.filter(i => i.name !== message.item.name);
+  if (message.event === 'deleted') {
+    return others;
+  }
+  return sortItems([...others, message.item]);
+};
+
 const useItems = (type: string, app: JupyterFrontEnd): IUseItemsReturn => {
   const [data, setData] = useState([]);
+  const socket = useRef<WebSocket | null>(null);
 
   const updateData = (data: any[]) => {
     let i = 0;
@@ -299,6 +324,37 @@ const useItems = (type: string, app: JupyterFrontEnd): IUseItemsReturn => {
     fetchData();
   }, []);
 
+  // the server pushes the list on connect, then the added, modified and deleted items
+  useEffect(() => {
+    let closed = false;
+    let retry: any = null;
+    const connectSocket = () => {
+      const ws = openWebSocket('containers/watch', { type: type });
+      ws.onmessage = (msg: MessageEvent) => {
+        setData(current => {
+          const items = applyEvent(current, JSON.parse(msg.data));
+          updateData(items);
+          return items;
+        });
+      };
+      ws.onclose = () => {
+        socket.current = null;
+        if (!closed) {
+          retry = setTimeout(connectSocket, 10000);
+        }
+      };
+      socket.current = ws;
+    };
+    connectSocket();
+    return () => {
+      closed = true;
+      clearTimeout(retry);
+      if (socket.current) {
+        socket.current.close();
+      }
+    };
+  }, []);
+
   const closeAllCallback = (name: string) => {
     void showDialog({
       title: `Delete all ${name} jobs`,
@@ -320,13 +376,33 @@ const useItems = (type: string, app: JupyterFrontEnd): IUseItemsReturn => {
 
   const refreshCallback = async () => {
     console.log(`[${NAME}] Refresh!`);
+    const parameters: IDictionary<number | string | boolean> = {
+      type: type,
+      refresh: true
+    };
+    setData(await request('containers', parameters));
+  };
+
+  // periodic refresh when the server cannot push, served from the server cache while it is fresh
+  const pollCallback = async () => {
+    if (socket.current && socket.current.readyState === WebSocket.OPEN) {
+      return;
+    }
     const parameters: IDictionary<number | string> = {
       type: type
     };
     setData(await request('containers', parameters));
   };
 
-  return { data, closeAllCallback, refreshCallback, setData, connect, logs };
+  return {
+    data,
+    closeAllCallback,
+    refreshCallback,
+    pollCallback,
+    setData,
+    connect,
+    logs
+  };
 };
 
 const Sections = (props: { app: JupyterFrontEnd }): JSX.Element => {
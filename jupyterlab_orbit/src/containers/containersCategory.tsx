@@ -39,7 +39,7 @@ const Item = (props: {
         <span> {icon} </span>
         <span
           className={ITEM_LABEL_CLASS}
-          title={props.item.hint}
+          title={JSON.stringify(props.item.tasks, null, 4)}
           onClick={() => props.openItemCallback(props.item.name)}
         >
           {props.item.job_name}
@@ -1,7 +1,6 @@
 import React, { useEffect } from 'react';
 import * as utils from '../typings/utils';
 import { TableWidget } from './table/table';
-import ReactJson from 'react-json-view';
 import {
   IUseItemsReturn,
   getStateIcon,
@@ -10,6 +9,7 @@ import {
 } from '../containers';
 import { Tooltip } from 'antd';
 import { JupyterFrontEnd } from '@jupyterlab/application';
+import { detailExpandable } from '../common/detail';
 
 const columns = [
   {
@@ -128,21 +128,6 @@ const columns = [
   }
 ];
 
-const expandable = (): {} => {
-  return {
-    expandedRowRender: (record: { info: object }) => (
-      <p>
-        <ReactJson
-          src={record.info}
-          name={'job description'}
-          collapsed={1}
-          displayDataTypes={false}
-        />
-      </p>
-    )
-  };
-};
-
 export const ContainerCentralPanel = (props: {
   title: string;
   type: string;
@@ -150,12 +135,12 @@ export const ContainerCentralPanel = (props: {
 }): JSX.Element => {
   // eslint-disable-next-line @typescript-eslint/ban-ts-ignore
   // @ts-ignore
-  const { data, closeAllCallback, refreshCallback, setData } = props.useItems(
+  const { data, closeAllCallback, pollCallback, setData } = props.useItems(
     props.type
   );
 
   useEffect(() => {
-    const interval = setInterval(refreshCallback, 60000);
+    const interval = setInterval(pollCallback, 60000);
     return () => clearInterval(interval);
   }, []);
 
@@ -167,7 +152,9 @@ export const ContainerCentralPanel = (props: {
           title={props.title}
           data={data}
           columns={columns}
-          expandable={expandable}
+          expandable={() =>
+            detailExpandable('containers', props.type, 'job description')
+          }
         />
       </div>
     </div>
@@ -101,8 +101,9 @@ const useItems = (type: string, app: JupyterFrontEnd): IUseItemsReturn => {
 
   const refreshCallback = async () => {
     console.log(`[${NAME}] Refresh!`);
-    const parameters: IDictionary<number | string> = {
-      type: type
+    const parameters: IDictionary<number | string | boolean> = {
+      type: type,
+      refresh: true
     };
     setData(await request('storage', parameters));
   };
@@ -1,25 +1,10 @@
 import React, { useEffect } from 'react';
 import * as utils from '../typings/utils';
 import { TableWidget } from '../common/table';
-import ReactJson from 'react-json-view';
 import { IUseItemsReturn } from '../storage';
 import { JupyterFrontEnd } from '@jupyterlab/application';
 import { IDictionary } from '../typings/utils';
-
-const expandable = (): {} => {
-  return {
-    expandedRowRender: (record: { info: object }) => (
-      <p>
-        <ReactJson
-          src={record.info}
-          name={'details'}
-          collapsed={1}
-          displayDataTypes={false}
-        />
-      </p>
-    )
-  };
-};
+import { detailExpandable } from '../common/detail';
 
 export const StorageCentralPanel = (props: {
   title: string;
@@ -105,7 +90,9 @@ export const StorageCentralPanel = (props: {
           title={props.title}
           data={data}
           columns={getColumns()}
-          expandable={expandable}
+          expandable={() =>
+            detailExpandable('storage', props.type, 'details')
+          }
         />
       </div>
     </div>
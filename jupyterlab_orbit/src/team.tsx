@@ -57,7 +57,7 @@ const useItems = (): IUseItemsReturn => {
   });
 
   const refreshCallback = async () => {
-    setData(await request('team'));
+    setData(await request('team', { refresh: true }));
   };
 
   useEffect(() => {
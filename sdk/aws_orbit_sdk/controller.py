@@ -149,6 +149,76 @@ def _get_execution_history_from_local(notebook_basedir: str, src_notebook: str,
     return df
 
 
+def get_cell_profiles(notebookDir: str, notebookName: str, top: Optional[int] = 10) -> pd.DataFrame:
+    """
+    Get the slowest cells of a notebook across its scheduled executions
+
+    Parameters
+    ----------
+    notebookDir: str
+        Name of notebook directory.
+    notebookName: str
+        Name of notebook.
+    top: optional, int
+        Number of cells to return, ordered by their mean duration (default 10, None returns every cell).
+
+    Returns
+    -------
+    df: pd.DataFrame
+        One row per cell with its number of runs, mean/max/last duration in seconds, max peak kernel RSS in bytes,
+        mean output size in bytes and the duration of every run ordered by time.
+
+    Example
+    --------
+    >>> from aws_orbit_sdk import controller
+    >>> controller.get_cell_profiles(notebookDir="notebook-directory", notebookName='mynotebook', top=5)
+    """
+    runs = _get_cell_profiles_from_local(notebookDir, notebookName)
+    columns = ["cellId", "index", "source", "runs", "meanDuration", "maxDuration", "lastDuration"]
+    columns += ["maxPeakRss", "meanOutputBytes", "durations"]
+    if runs.empty:
+        return pd.DataFrame(columns=columns)
+
+    runs = runs.sort_values("timestamp")
+    cells = runs.groupby("cellId").agg(
+        index=("index", "last"),
+        source=("source", "last"),
+        runs=("timestamp", "count"),
+        meanDuration=("duration", "mean"),
+        maxDuration=("duration", "max"),
+        lastDuration=("duration", "last"),
+        maxPeakRss=("peakRss", "max"),
+        meanOutputBytes=("outputBytes", "mean"),
+        durations=("duration", list),
+    )
+    cells = cells.reset_index().sort_values("meanDuration", ascending=False)[columns]
+    return cells.head(top) if top else cells
+
+
+def _get_cell_profiles_from_local(notebook_basedir: str, src_notebook: str) -> pd.DataFrame:
+    """
+    Get the per cell profiles written next to the output notebooks on EFS, one row per cell and execution
+    """
+
+    home = str(Path.home())
+    nb_name = Path(src_notebook).stem
+    notebook_dir = os.path.join(home, notebook_basedir, nb_name)
+
+    rows = []
+    for profile_path in Path(notebook_dir).glob("*.profile.json"):
+        with open(profile_path) as f:
+            profile = json.load(f)
+        timestamp = datetime.fromtimestamp(profile["timestamp"])
+        for cell in profile["cells"]:
+            rows.append({**cell, "output": profile["output"], "timestamp": timestamp})
+
+    if not rows:
+        _logger.info(f"No cell profiles founds at: {notebook_dir}")
+
+    columns = ["output", "timestamp", "cellId", "index", "source", "status", "start", "duration", "peakRss"]
+    return pd.DataFrame(rows, columns=columns + ["outputBytes"])
+
+
 def run_python(taskConfiguration: dict) -> Any:
     """
     Runs Python Task
@@ -163,9 +233,13 @@ def run_python(taskConfiguration: dict) -> Any:
         module : str
            The python module to run (without .py ext).
         functionName : str
-                The python function to start the execution.
+                The python function to start the execution, a coroutine function (`async def`) is awaited.
         sourcePaths : lst
               A list of s3 python source paths used for importing packages or modules into the application.
+        priority : int
+              Tasks with a higher priority start first (default: 0).
+        timeout : int
+              The maximum number of seconds this task may run, overriding `task_timeout`.
         params : dict
              A list of parameters for this task to override the notebook parameters.
         compute : optional, dict
@@ -174,6 +248,13 @@ def run_python(taskConfiguration: dict) -> Any:
                A list of parameters to control container execution.
         p_concurrent : str
               The number of parallel threads inside the container that will execute notebooks.
+        executor : str
+              How concurrent tasks run: `process` (default) in a pool of processes, `thread` in a pool of threads for
+              I/O bound tasks, or `asyncio` awaiting coroutine functions (`async def`) concurrently on an event loop.
+        max_failures : int
+              Stops the remaining tasks once this number of tasks failed or timed out.
+        task_timeout : int
+              The default maximum number of seconds a task may run.
         env_vars : optional, list
               A list of environment parameters to pass to the container.
 
@@ -231,8 +312,20 @@ def run_notebooks(taskConfiguration: dict) -> Any:
             The filename of the notebook.
         notebookName : str
             The relative path to the notebook file starting at the repository root.
+        sourceRef : str
+            The branch, tag or commit checked out for `codecommit::` source paths (default: HEAD).
         targetPath : str
              The target S3 directory where the output notebook and all related output will be generated.
+        isolated : bool
+             If True, the notebook always runs in a fresh kernel even when the kernel pool is enabled.
+        priority : int
+             Notebooks with a higher priority start first (default: 0).
+        timeout : int
+             The maximum number of seconds this notebook may run, overriding `task_timeout`.
+        inputs : lst
+             A list of s3 prefixes or local paths fingerprinted into the result cache key.
+        force : bool
+             If True, the notebook is executed even when the result cache holds a matching output.
         params : dict
              A list of parameters for this task to override the notebook parameters.
         compute : optional, dict
@@ -241,6 +334,19 @@ def run_notebooks(taskConfiguration: dict) -> Any:
                A list of parameters to control container execution.
         p_concurrent : str
               The number of parallel processes inside the container that will execute notebooks.
+        kernel_pool : bool
+              If True, notebooks run in warm kernels reused across the notebooks of the container.
+        kernel_pool_max_tasks : int
+              The number of notebooks a warm kernel executes before it is replaced (default: 50).
+        preload_imports : lst
+              A list of import statements preloaded in every warm kernel.
+        max_failures : int
+              Stops the remaining notebooks once this number of notebooks failed or timed out.
+        task_timeout : int
+              The default maximum number of seconds a notebook may run.
+        result_cache : bool
+              If True, a notebook whose source, parameters, image and inputs match a previous successful run reuses
+              that run's output instead of executing.
         sns.topic.name : str
               A name of a topic to which messages are sent on task completion or failure.
         env_vars : optional, lst
@@ -636,8 +742,25 @@ def _create_eks_job_spec(taskConfiguration: dict) -> Dict[str, Any]:
     if "labels" in compute:
         converted_compute["labels"] = compute["labels"]
     if "container" in compute:
+        converted_container = {}
         if "p_concurrent" in compute["container"]:
-            converted_compute["concurrentProcesses"] = compute["container"]["p_concurrent"]
+            converted_container["concurrentProcesses"] = compute["container"]["p_concurrent"]
+        if "kernel_pool" in compute["container"]:
+            converted_container["kernelPool"] = compute["container"]["kernel_pool"]
+        if "kernel_pool_max_tasks" in compute["container"]:
+            converted_container["kernelPoolMaxTasks"] = compute["container"]["kernel_pool_max_tasks"]
+        if "preload_imports" in compute["container"]:
+            converted_container["preloadImports"] = compute["container"]["preload_imports"]
+        if "max_failures" in compute["container"]:
+            converted_container["maxFailures"] = compute["container"]["max_failures"]
+        if "task_timeout" in compute["container"]:
+            converted_container["taskTimeout"] = compute["container"]["task_timeout"]
+        if "result_cache" in compute["container"]:
+            converted_container["resultCache"] = compute["container"]["result_cache"]
+        if "executor" in compute["container"]:
+            converted_container["executor"] = compute["container"]["executor"]
+        if converted_container:
+            converted_compute["container"] = converted_container
 
     return {
         "apiVersion": "orbit.aws/v1",
@@ -1,9 +1,12 @@
+import asyncio
+import concurrent.futures
 import json
 import logging
 import os
 import socket
+import threading
 import time
-from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple, cast
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Set, Tuple, cast
 
 import boto3
 import requests
@@ -19,6 +22,21 @@ logger = logging.getLogger()
 
 SSM_PARAMETER_PREFIX = "/emr_launch/emr_launch_functions"
 
+# AddJobFlowSteps accepts at most 256 steps per request
+EMR_MAX_STEPS_PER_CALL = 256
+# ListSteps accepts at most 10 StepIds per call
+EMR_MAX_STEP_IDS_PER_LIST = 10
+EMR_STEP_TERMINAL_STATES = ("COMPLETED", "CANCELLED", "FAILED", "INTERRUPTED")
+EMR_ACTIVE_CLUSTER_STATES = ["STARTING", "BOOTSTRAPPING", "RUNNING", "WAITING"]
+EMR_RESIZING_GROUP_STATES = ("PROVISIONING", "BOOTSTRAPPING", "RECONFIGURING", "RESIZING")
+
+# Team cluster registry: cluster name -> {cluster_id, state, master_ip, instance_groups, info}, refreshed every TTL
+CLUSTER_CACHE_TTL_SECONDS = 60
+_cluster_registry: Dict[str, Dict[str, Any]] = {}
+_cluster_descriptions: Dict[str, Dict[str, Any]] = {}
+_cluster_registry_expires = 0.0
+_cluster_registry_lock = threading.Lock()
+
 
 def get_virtual_cluster_id() -> str:
     emr = boto3.client("emr-containers")
@@ -71,6 +89,7 @@ def connect_to_spark(
     startCluster: Optional[bool] = False,
     clusterArgs: Optional[Dict[str, str]] = dict(),
     waitWhenResizing: Optional[bool] = True,
+    refreshCache: Optional[bool] = False,
 ) -> Tuple[str, str, bool]:
     """
     Returns a livy URL that can be used to start a new spark session. The API can also create a new cluster if it does
@@ -89,6 +108,9 @@ def connect_to_spark(
     waitWhenResizing : bool, optional
         If waitWhenResizing is True and the cluster task nodes are resizing, the call will wait until
         operation is completed
+    refreshCache : bool, optional
+        If refreshCache is True, the cached team cluster registry is refreshed from EMR before looking up the cluster.
+        Cached clusters are otherwise refreshed after CLUSTER_CACHE_TTL_SECONDS or when livy is not reachable.
 
     Returns
     -------
@@ -117,33 +139,29 @@ def connect_to_spark(
             raise Exception("One of `cluster_name` or `clusterArgs['ClusterName']` is required")
 
     emr = boto3.client("emr")
-    ClusterStates = ["STARTING", "BOOTSTRAPPING", "RUNNING", "WAITING"]
-    res = emr.list_clusters(ClusterStates=ClusterStates)
-    while True:
-        clusters = res["Clusters"]
-        # choose the correct cluster
-        clusters = [c for c in clusters if c["Name"] == cluster_name]
-        if clusters:
-            break
-        elif "Marker" not in res.keys():
-            break
-        else:
-            res = emr.list_clusters(Marker=res["Marker"], ClusterStates=ClusterStates)
+    entry = _get_registry_entry(emr, cluster_name, refresh=cast(bool, refreshCache))
 
     cluster_id = ""
     started = False
     if reuseCluster:
-        if not clusters:
+        if not entry:
             if not startCluster:
                 raise Exception(f"cannot find running EMR cluster: {cluster_name}")
             else:
                 (master_ip, cluster_id) = _start_and_wait_for_emr(emr, cluster_name, clusterArgs)
                 started = True
         else:
-            cluster_id = clusters[0]["Id"]
+            cached = entry["master_ip"] is not None
             # possibly the cluster exists but is in the middle of resizing
-            _wait_for_cluster_groups(emr, cluster_id)
-            master_ip = _get_cluster_ip(emr, cluster_id)
+            entry = _resolve_registry_entry(emr, entry)
+            if cached and not _livy_available(_livy_url(entry["master_ip"])):
+                logger.info("livy is not reachable on cached cluster %s, refreshing cluster registry", cluster_name)
+                entry = _get_registry_entry(emr, cluster_name, refresh=True)
+                if not entry:
+                    raise Exception(f"cannot find running EMR cluster: {cluster_name}")
+                entry = _resolve_registry_entry(emr, entry)
+            cluster_id = entry["cluster_id"]
+            master_ip = entry["master_ip"]
 
     else:
         if not startCluster:
@@ -152,14 +170,136 @@ def connect_to_spark(
             (master_ip, cluster_id) = _start_and_wait_for_emr(emr, cluster_name, clusterArgs)
             started = True
 
-    if waitWhenResizing:
+    # reused clusters were already waited for by _resolve_registry_entry, started ones may resize after starting
+    if waitWhenResizing and started:
         _wait_for_cluster_groups(emr, cluster_id)
 
+    return (_livy_url(master_ip), cluster_id, started)
+
+
+def invalidate_cluster_cache(cluster_name: Optional[str] = None) -> None:
+    """
+    Drops cached EMR cluster discovery results, forcing the next lookup to query EMR again.
+
+    Parameters
+    ----------
+    cluster_name : str, optional
+        The cluster to invalidate. All cached clusters are invalidated when not provided.
+
+    Returns
+    -------
+    None
+        None.
+
+    Example
+    -------
+    >>> import aws_orbit_sdk.emr as sparkConnection
+    >>> sparkConnection.invalidate_cluster_cache(cluster_name="my-cluster")
+    """
+    global _cluster_registry_expires
+    with _cluster_registry_lock:
+        if cluster_name is None:
+            _cluster_registry.clear()
+        else:
+            _cluster_registry.pop(cluster_name, None)
+        _cluster_registry_expires = 0.0
+
+
+def _livy_url(master_ip: str) -> str:
     # conn_template = "-s spark -c spark -l python -u http://{}:8998 -t None ADD"
-    conn_template = "http://{}:8998"
-    conn = conn_template.format(master_ip)
+    return f"http://{master_ip}:8998"
 
-    return (conn, cluster_id, started)
+
+def _livy_available(livy_url: str) -> bool:
+    try:
+        requests.get(url=livy_url + "/sessions", timeout=5).raise_for_status()
+        return True
+    except requests.RequestException as e:
+        logger.debug("livy check failed for %s: %s", livy_url, e)
+        return False
+
+
+def _refresh_cluster_registry(emr: boto3.client) -> None:
+    """
+    Lists the active EMR clusters tagged for the current team space and rebuilds the cluster registry.
+
+    Clusters are described when first seen and whenever their state changes, otherwise the description is kept with
+    the Status of the listing. Descriptions of clusters no longer active are dropped.
+    """
+    global _cluster_registry_expires
+    props = get_properties()
+    registry: Dict[str, Dict[str, Any]] = {}
+    seen: Set[str] = set()
+    paginator = emr.get_paginator("list_clusters")
+    for page in paginator.paginate(ClusterStates=EMR_ACTIVE_CLUSTER_STATES):
+        for cluster in page["Clusters"]:
+            cluster_id = cluster["Id"]
+            seen.add(cluster_id)
+            cluster_info = _cluster_descriptions.get(cluster_id)
+            if cluster_info is None or cluster_info["Cluster"]["Status"]["State"] != cluster["Status"]["State"]:
+                cluster_info = emr.describe_cluster(ClusterId=cluster_id)
+                if "Cluster" not in cluster_info:
+                    raise Exception("Error calling describe_cluster()")
+                _cluster_descriptions[cluster_id] = cluster_info
+            else:
+                cluster_info["Cluster"]["Status"] = cluster["Status"]
+
+            tags = {tag["Key"]: tag["Value"] for tag in cluster_info["Cluster"].get("Tags", [])}
+            if tags.get(ORBIT_PRODUCT_KEY) != ORBIT_PRODUCT_NAME:
+                continue
+            if tags.get(ORBIT_ENV) != props["AWS_ORBIT_ENV"]:
+                continue
+            if tags.get(AWS_ORBIT_TEAM_SPACE) != props["AWS_ORBIT_TEAM_SPACE"]:
+                continue
+
+            # keep the resolved ip and instance groups only while the cluster did not change state
+            previous = _cluster_registry.get(cluster["Name"], {})
+            unchanged = previous.get("cluster_id") == cluster_id and previous.get("state") == cluster["Status"]["State"]
+            registry[cluster["Name"]] = {
+                "cluster_id": cluster_id,
+                "name": cluster["Name"],
+                "state": cluster["Status"]["State"],
+                "master_ip": previous.get("master_ip") if unchanged else None,
+                "instance_groups": previous.get("instance_groups") if unchanged else None,
+                "info": cluster_info,
+            }
+
+    with _cluster_registry_lock:
+        for cluster_id in set(_cluster_descriptions) - seen:
+            del _cluster_descriptions[cluster_id]
+        _cluster_registry.clear()
+        _cluster_registry.update(registry)
+        _cluster_registry_expires = time.monotonic() + CLUSTER_CACHE_TTL_SECONDS
+
+
+def _get_registry(emr: boto3.client, refresh: bool = False) -> Dict[str, Dict[str, Any]]:
+    if refresh or time.monotonic() >= _cluster_registry_expires:
+        _refresh_cluster_registry(emr)
+    return _cluster_registry
+
+
+def _get_registry_entry(emr: boto3.client, cluster_name: str, refresh: bool = False) -> Optional[Dict[str, Any]]:
+    entry = _get_registry(emr, refresh).get(cluster_name)
+    if entry is None and not refresh:
+        # the cluster may have been started since the registry was last refreshed
+        entry = _get_registry(emr, refresh=True).get(cluster_name)
+    return entry
+
+
+def _resolve_registry_entry(emr: boto3.client, entry: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Fills in the instance groups and master ip of a registry entry, waiting for the cluster if it is resizing.
+
+    A resize can start at any time without changing the cluster state, so the instance groups are listed again on
+    every call (a single ListInstanceGroups call when the cluster is not resizing), only the master ip is cached.
+    """
+    entry["instance_groups"] = _wait_for_cluster_groups(emr, entry["cluster_id"])
+    if entry["master_ip"] is None:
+        entry["master_ip"] = _get_cluster_ip(emr, entry["cluster_id"], wait_ready=False)
+        if entry["master_ip"] == "not ready":
+            entry["master_ip"] = None
+            raise Exception(f"Master node is not available for cluster: {entry['cluster_id']}")
+    return entry
 
 
 def getSparkSessionInfo(livyUrl: str, appID: str) -> Optional[Dict[str, Any]]:
@@ -408,28 +548,26 @@ def _get_emr_functions() -> Dict[str, Any]:
     return func
 
 
-def _wait_for_cluster_groups(emr: boto3, cluster_id: str) -> None:
+def _wait_for_cluster_groups(emr: boto3, cluster_id: str) -> List[Dict[str, Any]]:
     """
-    Waits for instance groups in cluster to start running.
+    Waits for instance groups in cluster to start running and returns the last seen instance groups.
     """
     attempts = 30
+    groups: List[Dict[str, Any]] = []
     while attempts > 0:
         attempts -= 1
         response = emr.list_instance_groups(ClusterId=cluster_id)
+        groups = response["InstanceGroups"]
         wait = False
-        for g in response["InstanceGroups"]:
-            if g["Status"]["State"] in (
-                "PROVISIONING",
-                "BOOTSTRAPPING",
-                "RECONFIGURING",
-                "RESIZING",
-            ):
+        for g in groups:
+            if g["Status"]["State"] in EMR_RESIZING_GROUP_STATES:
                 logger.info("waiting for cluster group: %s(%s)", g["Name"], g["Status"]["State"])
                 wait = True
         if wait:
             time.sleep(30)
         else:
             break
+    return groups
 
 
 def get_cluster_info(cluster_id: str) -> Dict[str, Dict[str, str]]:
@@ -499,6 +637,22 @@ def spark_submit(job: Dict[str, Any]) -> Dict[str, Any]:
     ...                                            "spark_args": [--num-executors,2,--num_cores,4,--executor_memory,1g]
     ...                                             })
     """
+    cluster_id = _validate_spark_job(job)
+    s3WorkspaceDir = _sync_workspace_to_s3()
+
+    emr = boto3.client("emr")
+    response = emr.add_job_flow_steps(
+        JobFlowId=cluster_id,
+        Steps=[_build_spark_step(job, s3WorkspaceDir)],
+    )
+
+    return response
+
+
+def _validate_spark_job(job: Dict[str, Any]) -> str:
+    """
+    Validates the mandatory fields of a pyspark job definition and returns its cluster id.
+    """
     cluster_id = job["cluster_id"] if "cluster_id" in job.keys() else None
     if cluster_id is None:
         raise Exception("cluster_id must be provided")
@@ -508,16 +662,14 @@ def spark_submit(job: Dict[str, Any]) -> Dict[str, Any]:
     module = job["module"] if "module" in job.keys() else None
     if module is None:
         raise Exception("module must be provided")
+    return cast(str, cluster_id)
 
-    waitAppCompletion = job["wait_app_completion"] if "wait_app_completion" in job.keys() else False
-    appargs = job["app_args"] if "app_args" in job.keys() else []
-    sparkargs = job["spark_args"] if "spark_args" in job.keys() else []
-    props = get_properties()
-    if waitAppCompletion:
-        waitApp = "true"
-    else:
-        waitApp = "false"
 
+def _sync_workspace_to_s3() -> str:
+    """
+    Syncs the local workspace directory to the team workspace location in S3 and returns that location.
+    """
+    props = get_properties()
     workspaceDir = "workspace"
 
     notebookInstanceName = socket.gethostname()
@@ -531,10 +683,23 @@ def spark_submit(job: Dict[str, Any]) -> Dict[str, Any]:
     logout = os.popen(cmd).read()
     logger.info("s3 workspace directory is %s", s3WorkspaceDir)
     logger.debug(logout)
+    return s3WorkspaceDir
 
-    module = os.path.join(s3WorkspaceDir, module)
 
-    emr = boto3.client("emr")
+def _build_spark_step(job: Dict[str, Any], s3WorkspaceDir: str) -> Dict[str, Any]:
+    """
+    Builds the EMR step definition running spark-submit for a validated pyspark job definition.
+    """
+    waitAppCompletion = job["wait_app_completion"] if "wait_app_completion" in job.keys() else False
+    appargs = job["app_args"] if "app_args" in job.keys() else []
+    sparkargs = job["spark_args"] if "spark_args" in job.keys() else []
+    if waitAppCompletion:
+        waitApp = "true"
+    else:
+        waitApp = "false"
+
+    module = os.path.join(s3WorkspaceDir, job["module"])
+
     args = [
         "/usr/bin/spark-submit",
         "--verbose",
@@ -553,18 +718,207 @@ def spark_submit(job: Dict[str, Any]) -> Dict[str, Any]:
     args.append(module)
     args.extend(appargs)
 
-    response = emr.add_job_flow_steps(
-        JobFlowId=cluster_id,
-        Steps=[
-            {
-                "Name": app_name,
-                "ActionOnFailure": "CONTINUE",
-                "HadoopJarStep": {"Jar": "command-runner.jar", "Args": args},
-            },
-        ],
-    )
+    return {
+        "Name": job["app_name"],
+        "ActionOnFailure": "CONTINUE",
+        "HadoopJarStep": {"Jar": "command-runner.jar", "Args": args},
+    }
 
-    return response
+
+def spark_submit_many(jobs: List[Dict[str, Any]]) -> "SparkStepTracker":
+    """
+    Submits a batch of PySpark jobs to EMR using as few AddJobFlowSteps calls as possible.
+
+    The workspace is synced to S3 once for the whole batch, jobs are grouped by cluster and each group is submitted in
+    chunks of up to EMR_MAX_STEPS_PER_CALL steps.
+
+    Parameters
+    ----------
+    jobs : list
+        A list of pyspark job definitions, each with the same fields accepted by `spark_submit`.
+
+    Returns
+    -------
+    tracker : SparkStepTracker
+        A tracker holding one future per submitted step and able to wait on all of them.
+
+    Example
+    -------
+    >>> import aws_orbit_sdk.emr as sparkConnection
+    >>> tracker = sparkConnection.spark_submit_many(jobs=[
+    ...     {"cluster_id": cluster_id, "app_name": "app1", "module": "samples/python/pyspark/createTbl.py"},
+    ...     {"cluster_id": cluster_id, "app_name": "app2", "module": "samples/python/pyspark/createTbl.py"},
+    ... ])
+    >>> tracker.wait()
+    >>> tracker.summary()
+    """
+    if not jobs:
+        raise Exception("at least one job must be provided")
+    jobs_by_cluster: Dict[str, List[Dict[str, Any]]] = {}
+    for job in jobs:
+        jobs_by_cluster.setdefault(_validate_spark_job(job), []).append(job)
+
+    s3WorkspaceDir = _sync_workspace_to_s3()
+    emr = boto3.client("emr")
+    tracker = SparkStepTracker(emr=emr)
+    for cluster_id, cluster_jobs in jobs_by_cluster.items():
+        for i in range(0, len(cluster_jobs), EMR_MAX_STEPS_PER_CALL):
+            chunk = cluster_jobs[i : i + EMR_MAX_STEPS_PER_CALL]
+            response = emr.add_job_flow_steps(
+                JobFlowId=cluster_id,
+                Steps=[_build_spark_step(job, s3WorkspaceDir) for job in chunk],
+            )
+            logger.info("added %s steps to cluster %s", len(response["StepIds"]), cluster_id)
+            for job, step_id in zip(chunk, response["StepIds"]):
+                tracker.add_step(cluster_id=cluster_id, step_id=step_id, app_name=job["app_name"])
+
+    return tracker
+
+
+class SparkStepTracker:
+    """
+    Tracks the completion of EMR steps added by `spark_submit_many`.
+
+    The outstanding steps of a cluster are checked with one ListSteps call per 10 steps (the most StepIds it accepts)
+    per poll, with an exponentially growing delay between polls. Each step is exposed as a `concurrent.futures.Future`
+    resolving to the step description once the step reaches a terminal state.
+    """
+
+    def __init__(
+        self,
+        emr: Optional[boto3.client] = None,
+        initial_delay: float = 5.0,
+        max_delay: float = 60.0,
+        backoff_factor: float = 2.0,
+    ) -> None:
+        self._emr = emr if emr else boto3.client("emr")
+        self._initial_delay = initial_delay
+        self._max_delay = max_delay
+        self._backoff_factor = backoff_factor
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.steps: Dict[str, Dict[str, Any]] = {}
+        self.futures: Dict[str, "concurrent.futures.Future[Dict[str, Any]]"] = {}
+
+    def add_step(self, cluster_id: str, step_id: str, app_name: str) -> None:
+        with self._lock:
+            self.steps[step_id] = {"cluster_id": cluster_id, "app_name": app_name, "state": "PENDING"}
+            self.futures[step_id] = concurrent.futures.Future()
+
+    @property
+    def outstanding(self) -> List[str]:
+        with self._lock:
+            return [step_id for step_id, future in self.futures.items() if not future.done()]
+
+    def poll(self) -> int:
+        """
+        Refreshes the state of every outstanding step and resolves the futures of finished ones.
+
+        Returns the number of steps still outstanding.
+        """
+        outstanding_by_cluster: Dict[str, List[str]] = {}
+        outstanding = self.outstanding
+        with self._lock:
+            for step_id in outstanding:
+                outstanding_by_cluster.setdefault(self.steps[step_id]["cluster_id"], []).append(step_id)
+
+        paginator = self._emr.get_paginator("list_steps")
+        for cluster_id, step_ids in outstanding_by_cluster.items():
+            for i in range(0, len(step_ids), EMR_MAX_STEP_IDS_PER_LIST):
+                chunk = step_ids[i : i + EMR_MAX_STEP_IDS_PER_LIST]
+                for page in paginator.paginate(ClusterId=cluster_id, StepIds=chunk):
+                    for step in page["Steps"]:
+                        self._update_step(step)
+
+        return len(self.outstanding)
+
+    def _update_step(self, step: Dict[str, Any]) -> None:
+        step_id = step["Id"]
+        state = step["Status"]["State"]
+        with self._lock:
+            if step_id not in self.futures:
+                return
+            self.steps[step_id]["state"] = state
+            future = self.futures[step_id]
+            if future.done() or state not in EMR_STEP_TERMINAL_STATES:
+                return
+        if state == "COMPLETED":
+            future.set_result(step)
+        else:
+            reason = step["Status"].get("FailureDetails", {}).get("Reason", "")
+            future.set_exception(
+                Exception(f"EMR step {step_id} ({self.steps[step_id]['app_name']}) ended in state {state} {reason}")
+            )
+        logger.info("EMR step %s (%s) ended in state %s", step_id, self.steps[step_id]["app_name"], state)
+
+    def wait(self, timeout: Optional[float] = None) -> Dict[str, int]:
+        """
+        Blocks until every step reached a terminal state or the timeout (in seconds) expired.
+
+        Returns the combined status summary.
+        """
+        if self._thread is not None:
+            with self._lock:
+                futures = list(self.futures.values())
+            concurrent.futures.wait(futures, timeout=timeout)
+            return self.summary()
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        delay = self._initial_delay
+        while self.poll() > 0:
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.info("Stopped waiting with %s steps outstanding", len(self.outstanding))
+                    break
+                delay = min(delay, remaining)
+            time.sleep(delay)
+            delay = min(delay * self._backoff_factor, self._max_delay)
+        return self.summary()
+
+    def start(self) -> "SparkStepTracker":
+        """
+        Starts polling in a background daemon thread, so the futures resolve without blocking the caller.
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._poll_loop, name="emr-step-tracker", daemon=True)
+            self._thread.start()
+        return self
+
+    def _poll_loop(self) -> None:
+        delay = self._initial_delay
+        while True:
+            try:
+                if self.poll() == 0:
+                    return
+            except Exception as e:
+                logger.warning("Error polling EMR steps, will retry: %s", e)
+            time.sleep(delay)
+            delay = min(delay * self._backoff_factor, self._max_delay)
+
+    def awaitable(self, step_id: str) -> "asyncio.Future[Dict[str, Any]]":
+        """
+        Returns an asyncio awaitable for a step, starting the background poller if needed.
+        """
+        self.start()
+        return asyncio.wrap_future(self.futures[step_id])
+
+    async def wait_async(self) -> Dict[str, int]:
+        """
+        Awaits every step without blocking the running event loop and returns the combined status summary.
+        """
+        with self._lock:
+            step_ids = list(self.futures)
+        await asyncio.gather(*[self.awaitable(step_id) for step_id in step_ids], return_exceptions=True)
+        return self.summary()
+
+    def summary(self) -> Dict[str, int]:
+        """
+        Returns the number of tracked steps per EMR step state.
+        """
+        with self._lock:
+            states = [step["state"] for step in self.steps.values()]
+        return {state: states.count(state) for state in sorted(set(states))}
 
 
 def get_team_clusters(cluster_id: Optional[str] = None) -> Dict[str, Dict[str, str]]:
@@ -589,46 +943,34 @@ def get_team_clusters(cluster_id: Optional[str] = None) -> Dict[str, Dict[str, s
     """
 
     emr = boto3.client("emr")
-    props = get_properties()
+    registry = _get_registry(emr)
     if cluster_id is None:
-        clusters = emr.list_clusters(ClusterStates=["STARTING", "BOOTSTRAPPING", "RUNNING", "WAITING"])
-        if "Clusters" not in clusters:
-            raise Exception("Error calling list_clusters()")
-        if len(clusters["Clusters"]) == 0:
+        entries = list(registry.values())
+        if len(entries) == 0:
             logger.info("no emr clusters found for team space")
             return {}
-        clusters = clusters["Clusters"]
     else:
-        clusters = [{"Id": cluster_id}]
+        entries = [e for e in registry.values() if e["cluster_id"] == cluster_id]
+        if not entries:
+            entries = [e for e in _get_registry(emr, refresh=True).values() if e["cluster_id"] == cluster_id]
 
     clusters_info = {}
-    for cluster in clusters:
-        clstr_id = cluster["Id"]
-        cluster_info = emr.describe_cluster(ClusterId=clstr_id)
-        if "Cluster" not in cluster_info:
-            raise Exception("Error calling describe_cluster()")
-
-        tag_list = cluster_info["Cluster"]["Tags"]
-        tags = {}
-        for tag in tag_list:
-            tags[tag["Key"]] = tag["Value"]
-
-        if ORBIT_PRODUCT_KEY not in tags or tags[ORBIT_PRODUCT_KEY] != ORBIT_PRODUCT_NAME:
-            continue
-
-        if tags[ORBIT_ENV] != props["AWS_ORBIT_ENV"] or tags[AWS_ORBIT_TEAM_SPACE] != props["AWS_ORBIT_TEAM_SPACE"]:
-            continue
-
+    for entry in entries:
+        clstr_id = entry["cluster_id"]
         cluster_nodes_info = get_cluster_info(clstr_id)
-        ip = _get_cluster_ip(emr, clstr_id, False)
-        livy_url = f"http://{ip}:8998"
+        if entry["master_ip"] is None:
+            ip = _get_cluster_ip(emr, clstr_id, False)
+            if ip != "not ready":
+                entry["master_ip"] = ip
+        else:
+            ip = entry["master_ip"]
         cluster_model = {}
         cluster_model["cluster_id"] = clstr_id
-        cluster_model["livy_url"] = livy_url
+        cluster_model["livy_url"] = _livy_url(ip)
         cluster_model["ip"] = ip
-        cluster_model["Name"] = cluster["Name"]
-        cluster_model["State"] = cluster["Status"]["State"]
-        cluster_model["info"] = cluster_info
+        cluster_model["Name"] = entry["name"]
+        cluster_model["State"] = entry["state"]
+        cluster_model["info"] = entry["info"]
         cluster_model["dashboard_link"] = "http://tbd"
         cluster_model["instances"] = cluster_nodes_info
         clusters_info[clstr_id] = cluster_model
@@ -378,3 +378,123 @@ def getCatalogAsDict(database: Optional[str] = None) -> List[Dict[str, Any]]:
                 col["db"] = db["Name"]
                 col["table"] = t["Name"]
     return schemas
+
+
+def _page(items: List[Dict[str, Any]], response: Dict[str, Any]) -> Dict[str, Any]:
+    return {"items": items, "nextToken": response.get("NextToken")}
+
+
+def list_catalog_databases(next_token: Optional[str] = None, max_results: int = 100) -> Dict[str, Any]:
+    """
+    Get a page of the Data Catalog databases, as catalog tree nodes whose tables are loaded separately.
+
+    Parameters
+    ----------
+    next_token : str, optional
+        nextToken of the previous page.
+    max_results : int
+        Maximum number of databases of the page.
+
+    Returns
+    -------
+    page : dict
+        The database nodes ("items") and the nextToken of the next page, None on the last page.
+
+    Example
+    --------
+    >>> from aws_orbit_sdk.glue_catalog import list_catalog_databases
+    >>> list_catalog_databases()
+    """
+    glue = boto3.client("glue")
+    kwargs: Dict[str, Any] = {"MaxResults": max_results}
+    if next_token:
+        kwargs["NextToken"] = next_token
+    response = glue.get_databases(**kwargs)
+    return _page(
+        [
+            {"title": db["Name"], "key": db["Name"], "qname": db["Name"], "_class": "database", "db": db["Name"]}
+            for db in response["DatabaseList"]
+        ],
+        response,
+    )
+
+
+def list_catalog_tables(database: str, next_token: Optional[str] = None, max_results: int = 50) -> Dict[str, Any]:
+    """
+    Get a page of the tables of a Data Catalog database, as catalog tree nodes whose columns are loaded separately.
+
+    Parameters
+    ----------
+    database : str
+        Name of the database.
+    next_token : str, optional
+        nextToken of the previous page.
+    max_results : int
+        Maximum number of tables of the page.
+
+    Returns
+    -------
+    page : dict
+        The table nodes ("items") and the nextToken of the next page, None on the last page.
+
+    Example
+    --------
+    >>> from aws_orbit_sdk.glue_catalog import list_catalog_tables
+    >>> list_catalog_tables(database="my_database")
+    """
+    glue = boto3.client("glue")
+    kwargs: Dict[str, Any] = {"DatabaseName": database, "MaxResults": max_results}
+    if next_token:
+        kwargs["NextToken"] = next_token
+    response = glue.get_tables(**kwargs)
+    return _page(
+        [
+            {
+                "title": t["Name"],
+                "key": f"{database}.{t['Name']}",
+                "location": t.get("StorageDescriptor", {}).get("Location", ""),
+                "_class": "table",
+                "db": database,
+                "table": t["Name"],
+            }
+            for t in response["TableList"]
+        ],
+        response,
+    )
+
+
+def list_catalog_columns(database: str, table: str) -> List[Dict[str, Any]]:
+    """
+    Get the columns of a Data Catalog table, as catalog tree nodes.
+
+    Parameters
+    ----------
+    database : str
+        Name of the database.
+    table : str
+        Name of the table.
+
+    Returns
+    -------
+    columns : list
+        The column nodes of the table.
+
+    Example
+    --------
+    >>> from aws_orbit_sdk.glue_catalog import list_catalog_columns
+    >>> list_catalog_columns(database="my_database", table="my_table")
+    """
+    glue = boto3.client("glue")
+    t = glue.get_table(DatabaseName=database, Name=table)["Table"]
+    return [
+        {
+            "title": c["Name"],
+            "type": c["Type"],
+            "key": f"{database}.{table}.{c['Name']}",
+            "_class": "column",
+            "db": database,
+            "table": table,
+            "isLeaf": True,
+        }
+        for c in t.get("StorageDescriptor", {}).get("Columns", [])
+    ]